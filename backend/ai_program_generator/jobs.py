@@ -0,0 +1,137 @@
+# ai_program_generator/jobs.py
+"""
+DB-backed job queue for AI program generation.
+
+The API only inserts a GenerationJob row; `run_generation_worker` claims
+queued rows with SELECT ... FOR UPDATE SKIP LOCKED (so several worker
+processes can share the queue) and runs them on a bounded thread pool.
+A partial unique constraint keeps at most one queued/running job per user,
+and the worker refreshes `heartbeat_at` on the jobs it holds so only jobs
+of a dead worker are requeued. A worker only records an outcome while the
+job is still running under its name: one that finishes after its job was
+requeued discards its result (and the program is never saved).
+"""
+import logging
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import GenerationJob
+from .services import GenerationError, generate_program
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = ("queued", "running")
+
+
+def enqueue_generation(user):
+    """
+    Queue a generation for `user`. If one is already queued or running for
+    this user, that job is returned instead of stacking a duplicate.
+    Returns (job, created).
+    """
+    pending = GenerationJob.objects.filter(user=user, status__in=PENDING_STATUSES)
+    existing = pending.first()
+    if existing:
+        return existing, False
+    try:
+        with transaction.atomic():
+            return GenerationJob.objects.create(user=user), True
+    except IntegrityError:
+        # A concurrent request queued one first (generation_job_one_pending_per_user)
+        existing = pending.first()
+        if existing is None:  # ...and it already finished
+            raise
+        return existing, False
+
+
+def claim_jobs(limit, worker_id):
+    """Atomically move up to `limit` queued jobs to running and return them."""
+    if limit <= 0:
+        return []
+    with transaction.atomic():
+        ids = list(
+            GenerationJob.objects.select_for_update(skip_locked=True)
+            .filter(status="queued")
+            .order_by("created_at")
+            .values_list("id", flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        now = timezone.now()
+        GenerationJob.objects.filter(id__in=ids).update(
+            status="running",
+            started_at=now,
+            heartbeat_at=now,
+            worker=worker_id,
+            attempts=F("attempts") + 1,
+        )
+    return list(GenerationJob.objects.filter(id__in=ids).select_related("user"))
+
+
+class JobLost(Exception):
+    """The job was requeued (missed heartbeats) and is no longer this worker's."""
+
+
+def run_job(job):
+    """Run one claimed job to completion and record the outcome."""
+    def on_saved(program):
+        if not _finish(job, "succeeded", program=program):
+            raise JobLost  # rolls the program back
+
+    try:
+        generate_program(job.user, on_saved=on_saved)
+    except JobLost:
+        pass
+    except GenerationError as e:
+        _finish(job, "failed", error=e.message, error_details={"status": e.status, **e.details})
+    except Exception as e:
+        logger.exception("Generation job %s crashed", job.id)
+        _finish(job, "failed", error=f"Unexpected error: {str(e)}", error_details={"status": 500})
+    if job.status == "running":
+        logger.warning("Generation job %s was requeued while %s ran it; result discarded", job.id, job.worker)
+        job.refresh_from_db()
+    return job
+
+
+def _finish(job, status, program=None, error="", error_details=None):
+    """Record the outcome if `job` is still running on its worker. Returns whether it was recorded."""
+    fields = {
+        "status": status,
+        "program": program,
+        "error": error,
+        "error_details": error_details,
+        "finished_at": timezone.now(),
+    }
+    updated = GenerationJob.objects.filter(id=job.id, status="running", worker=job.worker).update(**fields)
+    if updated:
+        for name, value in fields.items():
+            setattr(job, name, value)
+    return bool(updated)
+
+
+def heartbeat(job_ids, worker_id):
+    """Mark the running jobs `worker_id` holds as alive. Returns the number of rows touched."""
+    if not job_ids:
+        return 0
+    return GenerationJob.objects.filter(id__in=job_ids, status="running", worker=worker_id).update(
+        heartbeat_at=timezone.now()
+    )
+
+
+def requeue_stale_jobs(stale_after, max_attempts=3):
+    """
+    Jobs whose worker sent no heartbeat for `stale_after` seconds (the worker
+    crashed or was killed) go back to the queue, or fail once they used up
+    `max_attempts`. A job that is merely slow keeps its heartbeat fresh and
+    is left alone. Returns the number of rows touched.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale = GenerationJob.objects.filter(status="running", heartbeat_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status="failed", error="Worker lost the job too many times", finished_at=timezone.now()
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(status="queued", worker="")
+    return failed + requeued
@@ -0,0 +1,95 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from ai_program_generator.models import AIProgram, ProgramDay, Exercise
+from ai_program_generator.persistence import persist_program
+from users.models import User
+
+BENCH_AUTH0_ID = "bench|program-persistence"
+
+
+def _sample_program(exercises_per_day):
+    return {
+        "program_summary": {"goal": "Benchmark", "difficulty": "intermediate"},
+        "week_plan": [
+            {
+                "day_name": day,
+                "focus": "Rest" if day in ("Wednesday", "Sunday") else "Strength",
+                "is_rest_day": day in ("Wednesday", "Sunday"),
+                "sessions": [] if day in ("Wednesday", "Sunday") else [
+                    {"exercise_name": f"Exercise {i}", "sets": 3, "reps": "8-12",
+                     "intensity": "RPE 7", "notes": ""}
+                    for i in range(1, exercises_per_day + 1)
+                ],
+            }
+            for day in ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+        ],
+    }
+
+
+def _legacy_save(user, program_data):
+    # The per-row loop persist_program replaced, kept here for comparison.
+    with transaction.atomic():
+        ai_program = AIProgram.objects.create(
+            user=user,
+            goal=program_data["program_summary"]["goal"],
+            difficulty=program_data["program_summary"]["difficulty"].lower(),
+            is_active=True,
+            raw_json=program_data
+        )
+        for day_idx, day_data in enumerate(program_data["week_plan"]):
+            program_day = ProgramDay.objects.create(
+                program=ai_program,
+                day_number=day_idx + 1,
+                day_name=day_data["day_name"],
+                focus=day_data["focus"],
+                is_rest_day=day_data["is_rest_day"]
+            )
+            if not day_data["is_rest_day"]:
+                for exercise_idx, exercise_data in enumerate(day_data["sessions"]):
+                    Exercise.objects.create(
+                        program_day=program_day,
+                        order=exercise_idx + 1,
+                        exercise_name=exercise_data["exercise_name"],
+                        sets=exercise_data["sets"],
+                        reps=exercise_data["reps"],
+                        intensity=exercise_data["intensity"],
+                        notes=exercise_data.get("notes", "")
+                    )
+    return ai_program
+
+
+class Command(BaseCommand):
+    help = "Compare the per-row program save loop with the bulk_create persistence path"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=50, help="Programs saved per strategy")
+        parser.add_argument("--exercises", type=int, default=5, help="Exercises per training day")
+
+    def handle(self, *args, **opts):
+        user, _ = User.objects.get_or_create(
+            auth0_id=BENCH_AUTH0_ID, defaults={"email": "bench-persistence@example.com"}
+        )
+        program_data = _sample_program(opts["exercises"])
+
+        try:
+            for label, save in (("loop", _legacy_save), ("bulk", lambda u, d: persist_program(u, d).program)):
+                timings = []
+                for _ in range(opts["repeat"]):
+                    with CaptureQueriesContext(connection) as ctx:
+                        start = time.perf_counter()
+                        save(user, program_data)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    queries = len(ctx.captured_queries)
+
+                self.stdout.write(
+                    f"{label:>5}: {queries:3d} queries/program  "
+                    f"median {statistics.median(timings):7.2f} ms  "
+                    f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:7.2f} ms"
+                )
+        finally:
+            user.delete()
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from ai_program_generator.ollama_pool import get_ollama_pool
+
+
+class Command(BaseCommand):
+    help = "Probe the Ollama nodes of OLLAMA_URLS (GET /api/tags) and show their state"
+
+    def handle(self, *args, **opts):
+        pool = get_ollama_pool()
+        nodes = pool.probe()
+        for node in nodes:
+            self.stdout.write(
+                f"{node['url']:<40} {'up' if node['healthy'] else 'DOWN':<5} breaker={node['breaker']:<9} "
+                f"in_flight={node['in_flight']} latency={node['latency_ms']}ms failures={node['failures']}"
+            )
+        up = sum(node["healthy"] for node in nodes)
+        style = self.style.SUCCESS if up else self.style.ERROR
+        self.stdout.write(style(f"{up}/{len(nodes)} node(s) serving {pool.model}"))
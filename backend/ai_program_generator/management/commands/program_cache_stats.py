@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from ai_program_generator.models import ProgramTemplate
+from ai_program_generator.program_cache import cache_stats, evict
+
+
+class Command(BaseCommand):
+    help = "Report program template cache hit rates (optionally evict expired/overflow entries)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7, help="Reporting window in days")
+        parser.add_argument("--top", type=int, default=5, help="Most reused templates to list")
+        parser.add_argument("--evict", action="store_true", help="Apply TTL and size eviction first")
+
+    def handle(self, *args, **opts):
+        if opts["evict"]:
+            self.stdout.write(f"Evicted {evict()} template(s)")
+
+        stats = cache_stats(opts["days"])
+        for day in stats["days"]:
+            self.stdout.write(f"{day.date}  hits={day.hits}  misses={day.misses}  hit_rate={day.hit_rate:.1%}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Last {opts['days']} day(s): {stats['hits']} hits, {stats['misses']} misses, "
+            f"hit rate {stats['hit_rate']:.1%}, {stats['entries']} cached template(s)"
+        ))
+
+        for template in ProgramTemplate.objects.order_by("-hit_count")[:opts["top"]]:
+            self.stdout.write(f"  {template.fingerprint[:12]}  hits={template.hit_count}  {template.profile_key}")
@@ -0,0 +1,66 @@
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from ai_program_generator.jobs import claim_jobs, heartbeat, requeue_stale_jobs, run_job
+
+
+def _run_in_thread(job):
+    # Each pool thread gets its own DB connection; drop it when the job is done
+    # so long-running workers don't accumulate idle connections.
+    try:
+        return run_job(job)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Process queued AI program generation jobs with bounded concurrency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=settings.GENERATION_WORKER_CONCURRENCY,
+                            help="Jobs run in parallel against Ollama")
+        parser.add_argument("--poll-interval", type=float, default=settings.GENERATION_WORKER_POLL_INTERVAL,
+                            help="Seconds to wait between polls when the queue is empty")
+        parser.add_argument("--stale-after", type=int, default=settings.GENERATION_JOB_STALE_AFTER,
+                            help="Requeue 'running' jobs without a worker heartbeat for this many seconds")
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit")
+
+    def handle(self, *args, **opts):
+        concurrency = max(1, opts["concurrency"])
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stdout.write(f"Generation worker {worker_id} started (concurrency={concurrency})")
+
+        running = {}  # future -> job id
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="generation") as pool:
+            try:
+                while True:
+                    close_old_connections()
+                    # The loop wakes at least every poll interval, well inside --stale-after
+                    heartbeat(list(running.values()), worker_id)
+                    recovered = requeue_stale_jobs(opts["stale_after"])
+                    if recovered:
+                        self.stdout.write(self.style.WARNING(f"Recovered {recovered} stale job(s)"))
+
+                    for job in claim_jobs(concurrency - len(running), worker_id):
+                        running[pool.submit(_run_in_thread, job)] = job.id
+
+                    if not running:
+                        if opts["once"]:
+                            break
+                        time.sleep(opts["poll_interval"])
+                        continue
+
+                    done, _ = wait(running, timeout=opts["poll_interval"], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        del running[future]
+                        job = future.result()
+                        style = self.style.SUCCESS if job.status == "succeeded" else self.style.ERROR
+                        self.stdout.write(style(f"Job {job.id} {job.status}"))
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping: waiting for running jobs to finish")
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.3 on 2026-10-17 17:29
+
+from django.db import migrations, models
+
+
+def materialize_documents(apps, schema_editor):
+    # raw_json used to hold the unvalidated model output; rebuild it from the
+    # relational rows in the shape get_active_program now serves directly.
+    AIProgram = apps.get_model("ai_program_generator", "AIProgram")
+    for program in AIProgram.objects.prefetch_related("days__exercises").iterator(chunk_size=500):
+        program.raw_json = {
+            "program_summary": {"goal": program.goal, "difficulty": program.difficulty},
+            "week_plan": [
+                {
+                    "day_name": day.day_name,
+                    "focus": day.focus,
+                    "is_rest_day": day.is_rest_day,
+                    "sessions": [
+                        {
+                            "exercise_name": ex.exercise_name,
+                            "sets": ex.sets,
+                            "reps": ex.reps,
+                            "intensity": ex.intensity,
+                            "notes": ex.notes or "",
+                        }
+                        for ex in sorted(day.exercises.all(), key=lambda e: e.order)
+                    ],
+                }
+                for day in sorted(program.days.all(), key=lambda d: d.day_number)
+            ],
+        }
+        AIProgram.objects.filter(pk=program.pk).update(raw_json=program.raw_json)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_program_generator', '0003_programtemplate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiprogram',
+            name='document_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(materialize_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.3 on 2026-10-17 18:40
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def prepare_pending_jobs(apps, schema_editor):
+    GenerationJob = apps.get_model("ai_program_generator", "GenerationJob")
+    # Running jobs start out with the heartbeat of their claim
+    GenerationJob.objects.filter(status="running").update(heartbeat_at=F("started_at"))
+    # Duplicates queued before the constraint: keep each user's newest
+    # (the one enqueue_generation returned), fail the rest
+    seen, duplicates = set(), []
+    pending = GenerationJob.objects.filter(status__in=["queued", "running"]).order_by("user_id", "-created_at")
+    for job_id, user_id in pending.values_list("id", "user_id"):
+        if user_id in seen:
+            duplicates.append(job_id)
+        seen.add(user_id)
+    GenerationJob.objects.filter(id__in=duplicates).update(
+        status="failed", error="Superseded by a newer pending job", finished_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_program_generator', '0004_aiprogram_document_version'),
+        ('users', '0014_addon_balance_reads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(prepare_pending_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='generationjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('user',), name='generation_job_one_pending_per_user'),
+        ),
+    ]
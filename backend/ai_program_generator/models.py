@@ -1,5 +1,7 @@
 # ai_program_generator/models.py
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from users.models import User
 import json
 
@@ -30,8 +32,11 @@ class AIProgram(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
-    # Backup: store the full raw JSON for debugging/future use
+    # Materialized program document ({"program_summary", "week_plan"}), served
+    # as-is by get_active_program. ProgramDay/Exercise rows stay the write
+    # model; the document is rebuilt and the version bumped when they change.
     raw_json = models.JSONField(null=True, blank=True)
+    document_version = models.PositiveIntegerField(default=1)
 
     class Meta:
         ordering = ["-created_at"]
@@ -109,4 +114,131 @@ class Exercise(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.exercise_name} ({self.program_day.day_name})"
\ No newline at end of file
+        return f"{self.exercise_name} ({self.program_day.day_name})"
+
+
+class GenerationJob(models.Model):
+    """
+    A queued AI program generation. Created by the API (202 Accepted) and
+    processed by the `run_generation_worker` management command, so the
+    web workers never wait on Ollama.
+    """
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="generation_jobs")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    program = models.ForeignKey(
+        AIProgram, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    error = models.TextField(blank=True)
+    error_details = models.JSONField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker holding the job; see jobs.requeue_stale_jobs
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["user", "-created_at"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user"],
+                condition=models.Q(status__in=["queued", "running"]),
+                name="generation_job_one_pending_per_user",
+            ),
+        ]
+
+    def __str__(self):
+        return f"GenerationJob({self.user.email}, {self.status})"
+
+
+
+def _origin_model(origin):
+    # post_delete's `origin` is the instance or queryset delete() was called on
+    return getattr(origin, "model", type(origin))
+
+
+@receiver(post_save, sender=ProgramDay)
+@receiver(post_delete, sender=ProgramDay)
+@receiver(post_save, sender=Exercise)
+@receiver(post_delete, sender=Exercise)
+def sync_program_document(sender, instance, origin=None, **kwargs):
+    """
+    Keep AIProgram.raw_json and document_version in step with edits to
+    days/exercises. bulk_create and queryset.update() bypass this; callers
+    using them must call read_model.refresh_program_document themselves.
+    """
+    if origin is not None and _origin_model(origin) not in (ProgramDay, Exercise):
+        return  # cascade from deleting the program or its user
+    if sender is Exercise and origin is not None and _origin_model(origin) is ProgramDay:
+        return  # the day's own post_delete refreshes the document
+
+    from ai_program_generator.read_model import refresh_program_document
+
+    if sender is ProgramDay:
+        program_id = instance.program_id
+    else:
+        program_id = (
+            ProgramDay.objects.filter(id=instance.program_day_id)
+            .values_list("program_id", flat=True)
+            .first()
+        )
+    if program_id:
+        refresh_program_document(program_id)
+
+class ProgramTemplate(models.Model):
+    """
+    A validated generated program, addressed by the fingerprint of the
+    (bucketed) profile inputs and prompt/model version that produced it.
+    Users whose profiles share a fingerprint get a copy of this program
+    instead of a new LLM generation (see program_cache.py).
+    """
+    fingerprint = models.CharField(max_length=64, unique=True)
+    prompt_version = models.CharField(max_length=20)
+    model_name = models.CharField(max_length=100)
+    profile_key = models.JSONField(help_text="Normalized profile inputs behind the fingerprint")
+    program_json = models.JSONField()
+
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["last_used_at"]),
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self):
+        return f"ProgramTemplate({self.fingerprint[:12]}, hits={self.hit_count})"
+
+
+class ProgramCacheStats(models.Model):
+    """Daily hit/miss counters for the program template cache."""
+    date = models.DateField(unique=True)
+    hits = models.PositiveIntegerField(default=0)
+    misses = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-date"]
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self):
+        return f"{self.date}: {self.hits} hits / {self.misses} misses"
+
@@ -0,0 +1,227 @@
+# ai_program_generator/ollama_pool.py
+"""
+Registry of the Ollama model servers generation is spread over.
+
+settings.OLLAMA_URLS lists the nodes (OLLAMA_URLS="http://gpu1:11434,
+http://gpu2:11434", falling back to OLLAMA_URL). Every generation call
+leases a node from the pool:
+
+    with get_ollama_pool().lease() as lease:
+        ... request to f"{lease.url}/api/generate" ...
+
+The lease picks the least-loaded available node (fewest requests in
+flight, then lowest rolling latency over the last OLLAMA_LATENCY_WINDOW
+successful calls) and records the outcome when the block exits:
+  - an exception escaping the block (or `lease.fail()`) counts as a failure;
+    OLLAMA_BREAKER_FAILURES consecutive failures open the node's circuit
+    breaker and eject it for OLLAMA_BREAKER_COOLDOWN seconds
+  - after the cooldown the node is half-open: one request is let through
+    as a trial and its outcome closes or re-opens the breaker
+  - GET /api/tags probes run in a background thread every
+    OLLAMA_HEALTH_INTERVAL seconds (0 disables them); a node that does not
+    answer or does not serve the model is marked down until a probe succeeds
+
+When no node is available the lease raises GenerationError (503) straight
+away instead of waiting on a dead server. The pool is per process, like
+the JWKS store and the coach roster.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from users.outbound_http import get_session
+
+
+class OllamaNode:
+    """One model server: load, rolling latency, probe state and circuit breaker."""
+
+    def __init__(self, url, latency_window):
+        self.url = url.rstrip("/")
+        self.in_flight = 0
+        self.latencies = deque(maxlen=latency_window)  # seconds, successful calls
+        self.failures = 0  # consecutive
+        self.open_until = None  # breaker open (ejected) until this monotonic time
+        self.healthy = True  # last probe result; optimistic until probed
+
+    @property
+    def latency(self):
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    def snapshot(self, now):
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "breaker": "closed" if self.open_until is None else ("open" if now < self.open_until else "half-open"),
+            "in_flight": self.in_flight,
+            "latency_ms": round(self.latency * 1000, 1),
+            "failures": self.failures,
+        }
+
+
+class Lease:
+    """One call's hold on a node."""
+
+    def __init__(self, node):
+        self.node = node
+        self.url = node.url
+        self.failed = False
+
+    def fail(self):
+        """Count the call as a failure even though no exception escaped the lease."""
+        self.failed = True
+
+
+class OllamaPool:
+    """Thread-safe least-loaded router over OllamaNodes."""
+
+    def __init__(self, urls, model, failure_threshold=3, cooldown=30, health_interval=15,
+                 latency_window=20, probe_timeout=2):
+        self.nodes = [OllamaNode(url, latency_window) for url in urls]
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.health_interval = health_interval
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._last_probe_at = None
+        self._probing = False
+
+    # -- routing ----------------------------------------------------------
+
+    def _available(self, node, now):
+        return node.healthy and (node.open_until is None or now >= node.open_until)
+
+    def _pick(self):
+        now = time.monotonic()
+        with self._lock:
+            candidates = [n for n in self.nodes if self._available(n, now)]
+            if not candidates:
+                return None
+            node = min(candidates, key=lambda n: (n.in_flight, n.latency, self.nodes.index(n)))
+            if node.open_until is not None:
+                # Half-open: this request is the trial, hold the others off meanwhile
+                node.open_until = now + self.cooldown
+            node.in_flight += 1
+            return node
+
+    def _release(self, node):
+        with self._lock:
+            node.in_flight -= 1
+
+    def _finish(self, node, elapsed, failed):
+        with self._lock:
+            node.in_flight -= 1
+            if failed:
+                node.failures += 1
+                if node.failures >= self.failure_threshold:
+                    node.open_until = time.monotonic() + self.cooldown
+            else:
+                node.failures = 0
+                node.open_until = None
+                node.latencies.append(elapsed)
+
+    @contextmanager
+    def lease(self):
+        """Yield a Lease on the node to send one generation request to (see module docstring)."""
+        from .services import GenerationError
+
+        self._maybe_probe()
+        node = self._pick()
+        if node is None:
+            raise GenerationError("No Ollama backend available. Try again later.", status=503)
+
+        lease = Lease(node)
+        started = time.monotonic()
+        try:
+            yield lease
+        except Exception:
+            self._finish(node, time.monotonic() - started, failed=True)
+            raise
+        except BaseException:  # cancelled / stream closed by the client: not the node's fault
+            self._release(node)
+            raise
+        else:
+            self._finish(node, time.monotonic() - started, failed=lease.failed)
+
+    # -- health probes ----------------------------------------------------
+
+    def probe(self):
+        """GET /api/tags on every node and update its health. Returns the snapshots."""
+        for node in self.nodes:
+            healthy = self._probe_node(node)
+            with self._lock:
+                node.healthy = healthy
+                if healthy and node.open_until is not None:
+                    node.failures = 0
+                    node.open_until = None
+        with self._lock:
+            self._last_probe_at = time.monotonic()
+        return self.status()
+
+    def _probe_node(self, node):
+        try:
+            resp = get_session("ollama").get(
+                f"{node.url}/api/tags", timeout=(self.probe_timeout, self.probe_timeout)
+            )
+            if resp.status_code != 200:
+                return False
+            models = resp.json().get("models") or []
+        except Exception:
+            return False
+        return any(self.model in (m.get("name"), m.get("model")) for m in models)
+
+    def _maybe_probe(self):
+        if not self.health_interval:
+            return
+        with self._lock:
+            due = self._last_probe_at is None or time.monotonic() - self._last_probe_at >= self.health_interval
+            if not due or self._probing:
+                return
+            self._probing = True
+
+        def _run():
+            try:
+                self.probe()
+            finally:
+                with self._lock:
+                    self._probing = False
+
+        threading.Thread(target=_run, name="ollama-probe", daemon=True).start()
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            return [node.snapshot(now) for node in self.nodes]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ollama_pool():
+    """Return the process-wide pool over settings.OLLAMA_URLS, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from .services import OLLAMA_MODEL
+
+                _pool = OllamaPool(
+                    settings.OLLAMA_URLS,
+                    OLLAMA_MODEL,
+                    failure_threshold=settings.OLLAMA_BREAKER_FAILURES,
+                    cooldown=settings.OLLAMA_BREAKER_COOLDOWN,
+                    health_interval=settings.OLLAMA_HEALTH_INTERVAL,
+                    latency_window=settings.OLLAMA_LATENCY_WINDOW,
+                )
+    return _pool
+
+
+def reset_ollama_pool():
+    """Drop the process-wide pool (used by tests and settings changes)."""
+    global _pool
+    with _pool_lock:
+        _pool = None
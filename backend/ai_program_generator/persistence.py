@@ -0,0 +1,84 @@
+# ai_program_generator/persistence.py
+"""
+Writes a validated program document (program_summary + week_plan) to the
+AIProgram / ProgramDay / Exercise tables.
+
+Days and exercises are inserted with one bulk_create each, so a program
+costs a fixed handful of statements (deactivate previous, insert program,
+insert days, insert exercises) however many exercises it has. Every path
+that materializes a program (generation, cache clones, imports) goes
+through persist_program.
+"""
+from collections import namedtuple
+
+from django.db import connection, transaction
+
+from .models import AIProgram, ProgramDay, Exercise
+from .read_model import materialize_document
+
+
+PersistedProgram = namedtuple("PersistedProgram", ["program", "day_ids", "exercise_ids"])
+
+
+def persist_program(user, program_data, is_active=True):
+    """
+    Insert `program_data` for `user` in one transaction.
+    Returns PersistedProgram(program, day_ids, exercise_ids), ids in week_plan order.
+    """
+    summary = program_data["program_summary"]
+    week_plan = program_data["week_plan"]
+
+    with transaction.atomic():
+        # AIProgram.save() deactivates the user's other programs when is_active
+        program = AIProgram(
+            user=user,
+            goal=summary["goal"],
+            difficulty=summary["difficulty"].lower(),
+            is_active=is_active,
+            raw_json=materialize_document(program_data),
+        )
+        program.save()
+
+        days = ProgramDay.objects.bulk_create([
+            ProgramDay(
+                program=program,
+                day_number=day_idx + 1,
+                day_name=day_data["day_name"],
+                focus=day_data["focus"],
+                is_rest_day=day_data["is_rest_day"],
+            )
+            for day_idx, day_data in enumerate(week_plan)
+        ])
+        _ensure_pks(days, ProgramDay.objects.filter(program=program).order_by("day_number"))
+
+        exercises = Exercise.objects.bulk_create([
+            Exercise(
+                program_day=day,
+                order=exercise_idx + 1,
+                exercise_name=exercise_data["exercise_name"],
+                sets=exercise_data["sets"],
+                reps=exercise_data["reps"],
+                intensity=exercise_data["intensity"],
+                notes=exercise_data.get("notes", ""),
+            )
+            for day, day_data in zip(days, week_plan)
+            # Rest days keep no exercises
+            if not day_data["is_rest_day"]
+            for exercise_idx, exercise_data in enumerate(day_data["sessions"])
+        ])
+        if exercises:
+            _ensure_pks(
+                exercises,
+                Exercise.objects.filter(program_day__program=program).order_by("program_day__day_number", "order"),
+            )
+
+    return PersistedProgram(program, [d.pk for d in days], [e.pk for e in exercises])
+
+
+def _ensure_pks(objs, ordered_qs):
+    # PostgreSQL and SQLite >= 3.35 return ids from bulk INSERT; other
+    # backends need one extra SELECT to learn them.
+    if connection.features.can_return_rows_from_bulk_insert:
+        return
+    for obj, pk in zip(objs, ordered_qs.values_list("pk", flat=True)):
+        obj.pk = pk
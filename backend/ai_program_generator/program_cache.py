@@ -0,0 +1,159 @@
+# ai_program_generator/program_cache.py
+"""
+Content-addressed cache of generated programs.
+
+Most of what goes into the generation prompt is a handful of categorical
+profile fields plus a few numbers, so many users end up asking the model the
+same question. A fingerprint of the bucketed profile inputs, the prompt
+version and the model name addresses a ProgramTemplate row; on a hit the
+template is copied into the user's own AIProgram and Ollama is not called.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ProgramCacheStats, ProgramTemplate
+
+# UserProfile fields that feed build_program_prompt.
+PROFILE_FIELDS = (
+    "age",
+    "height_cm",
+    "weight_kg",
+    "fitness_level",
+    "primary_goal",
+    "workout_frequency",
+    "daily_activity_level",
+    "sleep_hours",
+    "body_type",
+    "body_fat_percentage",
+)
+
+
+def _bucket(value, width):
+    if value is None or not width:
+        return value
+    low = int(value // width * width)
+    return f"{low}-{low + width}"
+
+
+def normalize_profile(profile, buckets=None):
+    """Profile inputs with numeric fields collapsed into configured buckets."""
+    buckets = settings.PROGRAM_CACHE_BUCKETS if buckets is None else buckets
+    key = {}
+    for field in PROFILE_FIELDS:
+        value = getattr(profile, field)
+        if isinstance(value, str):
+            value = value.strip().lower()
+        key[field] = _bucket(value, buckets.get(field))
+    return key
+
+
+class ProgramTemplateCache:
+    """DB-backed program cache for one prompt version / model pair."""
+
+    def __init__(self, prompt_version, model_name):
+        self.prompt_version = prompt_version
+        self.model_name = model_name
+
+    def fingerprint(self, profile_key):
+        blob = json.dumps(
+            {"prompt": self.prompt_version, "model": self.model_name, "profile": profile_key},
+            sort_keys=True,
+        )
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def get(self, profile):
+        """Program JSON cached for this profile, or None. Records a hit or miss."""
+        if not settings.PROGRAM_CACHE_ENABLED:
+            return None
+
+        fingerprint = self.fingerprint(normalize_profile(profile))
+        template = ProgramTemplate.objects.filter(fingerprint=fingerprint).first()
+        if template and template.created_at < self._expiry_cutoff():
+            template.delete()
+            template = None
+
+        if template is None:
+            _record(misses=1)
+            return None
+
+        ProgramTemplate.objects.filter(pk=template.pk).update(
+            hit_count=F("hit_count") + 1, last_used_at=timezone.now()
+        )
+        _record(hits=1)
+        return template.program_json
+
+    def put(self, profile, program_data):
+        """Store a validated program for this profile and enforce the size bound."""
+        if not settings.PROGRAM_CACHE_ENABLED:
+            return None
+
+        profile_key = normalize_profile(profile)
+        template, _ = ProgramTemplate.objects.update_or_create(
+            fingerprint=self.fingerprint(profile_key),
+            defaults={
+                "prompt_version": self.prompt_version,
+                "model_name": self.model_name,
+                "profile_key": profile_key,
+                "program_json": program_data,
+            },
+        )
+        evict()
+        return template
+
+    def _expiry_cutoff(self):
+        return timezone.now() - timedelta(seconds=settings.PROGRAM_CACHE_TTL)
+
+
+def evict(max_entries=None, ttl=None):
+    """
+    Drop templates older than the TTL, then the least recently used ones
+    beyond `max_entries`. Returns the number of rows deleted.
+    """
+    max_entries = settings.PROGRAM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    ttl = settings.PROGRAM_CACHE_TTL if ttl is None else ttl
+
+    deleted, _ = ProgramTemplate.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=ttl)
+    ).delete()
+
+    overflow = ProgramTemplate.objects.count() - max_entries
+    if overflow > 0:
+        lru = ProgramTemplate.objects.order_by("last_used_at", "id").values_list("id", flat=True)[:overflow]
+        more, _ = ProgramTemplate.objects.filter(id__in=list(lru)).delete()
+        deleted += more
+    return deleted
+
+
+def _record(hits=0, misses=0):
+    today = timezone.localdate()
+    updated = ProgramCacheStats.objects.filter(date=today).update(
+        hits=F("hits") + hits, misses=F("misses") + misses
+    )
+    if not updated:
+        stats, created = ProgramCacheStats.objects.get_or_create(
+            date=today, defaults={"hits": hits, "misses": misses}
+        )
+        if not created:
+            ProgramCacheStats.objects.filter(pk=stats.pk).update(
+                hits=F("hits") + hits, misses=F("misses") + misses
+            )
+
+
+def cache_stats(days=7):
+    """Hit/miss totals over the last `days` days plus the current cache size."""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    rows = list(ProgramCacheStats.objects.filter(date__gte=since))
+    hits = sum(r.hits for r in rows)
+    misses = sum(r.misses for r in rows)
+    return {
+        "days": rows,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "entries": ProgramTemplate.objects.count(),
+    }
@@ -0,0 +1,145 @@
+# ai_program_generator/read_model.py
+"""
+Read side of a program.
+
+The program document ({"program_summary", "week_plan"}) is materialized in
+AIProgram.raw_json, so the hot path (program_document_json) is a single
+primary-key row whose JSON text is spliced into the response unparsed.
+load_program_document rebuilds the same document from the relational rows
+in three fixed queries (program, days, exercises); it backs
+refresh_program_document and programs whose document is missing.
+"""
+import json
+from collections import defaultdict
+
+from django.db.models import F, TextField
+from django.db.models.functions import Cast
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import AIProgram, ProgramDay, Exercise
+
+
+DAY_FIELDS = ("id", "day_name", "focus", "is_rest_day")
+EXERCISE_FIELDS = ("program_day_id", "exercise_name", "sets", "reps", "intensity", "notes")
+
+
+def load_program_document(programs):
+    """
+    First program of the `programs` queryset as
+    {"program_id", "program_summary", "created_at", "week_plan"}, or None.
+    """
+    program = programs.values("id", "goal", "difficulty", "created_at").first()
+    if program is None:
+        return None
+
+    days = list(
+        ProgramDay.objects.filter(program_id=program["id"])
+        .order_by("day_number")
+        .values(*DAY_FIELDS)
+    )
+
+    sessions = defaultdict(list)
+    exercises = (
+        Exercise.objects.filter(program_day_id__in=[day["id"] for day in days])
+        .order_by("program_day_id", "order")
+        .values_list(*EXERCISE_FIELDS)
+    )
+    for day_id, name, sets, reps, intensity, notes in exercises:
+        sessions[day_id].append({
+            "exercise_name": name,
+            "sets": sets,
+            "reps": reps,
+            "intensity": intensity,
+            "notes": notes or "",
+        })
+
+    return {
+        "program_id": program["id"],
+        "program_summary": {
+            "goal": program["goal"],
+            "difficulty": program["difficulty"],
+        },
+        "created_at": program["created_at"],
+        "week_plan": [
+            {
+                "day_name": day["day_name"],
+                "focus": day["focus"],
+                "is_rest_day": day["is_rest_day"],
+                "sessions": sessions[day["id"]],
+            }
+            for day in days
+        ],
+    }
+
+
+def materialize_document(program_data):
+    """
+    Normalized document stored in raw_json for a validated program, shaped
+    exactly like the week_plan load_program_document builds from the rows.
+    """
+    summary = program_data["program_summary"]
+    return {
+        "program_summary": {
+            "goal": summary["goal"],
+            "difficulty": summary["difficulty"].lower(),
+        },
+        "week_plan": [
+            {
+                "day_name": day["day_name"],
+                "focus": day["focus"],
+                "is_rest_day": day["is_rest_day"],
+                "sessions": [] if day["is_rest_day"] else [
+                    {
+                        "exercise_name": ex["exercise_name"],
+                        "sets": int(ex["sets"]),
+                        "reps": ex["reps"],
+                        "intensity": ex["intensity"],
+                        "notes": ex.get("notes") or "",
+                    }
+                    for ex in day["sessions"]
+                ],
+            }
+            for day in program_data["week_plan"]
+        ],
+    }
+
+
+def refresh_program_document(program_id):
+    """Rebuild raw_json from the relational rows and bump document_version."""
+    document = load_program_document(AIProgram.objects.filter(id=program_id))
+    if document is None:
+        return
+    AIProgram.objects.filter(id=program_id).update(
+        raw_json={"program_summary": document["program_summary"], "week_plan": document["week_plan"]},
+        document_version=F("document_version") + 1,
+    )
+
+
+def program_document_json(programs):
+    """
+    First program of `programs` as a JSON response body (bytes), or None.
+    The stored document is read as text and spliced in without a parse.
+    """
+    row = (
+        programs.annotate(document=Cast("raw_json", output_field=TextField()))
+        .values_list("id", "created_at", "document_version", "document")
+        .first()
+    )
+    if row is None:
+        return None
+    program_id, created_at, version, document = row
+
+    if not document or not document.lstrip().startswith("{"):
+        # Not materialized yet: build it from the rows once and store it
+        refresh_program_document(program_id)
+        document = json.dumps(AIProgram.objects.values_list("raw_json", flat=True).get(id=program_id))
+        version += 1
+
+    head = json.dumps(
+        {"program_id": program_id, "created_at": created_at, "document_version": version},
+        cls=JSONEncoder,
+    )
+    body = document.strip()[1:].lstrip()
+    if body == "}":
+        return head.encode()
+    return (head[:-1] + ", " + body).encode()
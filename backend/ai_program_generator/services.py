@@ -0,0 +1,401 @@
+# ai_program_generator/services.py
+"""
+Program generation pipeline shared by the HTTP views and the background
+worker: prompt building, the Ollama call, response parsing/validation and
+persistence.
+"""
+import json
+import re
+
+import httpx
+import requests
+from django.conf import settings
+from django.db import transaction
+
+from users.async_http import get_async_client
+from users.outbound_http import get_session
+from users.models import UserProfile
+from .ollama_pool import get_ollama_pool
+from .persistence import persist_program
+from .program_cache import ProgramTemplateCache
+
+
+OLLAMA_MODEL = "llama3.1:8b"
+OLLAMA_OPTIONS = {
+    "num_predict": 3500,
+    "temperature": 0.3,
+    "top_p": 0.9,
+    "top_k": 40
+}
+OLLAMA_TIMEOUT = settings.OUTBOUND_HTTP_TIMEOUTS["ollama"][1]  # 3 minutes by default for large responses
+# Bump whenever build_program_prompt changes so cached programs are not reused.
+PROMPT_VERSION = "1"
+
+program_cache = ProgramTemplateCache(prompt_version=PROMPT_VERSION, model_name=OLLAMA_MODEL)
+
+
+class GenerationError(Exception):
+    """A generation step failed; carries the HTTP status and details to report."""
+
+    def __init__(self, message, status=502, details=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.details = details or {}
+
+    def as_response_data(self):
+        return {"error": self.message, **self.details}
+
+
+_SETS_RE = re.compile(r"(\d+)(?:\s*[-\u2013]\s*\d+)?")
+
+
+def _coerce_sets(value):
+    """
+    Exercise.sets is an integer column: 3, 3.0 and "3" give 3, a range such
+    as "3-4" its lower bound. Returns None for anything else.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if value >= 0 else None
+    if isinstance(value, float):
+        return int(value) if value.is_integer() and value >= 0 else None
+    if isinstance(value, str):
+        match = _SETS_RE.fullmatch(value.strip())
+        return int(match.group(1)) if match else None
+    return None
+
+
+def _coerce_text(value, max_length=None):
+    """Scalars become strings (reps: 10 -> "10"); None for other types or too long."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str) or (max_length and len(value) > max_length):
+        return None
+    return value
+
+
+def validate_program_json(data):
+    """
+    Validate that the JSON matches our expected structure, coercing exercise
+    fields to the types of their columns in place (see _coerce_sets).
+    Returns (is_valid, error_message).
+    """
+    if not isinstance(data, dict):
+        return False, "Response is not a JSON object"
+
+    # Check top-level keys
+    if "program_summary" not in data or "week_plan" not in data:
+        return False, "Missing 'program_summary' or 'week_plan'"
+
+    summary = data["program_summary"]
+    if not isinstance(summary, dict) or "goal" not in summary or "difficulty" not in summary:
+        return False, "Invalid 'program_summary' structure"
+
+    # Check week_plan
+    week_plan = data["week_plan"]
+    if not isinstance(week_plan, list) or len(week_plan) != 7:
+        return False, f"'week_plan' must be a list of 7 days, got {len(week_plan) if isinstance(week_plan, list) else 'not a list'}"
+
+    # Validate each day
+    required_day_keys = ["day_name", "focus", "is_rest_day", "sessions"]
+    for idx, day in enumerate(week_plan):
+        if not isinstance(day, dict):
+            return False, f"Day {idx + 1} is not a JSON object"
+
+        for key in required_day_keys:
+            if key not in day:
+                return False, f"Day {idx + 1} missing key '{key}'"
+
+        # Validate sessions
+        if not isinstance(day["sessions"], list):
+            return False, f"Day {idx + 1} 'sessions' is not a list"
+
+        for session_idx, session in enumerate(day["sessions"]):
+            where = f"Day {idx + 1}, Session {session_idx + 1}"
+            if not isinstance(session, dict):
+                return False, f"{where} is not a JSON object"
+            required_session_keys = ["exercise_name", "sets", "reps", "intensity", "notes"]
+            for key in required_session_keys:
+                if key not in session:
+                    return False, f"{where} missing key '{key}'"
+
+            sets = _coerce_sets(session["sets"])
+            if sets is None:
+                return False, f"{where} 'sets' must be a whole number, got {session['sets']!r}"
+            session["sets"] = sets
+            if session["notes"] is None:
+                session["notes"] = ""
+            for key, max_length in (("exercise_name", 200), ("reps", 100), ("intensity", 100), ("notes", None)):
+                value = _coerce_text(session[key], max_length)
+                if value is None:
+                    return False, f"{where} '{key}' must be text, got {session[key]!r}"
+                session[key] = value
+
+    return True, None
+
+
+def build_program_prompt(profile):
+    """Build the JSON-structure-enforced prompt for a UserProfile."""
+    # -------------------------------
+    # Build user data block
+    # -------------------------------
+    user_block = f"""
+User Profile:
+- Age: {profile.age}
+- Height: {profile.height_cm} cm
+- Weight: {profile.weight_kg} kg
+- Fitness Level: {profile.fitness_level}
+- Primary Goal: {profile.primary_goal.replace('_', ' ').title()}
+- Workout Frequency: {profile.workout_frequency}
+- Daily Activity Level: {profile.daily_activity_level.replace('_', ' ').title()}
+- Sleep Hours: {profile.sleep_hours}
+"""
+    if profile.body_type:
+        user_block += f"- Body Type: {profile.body_type.replace('_', ' ').title()}\n"
+    if profile.body_fat_percentage:
+        user_block += f"- Body Fat %: {profile.body_fat_percentage}\n"
+
+    # -------------------------------
+    # JSON STRUCTURE ENFORCED PROMPT
+    # -------------------------------
+    prompt = f"""
+    You are an expert strength and conditioning coach.
+
+    Based on the following user data, create a 7-day personalized fitness program:
+
+    {user_block}
+
+    CRITICAL REQUIREMENTS:
+    1. Return ONLY valid JSON (no markdown, no explanations)
+    2. Include EXACTLY 7 days (Monday-Sunday)
+    3. Each TRAINING day must have AT LEAST 5 exercises
+    4. Rest days should have "is_rest_day": true and empty sessions
+    5. Use lowercase for difficulty: "beginner", "intermediate", or "advanced"
+
+    JSON STRUCTURE (MUST FOLLOW EXACTLY):
+
+    {{
+      "program_summary": {{
+        "goal": "clear objective based on user's primary_goal",
+        "difficulty": "beginner" | "intermediate" | "advanced"
+      }},
+      "week_plan": [
+        {{
+          "day_name": "Monday",
+          "focus": "e.g., Upper Body Strength",
+          "is_rest_day": false,
+          "sessions": [
+            {{
+              "exercise_name": "Exercise 1",
+              "sets": 3,
+              "reps": "8-12",
+              "intensity": "RPE 7-8",
+              "notes": "Short tip"
+            }},
+            {{
+              "exercise_name": "Exercise 2",
+              "sets": 3,
+              "reps": "8-12",
+              "intensity": "moderate",
+              "notes": ""
+            }},
+            {{
+              "exercise_name": "Exercise 3",
+              "sets": 3,
+              "reps": "8-12",
+              "intensity": "moderate",
+              "notes": ""
+            }},
+            {{
+              "exercise_name": "Exercise 4",
+              "sets": 3,
+              "reps": "8-12",
+              "intensity": "moderate",
+              "notes": ""
+            }}
+          ]
+        }},
+        ... (repeat for all 7 days)
+      ]
+    }}
+
+    IMPORTANT: 
+    - Make sure to take in consideration the user data and his goal
+    - Training days MUST  have 5 exercices
+    - Include 2-3 rest days in the week
+    - Keep notes short (under 10 words) or empty
+    - Respond with ONLY the JSON object, nothing else
+    """
+    return prompt
+
+
+def _generate_body(prompt, stream):
+    return {
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": stream,
+        "options": OLLAMA_OPTIONS,
+    }
+
+
+def _stream_line(line):
+    """
+    Parse one NDJSON line of a streamed generation ({"response": "...",
+    "done": false}). Returns (text chunk, done).
+    """
+    data = json.loads(line)
+    if data.get("error"):
+        raise GenerationError("Ollama reported an error", details={"ollama_error": data["error"]})
+    return data.get("response") or "", bool(data.get("done"))
+
+
+def call_ollama(prompt):
+    """Run the prompt through Ollama and return the raw response text."""
+    # The lease routes to the least-loaded healthy node and feeds its breaker
+    with get_ollama_pool().lease() as lease:
+        try:
+            # Pooled keep-alive session; its default timeouts are OUTBOUND_HTTP_TIMEOUTS["ollama"]
+            ollama_resp = get_session("ollama").post(
+                f"{lease.url}/api/generate",
+                json=_generate_body(prompt, stream=False),
+            )
+        except requests.exceptions.Timeout:
+            raise GenerationError("Ollama request timed out. Try again.", status=504)
+        except requests.exceptions.RequestException as e:
+            raise GenerationError(f"Failed to connect to Ollama: {str(e)}", status=502)
+
+        if ollama_resp.status_code != 200:
+            raise GenerationError("Ollama returned non-200 status", details={
+                "status_code": ollama_resp.status_code,
+                "body": ollama_resp.text,
+            })
+
+    data = ollama_resp.json()
+    raw_text = (data.get("response") or "").strip()
+    if not raw_text:
+        raise GenerationError("Empty content from Ollama", details={"ollama_raw": data})
+    return raw_text
+
+
+async def astream_ollama(prompt):
+    """
+    Run the prompt through Ollama with "stream": true and yield the response
+    text chunk by chunk as the model produces it. The request goes through
+    the shared httpx client (users/async_http.py), so waiting on the model
+    holds a pooled connection and a coroutine, not a thread. The node comes
+    from the Ollama pool like call_ollama's.
+    """
+    # The read timeout applies between chunks, not to the whole body
+    timeout = httpx.Timeout(OLLAMA_TIMEOUT, connect=settings.ASYNC_HTTP_CONNECT_TIMEOUT)
+    received = False
+    with get_ollama_pool().lease() as lease:
+        try:
+            async with get_async_client().stream(
+                "POST",
+                f"{lease.url}/api/generate",
+                json=_generate_body(prompt, stream=True),
+                timeout=timeout,
+            ) as ollama_resp:
+                if ollama_resp.status_code != 200:
+                    body = await ollama_resp.aread()
+                    raise GenerationError("Ollama returned non-200 status", details={
+                        "status_code": ollama_resp.status_code,
+                        "body": body.decode(errors="replace"),
+                    })
+
+                async for line in ollama_resp.aiter_lines():
+                    if not line:
+                        continue
+                    chunk, done = _stream_line(line)
+                    if chunk:
+                        received = True
+                        yield chunk
+                    if done:
+                        break
+        except httpx.TimeoutException:
+            raise GenerationError("Ollama request timed out. Try again.", status=504)
+        except httpx.HTTPError as e:
+            if received:
+                raise GenerationError(f"Ollama stream interrupted: {str(e)}", status=502)
+            raise GenerationError(f"Failed to connect to Ollama: {str(e)}", status=502)
+        except json.JSONDecodeError as e:
+            raise GenerationError("Ollama sent an unreadable stream chunk", details={"json_error": str(e)})
+
+    if not received:
+        raise GenerationError("Empty content from Ollama")
+
+
+def parse_program_response(raw_text):
+    """Strip code fences, parse and validate the model output."""
+    # -------------------------------
+    # Clean possible code fences
+    # -------------------------------
+    cleaned = raw_text.strip()
+
+    if cleaned.startswith("```"):
+        cleaned = cleaned.lstrip("`").lstrip()
+        if cleaned.lower().startswith("json"):
+            cleaned = cleaned[4:].lstrip("\r\n ").lstrip()
+        if cleaned.endswith("```"):
+            cleaned = cleaned[:-3].rstrip()
+
+    # -------------------------------
+    # Parse JSON
+    # -------------------------------
+    try:
+        program_data = json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        raise GenerationError("Model returned invalid JSON", details={
+            "json_error": str(e),
+            "raw_response": raw_text[:500],  # First 500 chars
+            "cleaned_attempt": cleaned[:500],
+        })
+
+    # -------------------------------
+    # Validate JSON structure
+    # -------------------------------
+    is_valid, validation_error = validate_program_json(program_data)
+    if not is_valid:
+        raise GenerationError("Generated program has invalid structure", details={
+            "validation_error": validation_error,
+            "program_data": program_data,
+        })
+    return program_data
+
+
+def save_program(user, program_data):
+    """Persist a validated program as the user's active AIProgram."""
+    return persist_program(user, program_data).program
+
+
+def get_user_profile(user):
+    profile = UserProfile.objects.filter(user=user).first()
+    if not profile:
+        raise GenerationError("User profile not found. Complete onboarding first.", status=400)
+    return profile
+
+
+def generate_program(user, on_saved=None):
+    """
+    Full pipeline: profile -> (program cache | prompt -> Ollama -> parse) -> save.
+    A generated program is only cached once it has been saved, so a document
+    that validates but cannot be persisted is never replayed to other users.
+    `on_saved(program)` runs in the save's transaction; an exception raised
+    there rolls the program back. Returns (AIProgram, data).
+    """
+    profile = get_user_profile(user)
+    program_data = program_cache.get(profile)
+    cached = program_data is not None
+    if not cached:
+        raw_text = call_ollama(build_program_prompt(profile))
+        program_data = parse_program_response(raw_text)
+
+    with transaction.atomic():
+        program = save_program(user, program_data)
+        if on_saved is not None:
+            on_saved(program)
+    if not cached:
+        program_cache.put(profile, program_data)
+    return program, program_data
@@ -0,0 +1,148 @@
+# ai_program_generator/streaming.py
+"""
+Server-Sent Events streaming of a program generation.
+
+Ollama streams the model output as NDJSON chunks; we forward each chunk to
+the browser as a `token` event and, in parallel, scan the accumulated text
+for the `week_plan` array so every day can be sent as a `day` event as soon
+as its closing brace arrives. The full program is only persisted once the
+stream is complete and the whole document validates.
+
+`astream_program_events` runs on the event loop of the ASGI view (fed by
+services.astream_ollama) and only leaves it to save the program.
+"""
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+
+from .services import GenerationError, parse_program_response, save_program
+
+logger = logging.getLogger(__name__)
+
+
+class WeekPlanStreamParser:
+    """
+    Incrementally extracts the objects of the top-level "week_plan" array
+    from a JSON document that arrives in arbitrary chunks.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0            # next character to scan
+        self._in_array = False   # inside the week_plan [...]
+        self._done = False       # week_plan closed
+        self._depth = 0          # brace depth inside the array
+        self._start = None       # offset of the current day's "{"
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk):
+        """Append `chunk`; return the day dicts completed by it."""
+        self.text += chunk
+        if self._done:
+            return []
+
+        if not self._in_array:
+            key = self.text.find('"week_plan"')
+            if key == -1:
+                return []
+            bracket = self.text.find("[", key)
+            if bracket == -1:
+                return []
+            self._in_array = True
+            self._pos = bracket + 1
+
+        days = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        days.append(json.loads(text[self._start:i + 1]))
+                    except json.JSONDecodeError:
+                        pass  # malformed day; the final validation reports it
+            elif ch == "]" and self._depth == 0:
+                self._done = True
+                break
+        self._pos = len(text)
+        return days
+
+
+def sse_event(event, data):
+    """Format one SSE frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class ProgramEventStream:
+    """
+    SSE frames of one generation: `token` per chunk, `day` per completed
+    week_plan entry, then either `done` (program saved) or `error`.
+    `on_saved(program_data)` is called once the full program has validated
+    and been saved.
+    """
+
+    def __init__(self, user, on_saved=None):
+        self.user = user
+        self.on_saved = on_saved
+        self.parser = WeekPlanStreamParser()
+        self.day_index = 0
+
+    def feed(self, chunk):
+        """Frames for one chunk of model output."""
+        frames = [sse_event("token", {"text": chunk})]
+        for day in self.parser.feed(chunk):
+            frames.append(sse_event("day", {"index": self.day_index, "day": day}))
+            self.day_index += 1
+        return frames
+
+    def finish(self):
+        """Validate and save the whole program (database access); the final frame."""
+        try:
+            program_data = parse_program_response(self.parser.text)
+            program = save_program(self.user, program_data)
+            if self.on_saved:
+                self.on_saved(program_data)
+        except GenerationError as e:
+            return self.error(e)
+        except Exception:
+            # Never end the stream without a final frame: the client would
+            # wait on a half-received program
+            logger.exception("Saving streamed program for user %s failed", self.user.id)
+            return self.error(GenerationError("Failed to save the generated program", status=500))
+        return sse_event("done", {
+            "program_id": program.id,
+            "program_summary": program_data["program_summary"],
+        })
+
+    @staticmethod
+    def error(e):
+        return sse_event("error", {"status": e.status, **e.as_response_data()})
+
+
+async def astream_program_events(user, chunks, on_saved=None):
+    """Turn an async iterator of model output chunks into SSE frames (see ProgramEventStream)."""
+    stream = ProgramEventStream(user, on_saved)
+    try:
+        async for chunk in chunks:
+            for frame in stream.feed(chunk):
+                yield frame
+    except GenerationError as e:
+        yield stream.error(e)
+        return
+    yield await sync_to_async(stream.finish)()
@@ -1,364 +1,161 @@
 # ai_program_generator/views.py
 import os
 import json
+import logging
+from asgiref.sync import sync_to_async
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from users.models import User, UserProfile
-from users.authentication import Auth0JSONWebTokenAuthentication
-from .models import AIProgram, ProgramDay, Exercise
-from django.db import transaction
+from users.authentication import Auth0JSONWebTokenAuthentication, async_auth0_view
+from users.current_user import aget_current_user, get_current_user
+from users.conditional import conditional
+from .models import AIProgram, GenerationJob
+from .jobs import enqueue_generation
+from .read_model import load_program_document, program_document_json
+from .services import astream_ollama, build_program_prompt, program_cache
+from .streaming import astream_program_events, sse_event
 from django.conf import settings
-import requests
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework import status
 from ai_program_generator.models import AIProgram
 from django.contrib.auth import get_user_model
 
+logger = logging.getLogger(__name__)
 
-def get_ollama_url():
-    """Get Ollama URL from environment variable."""
-    ollama_url = os.getenv("OLLAMA_URL", "http://ollama:11434")
-    #return ollama_url
-    return "http://host.docker.internal:11434"
 
-
-def validate_program_json(data):
+@async_auth0_view("POST")
+async def generate_ai_program(request):
     """
-    Validate that the JSON matches our expected structure.
-    Returns (is_valid, error_message).
+    Queue the generation of a 7-day AI fitness program based on user profile.
+    Returns 202 with a job id; poll GET /api/program/jobs/<job_id> until the
+    job is "succeeded" (the program is then the user's active program) or
+    "failed". The work itself runs in `manage.py run_generation_worker`.
     """
-    if not isinstance(data, dict):
-        return False, "Response is not a JSON object"
-
-    # Check top-level keys
-    if "program_summary" not in data or "week_plan" not in data:
-        return False, "Missing 'program_summary' or 'week_plan'"
-
-    summary = data["program_summary"]
-    if not isinstance(summary, dict) or "goal" not in summary or "difficulty" not in summary:
-        return False, "Invalid 'program_summary' structure"
+    # Auth0 user lookup (resolved once per request)
+    user = await aget_current_user(request)
+    if not user:
+        return JsonResponse({"error": "User not found"}, status=404)
 
-    # Check week_plan
-    week_plan = data["week_plan"]
-    if not isinstance(week_plan, list) or len(week_plan) != 7:
-        return False, f"'week_plan' must be a list of 7 days, got {len(week_plan) if isinstance(week_plan, list) else 'not a list'}"
+    # Profile lookup (fail fast instead of queueing a job that can't run)
+    if not await UserProfile.objects.filter(user=user).aexists():
+        return JsonResponse({"error": "User profile not found. Complete onboarding first."}, status=400)
 
-    # Validate each day
-    required_day_keys = ["day_name", "focus", "is_rest_day", "sessions"]
-    for idx, day in enumerate(week_plan):
-        if not isinstance(day, dict):
-            return False, f"Day {idx + 1} is not a JSON object"
+    job, _ = await sync_to_async(enqueue_generation)(user)
+    return JsonResponse(_job_data(job), status=202)
 
-        for key in required_day_keys:
-            if key not in day:
-                return False, f"Day {idx + 1} missing key '{key}'"
 
-        # Validate sessions
-        if not isinstance(day["sessions"], list):
-            return False, f"Day {idx + 1} 'sessions' is not a list"
+@async_auth0_view("GET")
+async def get_generation_job(request, job_id):
+    """
+    Status of a program generation job owned by the current user.
+    """
+    user = await aget_current_user(request)
+    if not user:
+        return JsonResponse({"error": "User not found"}, status=404)
 
-        for session_idx, session in enumerate(day["sessions"]):
-            required_session_keys = ["exercise_name", "sets", "reps", "intensity", "notes"]
-            for key in required_session_keys:
-                if key not in session:
-                    return False, f"Day {idx + 1}, Session {session_idx + 1} missing key '{key}'"
+    job = await GenerationJob.objects.filter(id=job_id, user=user).afirst()
+    if not job:
+        return JsonResponse({"error": "Job not found"}, status=404)
 
-    return True, None
+    return JsonResponse(_job_data(job))
 
 
-@api_view(["POST"])
-@authentication_classes([Auth0JSONWebTokenAuthentication])
-@permission_classes([IsAuthenticated])
-def generate_ai_program(request):
+@async_auth0_view("POST")
+async def stream_ai_program(request):
     """
-    Generate a 7-day AI fitness program based on user profile.
-    Stores the program in the database and returns it.
+    Generate a program synchronously but stream it as Server-Sent Events:
+    `token` events carry raw model output, a `day` event is sent as soon as
+    each week_plan entry is complete, and `done` carries the saved program id
+    (the program is only persisted once the whole response validates).
+    Under ASGI the wait on the model is a coroutine, not a worker thread.
     """
-    # Auth0 user lookup
-    auth0_id = request.user.payload.get("sub")
-    user = User.objects.filter(auth0_id=auth0_id).first()
+    user = await aget_current_user(request)
     if not user:
-        return Response({"error": "User not found"}, status=404)
+        return _stream_error(request, {"error": "User not found"}, status=404)
 
-    # Profile lookup
-    profile = UserProfile.objects.filter(user=user).first()
+    profile = await UserProfile.objects.filter(user=user).afirst()
     if not profile:
-        return Response({"error": "User profile not found. Complete onboarding first."}, status=400)
-
-    # -------------------------------
-    # Build user data block
-    # -------------------------------
-    user_block = f"""
-User Profile:
-- Age: {profile.age}
-- Height: {profile.height_cm} cm
-- Weight: {profile.weight_kg} kg
-- Fitness Level: {profile.fitness_level}
-- Primary Goal: {profile.primary_goal.replace('_', ' ').title()}
-- Workout Frequency: {profile.workout_frequency}
-- Daily Activity Level: {profile.daily_activity_level.replace('_', ' ').title()}
-- Sleep Hours: {profile.sleep_hours}
-"""
-    if profile.body_type:
-        user_block += f"- Body Type: {profile.body_type.replace('_', ' ').title()}\n"
-    if profile.body_fat_percentage:
-        user_block += f"- Body Fat %: {profile.body_fat_percentage}\n"
-
-    # -------------------------------
-    # JSON STRUCTURE ENFORCED PROMPT
-    # -------------------------------
-    prompt = f"""
-    You are an expert strength and conditioning coach.
-
-    Based on the following user data, create a 7-day personalized fitness program:
-
-    {user_block}
-
-    CRITICAL REQUIREMENTS:
-    1. Return ONLY valid JSON (no markdown, no explanations)
-    2. Include EXACTLY 7 days (Monday-Sunday)
-    3. Each TRAINING day must have AT LEAST 5 exercises
-    4. Rest days should have "is_rest_day": true and empty sessions
-    5. Use lowercase for difficulty: "beginner", "intermediate", or "advanced"
-
-    JSON STRUCTURE (MUST FOLLOW EXACTLY):
-
-    {{
-      "program_summary": {{
-        "goal": "clear objective based on user's primary_goal",
-        "difficulty": "beginner" | "intermediate" | "advanced"
-      }},
-      "week_plan": [
-        {{
-          "day_name": "Monday",
-          "focus": "e.g., Upper Body Strength",
-          "is_rest_day": false,
-          "sessions": [
-            {{
-              "exercise_name": "Exercise 1",
-              "sets": 3,
-              "reps": "8-12",
-              "intensity": "RPE 7-8",
-              "notes": "Short tip"
-            }},
-            {{
-              "exercise_name": "Exercise 2",
-              "sets": 3,
-              "reps": "8-12",
-              "intensity": "moderate",
-              "notes": ""
-            }},
-            {{
-              "exercise_name": "Exercise 3",
-              "sets": 3,
-              "reps": "8-12",
-              "intensity": "moderate",
-              "notes": ""
-            }},
-            {{
-              "exercise_name": "Exercise 4",
-              "sets": 3,
-              "reps": "8-12",
-              "intensity": "moderate",
-              "notes": ""
-            }}
-          ]
-        }},
-        ... (repeat for all 7 days)
-      ]
-    }}
-
-    IMPORTANT: 
-    - Make sure to take in consideration the user data and his goal
-    - Training days MUST  have 5 exercices
-    - Include 2-3 rest days in the week
-    - Keep notes short (under 10 words) or empty
-    - Respond with ONLY the JSON object, nothing else
-    """
-    try:
-        # Ollama model call
-        ollama_url = get_ollama_url()
-        ollama_resp = requests.post(
-            f"{ollama_url}/api/generate",
-            json={
-                "model": "llama3.1:8b",
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "num_predict": 3500,
-                    "temperature": 0.3,
-                    "top_p": 0.9,
-                    "top_k": 40
-                }
-            },
-            timeout=180  # 3 minutes timeout for large responses
+        return _stream_error(
+            request, {"error": "User profile not found. Complete onboarding first."}, status=400
         )
 
-        if ollama_resp.status_code != 200:
-            return Response(
-                {
-                    "error": "Ollama returned non-200 status",
-                    "status_code": ollama_resp.status_code,
-                    "body": ollama_resp.text,
-                },
-                status=502,
-            )
-
-        data = ollama_resp.json()
-        raw_text = (data.get("response") or "").strip()
-        if not raw_text:
-            return Response(
-                {
-                    "error": "Empty content from Ollama",
-                    "ollama_raw": data,
-                },
-                status=502,
-            )
-
-        # -------------------------------
-        # Clean possible code fences
-        # -------------------------------
-        cleaned = raw_text.strip()
-
-        if cleaned.startswith("```"):
-            cleaned = cleaned.lstrip("`").lstrip()
-            if cleaned.lower().startswith("json"):
-                cleaned = cleaned[4:].lstrip("\r\n ").lstrip()
-            if cleaned.endswith("```"):
-                cleaned = cleaned[:-3].rstrip()
-
-        # -------------------------------
-        # Parse JSON
-        # -------------------------------
-        try:
-            program_data = json.loads(cleaned)
-        except json.JSONDecodeError as e:
-            return Response(
-                {
-                    "error": "Model returned invalid JSON",
-                    "json_error": str(e),
-                    "raw_response": raw_text[:500],  # First 500 chars
-                    "cleaned_attempt": cleaned[:500],
-                },
-                status=502,
-            )
-
-        # -------------------------------
-        # Validate JSON structure
-        # -------------------------------
-        is_valid, validation_error = validate_program_json(program_data)
-        if not is_valid:
-            return Response(
-                {
-                    "error": "Generated program has invalid structure",
-                    "validation_error": validation_error,
-                    "program_data": program_data,
-                },
-                status=502,
-            )
-
-        # -------------------------------
-        # Save to Database (Atomic Transaction)
-        # -------------------------------
-        with transaction.atomic():
-            # Create AIProgram
-            ai_program = AIProgram.objects.create(
-                user=user,
-                goal=program_data["program_summary"]["goal"],
-                difficulty=program_data["program_summary"]["difficulty"].lower(),
-                is_active=True,  # This will auto-deactivate other programs
-                raw_json=program_data
-            )
-
-            # Create ProgramDays and Exercises
-            for day_idx, day_data in enumerate(program_data["week_plan"]):
-                program_day = ProgramDay.objects.create(
-                    program=ai_program,
-                    day_number=day_idx + 1,
-                    day_name=day_data["day_name"],
-                    focus=day_data["focus"],
-                    is_rest_day=day_data["is_rest_day"]
-                )
-
-                # Create exercises for this day (skip if rest day)
-                if not day_data["is_rest_day"]:
-                    for exercise_idx, exercise_data in enumerate(day_data["sessions"]):
-                        Exercise.objects.create(
-                            program_day=program_day,
-                            order=exercise_idx + 1,
-                            exercise_name=exercise_data["exercise_name"],
-                            sets=exercise_data["sets"],
-                            reps=exercise_data["reps"],
-                            intensity=exercise_data["intensity"],
-                            notes=exercise_data.get("notes", "")
-                        )
-
-        # -------------------------------
-        # Return success with program ID
-        # -------------------------------
-        return Response({
-            "success": True,
-            "message": "AI program generated and saved successfully",
-            "program_id": ai_program.id,
-            "program": program_data
-        }, status=201)
-
-    except requests.exceptions.Timeout:
-        return Response({"error": "Ollama request timed out. Try again."}, status=504)
-    except requests.exceptions.RequestException as e:
-        return Response({"error": f"Failed to connect to Ollama: {str(e)}"}, status=502)
-    except Exception as e:
-        return Response({"error": f"Unexpected error: {str(e)}"}, status=500)
+    cached = await sync_to_async(program_cache.get)(profile)
+    if cached is not None:
+        # Replay the cached program as a single chunk: every day is sent at once.
+        events = astream_program_events(user, _replay(json.dumps(cached)))
+    else:
+        events = astream_program_events(
+            user,
+            astream_ollama(build_program_prompt(profile)),
+            on_saved=lambda program_data: program_cache.put(profile, program_data),
+        )
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # stop nginx from buffering the stream
+    return response
+
+
+async def _replay(text):
+    yield text
+
+
+def _stream_error(request, data, status):
+    """Errors raised before streaming starts, as an SSE `error` event when the client asked for one."""
+    if "text/event-stream" in request.headers.get("Accept", ""):
+        return HttpResponse(sse_event("error", data), content_type="text/event-stream; charset=utf-8", status=status)
+    return JsonResponse(data, status=status)
+
+
+def _job_data(job):
+    data = {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": reverse("generation_job_status", args=[job.id]),
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status == "succeeded":
+        data["program_id"] = job.program_id
+    elif job.status == "failed":
+        data["error"] = job.error
+        data["details"] = job.error_details or {}
+    return data
+
+
+def _active_program_version(request):
+    user = get_current_user(request)
+    if not user:
+        return None
+    program = (
+        AIProgram.objects.filter(user=user, is_active=True)
+        .values_list("id", "document_version", "created_at")
+        .first()
+    )
+    return (user.id, program)
 
 
 @api_view(["GET"])
 @authentication_classes([Auth0JSONWebTokenAuthentication])
 @permission_classes([IsAuthenticated])
+@conditional("program-active", _active_program_version)
 def get_active_program(request):
     """
     Get the user's currently active AI program with all days and exercises.
     """
-    auth0_id = request.user.payload.get("sub")
-    user = User.objects.filter(auth0_id=auth0_id).first()
+    user = get_current_user(request)
     if not user:
         return Response({"error": "User not found"}, status=404)
 
-    # Get active program
-    program = AIProgram.objects.filter(user=user, is_active=True).first()
-    if not program:
+    # Served from the materialized document: one row, no re-serialization
+    body = program_document_json(AIProgram.objects.filter(user=user, is_active=True))
+    if body is None:
         return Response({"error": "No active program found. Generate one first."}, status=404)
 
-    # Build response with all days and exercises
-    week_plan = []
-    for day in program.days.all():
-        exercises = [
-            {
-                "exercise_name": ex.exercise_name,
-                "sets": ex.sets,
-                "reps": ex.reps,
-                "intensity": ex.intensity,
-                "notes": ex.notes
-            }
-            for ex in day.exercises.all()
-        ]
-
-        week_plan.append({
-            "day_name": day.day_name,
-            "focus": day.focus,
-            "is_rest_day": day.is_rest_day,
-            "sessions": exercises
-        })
-
-    return Response({
-        "program_id": program.id,
-        "program_summary": {
-            "goal": program.goal,
-            "difficulty": program.difficulty
-        },
-        "created_at": program.created_at,
-        "week_plan": week_plan
-    })
+    return HttpResponse(body, content_type="application/json")
 
 
 @api_view(["GET"])
@@ -368,8 +165,7 @@ def get_program_history(request):
     """
     Get all past programs for the user (for history/comparison).
     """
-    auth0_id = request.user.payload.get("sub")
-    user = User.objects.filter(auth0_id=auth0_id).first()
+    user = get_current_user(request)
     if not user:
         return Response({"error": "User not found"}, status=404)
 
@@ -396,8 +192,7 @@ def set_active_program(request, program_id):
     """
     Set a specific program as the active one.
     """
-    auth0_id = request.user.payload.get("sub")
-    user = User.objects.filter(auth0_id=auth0_id).first()
+    user = get_current_user(request)
     if not user:
         return Response({"error": "User not found"}, status=404)
 
@@ -421,70 +216,32 @@ def get_client_program(request, client_id):
     GET /api/coach/clients/<client_id>/program/
     """
     try:
-        # Get client
-        client = User.objects.get(id=client_id)
-
-        # Get their most recent AI program (with related data)
-        program = (
-            AIProgram.objects
-            .filter(user=client)
-            .prefetch_related('days__exercises')
-            .order_by('-created_at')
-            .first()
+        # Most recent program of the client, with days and exercises
+        document = load_program_document(
+            AIProgram.objects.filter(user_id=client_id).order_by('-created_at')
         )
 
-        if not program:
+        if not document:
+            if not User.objects.filter(id=client_id).exists():
+                return Response(
+                    {"error": "Client not found"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
             return Response(
                 {"error": "This client has not generated an AI program yet"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Build program_summary from model fields
-        program_summary = {
-            "goal": program.goal,
-            "difficulty": program.difficulty
-        }
-
-        # Build week_plan from related ProgramDay and Exercise models
-        week_plan = []
-        for day in program.days.all():
-            day_data = {
-                "day_name": day.day_name,
-                "focus": day.focus,
-                "is_rest_day": day.is_rest_day,
-                "sessions": []
-            }
-
-            # Add exercises for this day
-            for exercise in day.exercises.all():
-                day_data["sessions"].append({
-                    "exercise_name": exercise.exercise_name,
-                    "sets": str(exercise.sets),
-                    "reps": exercise.reps,
-                    "intensity": exercise.intensity,
-                    "notes": exercise.notes or ""
-                })
-
-            week_plan.append(day_data)
-
-        # Return the constructed response
         return Response({
-            "id": program.id,
-            "created_at": program.created_at.isoformat(),
-            "program_summary": program_summary,
-            "week_plan": week_plan
+            "id": document["program_id"],
+            "created_at": document["created_at"].isoformat(),
+            "program_summary": document["program_summary"],
+            "week_plan": document["week_plan"]
         }, status=status.HTTP_200_OK)
 
-    except User.DoesNotExist:
+    except Exception:
+        logger.exception("Failed to load the program of client %s", client_id)
         return Response(
-            {"error": "Client not found"},
-            status=status.HTTP_404_NOT_FOUND
-        )
-    except Exception as e:
-        print(f" Error loading program: {e}")
-        import traceback
-        traceback.print_exc()
-        return Response(
-            {"error": str(e)},
+            {"error": "Failed to load the client's program"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
@@ -48,6 +48,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     'rest_framework',
     'users',
     "ai_program_generator",
@@ -180,6 +181,122 @@ SIMPLE_JWT = {
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
+# Auth0 token verification
+AUTH0_DOMAIN = os.getenv("AUTH0_DOMAIN", "dev-w3nk36t6hbc8zq2s.us.auth0.com")
+AUTH0_AUDIENCE = os.getenv("AUTH0_AUDIENCE", "http://localhost:8000")
+# JWKS cache: TTL used when Auth0 sends no Cache-Control max-age, and the
+# minimum delay between two refetches triggered by an unknown `kid`.
+JWKS_CACHE_TTL = int(os.getenv("JWKS_CACHE_TTL", "600"))
+JWKS_MIN_REFETCH_INTERVAL = int(os.getenv("JWKS_MIN_REFETCH_INTERVAL", "30"))
+# Verified-token LRU cache (0 entries disables it)
+JWT_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CACHE_MAX_ENTRIES", "10000"))
+JWT_CACHE_MAX_BYTES = int(os.getenv("JWT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# Cache backend: process-local by default; set REDIS_URL (any Redis-protocol
+# server) to share the user/payload caches and counters across workers.
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "perfoevolution",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+# True when every process (web and worker) sees the same cache
+SHARED_CACHE = bool(REDIS_URL)
+
+
+def _shared_cache_ttl(name, default):
+    # Cached users/payloads are invalidated by signals in the process that
+    # writes (web workers, stripe/generation workers, expire_records). On a
+    # process-local cache the other processes would keep serving stale rows
+    # under a fresh ETag, so these caches only run on a shared cache.
+    return int(os.getenv(name, default)) if SHARED_CACHE else 0
+
+
+# Seconds an auth0_id -> User lookup stays cached (0 disables the cache)
+USER_RESOLVE_CACHE_TTL = _shared_cache_ttl("USER_RESOLVE_CACHE_TTL", "30")
+# Per-user dashboard payload cache (users/payload_cache.py; 0 disables it)
+USER_PAYLOAD_CACHE_TTL = _shared_cache_ttl("USER_PAYLOAD_CACHE_TTL", "300")
+USER_PAYLOAD_CACHE_LOCK_TIMEOUT = int(os.getenv("USER_PAYLOAD_CACHE_LOCK_TIMEOUT", "10"))
+USER_PAYLOAD_CACHE_POLL_INTERVAL = float(os.getenv("USER_PAYLOAD_CACHE_POLL_INTERVAL", "0.05"))
+
+# Coach picked for new AI-training / Zoom-booking rows (users/coach_assignment.py):
+# least_loaded | round_robin | specialty
+COACH_ASSIGNMENT_STRATEGY = os.getenv("COACH_ASSIGNMENT_STRATEGY", "least_loaded")
+COACH_ROSTER_TTL = int(os.getenv("COACH_ROSTER_TTL", "300"))
+
+# Subscription / add-on expiry (users/expiry.py, manage.py expire_records).
+# A positive interval also runs it on a background thread of the Stripe event
+# worker (manage.py process_stripe_events).
+EXPIRY_BATCH_SIZE = int(os.getenv("EXPIRY_BATCH_SIZE", "1000"))
+EXPIRY_SCHEDULER_INTERVAL = int(os.getenv("EXPIRY_SCHEDULER_INTERVAL", "0"))
+
+# Stripe webhook fulfilment worker (manage.py process_stripe_events)
+STRIPE_WORKER_POLL_INTERVAL = float(os.getenv("STRIPE_WORKER_POLL_INTERVAL", "1"))
+
+# AI program generation worker (manage.py run_generation_worker)
+GENERATION_WORKER_CONCURRENCY = int(os.getenv("GENERATION_WORKER_CONCURRENCY", "2"))
+GENERATION_WORKER_POLL_INTERVAL = float(os.getenv("GENERATION_WORKER_POLL_INTERVAL", "2"))
+# Seconds without a worker heartbeat (sent every poll interval) before a
+# running job is requeued
+GENERATION_JOB_STALE_AFTER = int(os.getenv("GENERATION_JOB_STALE_AFTER", "120"))
+
+# Generated-program template cache (ai_program_generator/program_cache.py)
+PROGRAM_CACHE_ENABLED = os.getenv("PROGRAM_CACHE_ENABLED", "True") == "True"
+PROGRAM_CACHE_TTL = int(os.getenv("PROGRAM_CACHE_TTL", str(30 * 24 * 3600)))
+PROGRAM_CACHE_MAX_ENTRIES = int(os.getenv("PROGRAM_CACHE_MAX_ENTRIES", "5000"))
+# Bucket width per numeric profile field; fields not listed are used as-is.
+PROGRAM_CACHE_BUCKETS = {
+    "age": 5,
+    "height_cm": 5,
+    "weight_kg": 5,
+    "sleep_hours": 1,
+    "body_fat_percentage": 5,
+}
+
+# Shared httpx client of the async views (users/async_http.py): pool size
+# per worker process and the connect / pool-wait timeout in seconds. Read
+# timeouts are set per call (Ollama, JWKS).
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", "200"))
+ASYNC_HTTP_MAX_KEEPALIVE = int(os.getenv("ASYNC_HTTP_MAX_KEEPALIVE", "50"))
+ASYNC_HTTP_CONNECT_TIMEOUT = float(os.getenv("ASYNC_HTTP_CONNECT_TIMEOUT", "5"))
+
+# Pooled requests sessions of the synchronous outbound calls
+# (users/outbound_http.py): keep-alive connections per target host, retries
+# (idempotent methods, 502/503/504 and connect errors) with exponential
+# backoff, and default (connect, read) timeouts in seconds per target.
+OUTBOUND_HTTP_POOL_SIZE = int(os.getenv("OUTBOUND_HTTP_POOL_SIZE", "10"))
+OUTBOUND_HTTP_RETRIES = int(os.getenv("OUTBOUND_HTTP_RETRIES", "2"))
+OUTBOUND_HTTP_BACKOFF = float(os.getenv("OUTBOUND_HTTP_BACKOFF", "0.3"))
+OUTBOUND_HTTP_TIMEOUTS = {
+    "ollama": (float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5")), float(os.getenv("OLLAMA_READ_TIMEOUT", "180"))),
+    "auth0": (float(os.getenv("AUTH0_CONNECT_TIMEOUT", "3")), float(os.getenv("AUTH0_READ_TIMEOUT", "5"))),
+    "stripe": (float(os.getenv("STRIPE_CONNECT_TIMEOUT", "5")), float(os.getenv("STRIPE_READ_TIMEOUT", "30"))),
+}
+
+# Ollama nodes generation is spread over (ai_program_generator/ollama_pool.py):
+# comma-separated URLs, consecutive failures that open a node's circuit
+# breaker and its cooldown in seconds, /api/tags probe interval in seconds
+# (0: no probes) and the number of calls the rolling latency is taken over.
+OLLAMA_URLS = [
+    url.strip()
+    for url in os.getenv("OLLAMA_URLS", os.getenv("OLLAMA_URL", "http://ollama:11434")).split(",")
+    if url.strip()
+]
+OLLAMA_BREAKER_FAILURES = int(os.getenv("OLLAMA_BREAKER_FAILURES", "3"))
+OLLAMA_BREAKER_COOLDOWN = float(os.getenv("OLLAMA_BREAKER_COOLDOWN", "30"))
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "15"))
+OLLAMA_LATENCY_WINDOW = int(os.getenv("OLLAMA_LATENCY_WINDOW", "20"))
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 if not DEBUG:
@@ -11,3 +11,13 @@ DATABASES = {
 # Optional: faster hashing and simplified config
 PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
 DEBUG = False
+
+# The test run is a single process, so the locmem cache is as shared as
+# Redis would be: keep the user/payload caches and the coach list versions
+# on (settings.py turns them off without REDIS_URL).
+SHARED_CACHE = True
+USER_RESOLVE_CACHE_TTL = 30
+USER_PAYLOAD_CACHE_TTL = 300
+
+# No background /api/tags probes against the real Ollama hosts
+OLLAMA_HEALTH_INTERVAL = 0
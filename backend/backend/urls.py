@@ -37,12 +37,14 @@ from users.views import (
     create_checkout_session,
     stripe_webhook,
 )
-from ai_program_generator.views import generate_ai_program, get_active_program, get_program_history, set_active_program,get_client_program
+from ai_program_generator.views import generate_ai_program, stream_ai_program, get_generation_job, get_active_program, get_program_history, set_active_program,get_client_program
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("users.urls")),
     path("api/program/generate", generate_ai_program, name="generate_training_program"),
+    path("api/program/generate/stream", stream_ai_program, name="stream_training_program"),
+    path("api/program/jobs/<int:job_id>", get_generation_job, name="generation_job_status"),
     path("api/program/active", get_active_program, name="get_active_program"),
     path("api/program/history",get_program_history, name="get_program_history"),
     path("api/program/set-active/<int:program_id>", set_active_program, name="set_active_program"),
@@ -0,0 +1,51 @@
+import pytest
+from django.core.cache import cache
+
+from rest_framework.exceptions import AuthenticationFailed
+
+from ai_program_generator.ollama_pool import reset_ollama_pool
+from users.authentication import Auth0JSONWebTokenAuthentication
+from users.coach_assignment import reset_coach_roster
+from users.jwks import reset_jwks_store
+from users.outbound_http import reset_sessions
+from users.token_cache import reset_token_cache
+
+
+@pytest.fixture(autouse=True)
+def _reset_process_caches():
+    """Process-wide caches must not leak state between tests."""
+    yield
+    reset_jwks_store()
+    reset_token_cache()
+    reset_coach_roster()
+    reset_sessions()
+    reset_ollama_pool()
+    cache.clear()
+
+
+@pytest.fixture
+def bearer(monkeypatch):
+    """
+    Authenticate through a patched token validator: `bearer(payload)` returns
+    an Authorization header value whose token verifies to `payload`; any
+    other token fails verification. Works for DRF and async views alike.
+    """
+    payloads = {}
+
+    def verify_jwt(self, token):
+        if token not in payloads:
+            raise AuthenticationFailed("JWT Verification failed: unknown test token")
+        return payloads[token]
+
+    async def averify_jwt(self, token):
+        return verify_jwt(self, token)
+
+    monkeypatch.setattr(Auth0JSONWebTokenAuthentication, "verify_jwt", verify_jwt)
+    monkeypatch.setattr(Auth0JSONWebTokenAuthentication, "averify_jwt", averify_jwt)
+
+    def issue(payload):
+        token = f"test-token-{len(payloads)}"
+        payloads[token] = payload
+        return f"Bearer {token}"
+
+    return issue
@@ -0,0 +1,241 @@
+"""
+Add-on unit accounting.
+
+Consuming a unit used to be read-modify-write in the view (load the AddOn,
+decrement in Python, save, then SUM the remaining quantity), which loses
+updates when two coaches complete sessions for the same client at once.
+`consume_addon` instead takes the unit with one conditional statement:
+
+    UPDATE users_addons SET quantity = quantity - 1, status = CASE ... END
+    WHERE id = (<best active row>) AND status = 'active' AND quantity > 0
+    RETURNING id, quantity, status
+
+The database serialises concurrent decrements on the row, and the WHERE
+clause is re-checked after any wait, so a unit can never be taken twice or
+go negative. A statement that loses the race to the last unit of a row
+simply matches nothing and is retried against the next row.
+
+Balances live in AddOnBalance, a row per (user, add-on type) holding the
+active units; every read path (subscription endpoint, coach client list and
+queues) looks them up instead of summing AddOn rows. They are kept in step
+in the same transaction as the change:
+  - purchase: credited by the AddOn post_save signal (users/models.py)
+  - consumption: decremented by `consume_addon`
+  - expiry: recomputed for the batch's owners by `refresh_balances`
+  - admin edits / deletes: recomputed by the AddOn signals
+Single-row writes use INSERT ... ON CONFLICT DO UPDATE, so the first purchase
+of a type cannot race another one into a duplicate row. `rebuild_balances`
+(`manage.py rebuild_addon_balances`) recomputes everything in bulk and
+reports any drift it repaired.
+"""
+import time
+from collections import namedtuple
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import User, AddOn, AddOnBalance
+from .payload_cache import invalidate_user_payloads
+
+# Attempts before giving up when other transactions keep taking the row we
+# picked; each retry re-selects among the rows that still have units.
+CONSUME_ATTEMPTS = 3
+
+Consumption = namedtuple("Consumption", "addon_id addon_quantity addon_status remaining")
+
+
+def _upsert_balance(user_id, addon_type, quantity, add):
+    """Create the balance row at `quantity`, or add `quantity` to / set it on the existing one."""
+    balances = AddOnBalance._meta.db_table
+    new_quantity = f"{balances}.quantity + excluded.quantity" if add else "excluded.quantity"
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {balances} (user_id, addon_type, quantity, updated_at)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (user_id, addon_type)
+            DO UPDATE SET quantity = {new_quantity}, updated_at = excluded.updated_at
+            """,
+            [user_id, addon_type, quantity, now],
+        )
+
+
+def credit_balance(user_id, addon_type, quantity):
+    """Add `quantity` purchased units to the balance."""
+    _upsert_balance(user_id, addon_type, quantity, add=True)
+
+
+def refresh_balance(user_id, addon_type):
+    """Recompute the balance from the active AddOn rows. Returns it."""
+    total = (
+        AddOn.objects.filter(user_id=user_id, addon_type=addon_type, status="active")
+        .aggregate(total=Sum("quantity"))["total"] or 0
+    )
+    _upsert_balance(user_id, addon_type, total, add=False)
+    return total
+
+
+def refresh_balances(user_ids, now=None):
+    """
+    Recompute every balance row of `user_ids` from their active AddOn rows
+    in one UPDATE (correlated SUM per row). Returns the rows updated.
+    """
+    active_units = (
+        AddOn.objects.filter(user_id=OuterRef("user_id"), addon_type=OuterRef("addon_type"), status="active")
+        .order_by()
+        .values("user_id")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    return AddOnBalance.objects.filter(user_id__in=user_ids).update(
+        quantity=Coalesce(Subquery(active_units), 0), updated_at=now or timezone.now()
+    )
+
+
+def balances_for(user_id):
+    """{addon_type: units} for the add-on types the user holds units of."""
+    return dict(
+        AddOnBalance.objects.filter(user_id=user_id, quantity__gt=0)
+        .order_by("addon_type")
+        .values_list("addon_type", "quantity")
+    )
+
+
+def get_balance(user_id, addon_type):
+    """Active units of `addon_type` held by the user (one indexed lookup)."""
+    return (
+        AddOnBalance.objects.filter(user_id=user_id, addon_type=addon_type)
+        .values_list("quantity", flat=True)
+        .first()
+    ) or 0
+
+
+def _take_unit(user_id, addon_type, addon_id, now):
+    addons = AddOn._meta.db_table
+    only_addon = "AND id = %s" if addon_id is not None else ""
+    params = [now, user_id, addon_type] + ([addon_id] if addon_id is not None else [])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {addons}
+               SET quantity = quantity - 1,
+                   status = CASE WHEN quantity <= 1 THEN 'used' ELSE status END,
+                   updated_at = %s
+             WHERE id = (
+                       SELECT id FROM {addons}
+                        WHERE user_id = %s AND addon_type = %s
+                          AND status = 'active' AND quantity > 0 {only_addon}
+                        ORDER BY quantity DESC, id
+                        LIMIT 1
+                   )
+               AND status = 'active' AND quantity > 0
+         RETURNING id, quantity, status
+            """,
+            params,
+        )
+        return cursor.fetchone()
+
+
+def _debit_balance(user_id, addon_type, now):
+    balances = AddOnBalance._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {balances}
+               SET quantity = quantity - 1, updated_at = %s
+             WHERE user_id = %s AND addon_type = %s AND quantity > 0
+         RETURNING quantity
+            """,
+            [now, user_id, addon_type],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def consume_addon(user_id, addon_type, addon_id=None):
+    """
+    Take one unit of the user's active `addon_type` add-ons (from `addon_id`
+    only, when given). Returns a Consumption, or None when no unit is left.
+    """
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic():
+        for _ in range(CONSUME_ATTEMPTS):
+            row = _take_unit(user_id, addon_type, addon_id, now)
+            if row is not None:
+                break
+            # Either nothing is left or a concurrent consumer emptied our pick
+            units = AddOn.objects.filter(
+                user_id=user_id, addon_type=addon_type, status="active", quantity__gt=0
+            )
+            if addon_id is not None:
+                units = units.filter(id=addon_id)
+            if not units.exists():
+                return None
+        else:
+            return None
+
+        remaining = _debit_balance(user_id, addon_type, now)
+        if remaining is None:  # balance row missing or out of step
+            remaining = refresh_balance(user_id, addon_type)
+
+    invalidate_user_payloads(user_id)
+    return Consumption(*row, remaining)
+
+
+def rebuild_balances(batch_size=1000, dry_run=False):
+    """
+    Recompute all balances from the AddOn rows, `batch_size` users at a time
+    (two reads and at most one bulk upsert per batch). Returns stats: users
+    scanned, balance rows checked and rows that had drifted (fixed unless
+    `dry_run`).
+    """
+    started = time.perf_counter()
+    stats = {"users": 0, "checked": 0, "drifted": 0, "fixed": 0}
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size]
+        )
+        if not user_ids:
+            break
+        last_id = user_ids[-1]
+        stats["users"] += len(user_ids)
+
+        expected = {
+            (row["user_id"], row["addon_type"]): row["total"] or 0
+            for row in AddOn.objects.filter(user_id__in=user_ids, status="active")
+            .order_by()
+            .values("user_id", "addon_type")
+            .annotate(total=Sum("quantity"))
+        }
+        stored = {
+            (user_id, addon_type): quantity
+            for user_id, addon_type, quantity in AddOnBalance.objects.filter(user_id__in=user_ids)
+            .values_list("user_id", "addon_type", "quantity")
+        }
+        stats["checked"] += len(stored.keys() | expected.keys())
+        drifted = [
+            (key, expected.get(key, 0))
+            for key in stored.keys() | expected.keys()
+            if stored.get(key) != expected.get(key, 0)
+        ]
+        stats["drifted"] += len(drifted)
+        if dry_run or not drifted:
+            continue
+
+        AddOnBalance.objects.bulk_create(
+            [AddOnBalance(user_id=user_id, addon_type=addon_type, quantity=quantity)
+             for (user_id, addon_type), quantity in drifted],
+            update_conflicts=True,
+            unique_fields=["user", "addon_type"],
+            update_fields=["quantity", "updated_at"],
+        )
+        stats["fixed"] += len(drifted)
+        for user_id in {user_id for (user_id, _), _ in drifted}:
+            invalidate_user_payloads(user_id)
+
+    stats["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return stats
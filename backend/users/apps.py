@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "users"
-    
\ No newline at end of file
+
+    def ready(self):
+        from .outbound_http import configure_stripe
+
+        configure_stripe()
@@ -0,0 +1,47 @@
+"""
+Shared httpx.AsyncClient for the async (ASGI) views.
+
+Outbound calls made while serving a request (Ollama generation streams,
+Auth0 JWKS downloads) go through one pooled client instead of opening a
+connection per call, so thousands of requests waiting on a model cost
+coroutines and a bounded number of keep-alive sockets rather than threads.
+
+An AsyncClient belongs to the event loop it was first used on, so one is
+kept per running loop (uvicorn runs a single loop per worker; tests and
+async_to_sync may start others). Limits and the connect timeout come from
+settings; read timeouts are passed per call by the caller.
+"""
+import asyncio
+import weakref
+
+import httpx
+from django.conf import settings
+
+_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncClient
+
+
+def _new_client():
+    connect = settings.ASYNC_HTTP_CONNECT_TIMEOUT
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.ASYNC_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.ASYNC_HTTP_MAX_KEEPALIVE,
+        ),
+        timeout=httpx.Timeout(connect, connect=connect, pool=connect),
+    )
+
+
+def get_async_client():
+    """Return the pooled client of the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = _new_client()
+    return client
+
+
+async def aclose_async_client():
+    """Close the running loop's client (ASGI lifespan shutdown, tests)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -1,10 +1,26 @@
 import json
-import requests
+from functools import wraps
+
 from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from jose import jwt
 
+from .jwks import get_jwks_store
+from .token_cache import get_token_cache
+
+
+class Auth0User:
+    def __init__(self, payload):
+        self.payload = payload
+        self.is_authenticated = True
+
+    def __getattr__(self, attr):
+        return self.payload.get(attr, None)
+
+
 class Auth0JSONWebTokenAuthentication(JWTAuthentication):
     def authenticate(self, request):
         auth_header = request.headers.get('Authorization', None)
@@ -15,42 +31,51 @@ class Auth0JSONWebTokenAuthentication(JWTAuthentication):
         try:
             token = auth_header.split()[1]
             payload = self.verify_jwt(token)
+            return (Auth0User(payload), token)
 
-            class Auth0User:
-                def __init__(self, payload):
-                    self.payload = payload
-                    self.is_authenticated = True
+        except Exception as e:
+            raise AuthenticationFailed(f"JWT Authentication failed: {str(e)}")
+
+    async def aauthenticate(self, request):
+        """`authenticate` for async views (JWKS misses don't block the event loop)."""
+        auth_header = request.headers.get('Authorization', None)
 
-                def __getattr__(self, attr):
-                    return self.payload.get(attr, None)
+        if not auth_header:
+            return None
 
-            user = Auth0User(payload)
-            return (user, token)
+        try:
+            token = auth_header.split()[1]
+            payload = await self.averify_jwt(token)
+            return (Auth0User(payload), token)
 
         except Exception as e:
             raise AuthenticationFailed(f"JWT Authentication failed: {str(e)}")
 
     def verify_jwt(self, token):
-        auth0_domain = "dev-w3nk36t6hbc8zq2s.us.auth0.com"
-        auth0_audience = "http://localhost:8000"
+        #Step 0: Already verified this exact token? (skips signature + claims checks)
+        cached = get_token_cache().get(token)
+        if cached is not None:
+            return cached
+
+        #Step 1: Decode the token header to get the key ID
+        header = jwt.get_unverified_header(token)
+
+        #Step 2: Look the key up in the process-wide JWKS cache (fetched from Auth0 on miss)
+        rsa_key = get_jwks_store().get_key(header.get("kid"))
+        return self._decode(token, rsa_key)
 
-        #Step 1: Get JSON Web Key Set (JWKS) from Auth0
-        jwks_url = f"https://{auth0_domain}/.well-known/jwks.json"
-        jwks = requests.get(jwks_url).json()
+    async def averify_jwt(self, token):
+        cached = get_token_cache().get(token)
+        if cached is not None:
+            return cached
 
-        #Step 2: Decode the token header to get the key ID
         header = jwt.get_unverified_header(token)
-        rsa_key = {}
-
-        for key in jwks["keys"]:
-            if key["kid"] == header["kid"]:
-                rsa_key = {
-                    "kty": key["kty"],
-                    "kid": key["kid"],
-                    "use": key["use"],
-                    "n": key["n"],
-                    "e": key["e"]
-                }
+        rsa_key = await get_jwks_store().aget_key(header.get("kid"))
+        return self._decode(token, rsa_key)
+
+    def _decode(self, token, rsa_key):
+        auth0_domain = settings.AUTH0_DOMAIN
+        auth0_audience = settings.AUTH0_AUDIENCE
 
         if not rsa_key:
             raise AuthenticationFailed("No valid key found")
@@ -64,10 +89,48 @@ class Auth0JSONWebTokenAuthentication(JWTAuthentication):
                 audience=auth0_audience,
                 issuer=f"https://{auth0_domain}/"
             )
-            return payload  #Returns Auth0 user data
         except jwt.ExpiredSignatureError:
             raise AuthenticationFailed("Token has expired")
         except jwt.JWTClaimsError:
             raise AuthenticationFailed("Invalid claims, check audience and issuer")
         except Exception as e:
             raise AuthenticationFailed(f"JWT Verification failed: {str(e)}")
+
+        get_token_cache().put(token, payload)
+        return payload  #Returns Auth0 user data
+
+
+def async_auth0_view(*methods):
+    """
+    Decorator for native async views served through backend/asgi.py: only
+    `methods` are allowed and the bearer token is verified like
+    Auth0JSONWebTokenAuthentication does for DRF views, with request.user set
+    to the Auth0User. Errors get DRF's status codes and {"detail": ...} body.
+    Like @api_view, the view is CSRF-exempt (bearer-token auth).
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+
+            authenticator = Auth0JSONWebTokenAuthentication()
+            try:
+                result = await authenticator.aauthenticate(request)
+            except AuthenticationFailed as e:
+                return _unauthorized(authenticator, e.detail)
+            if result is None:
+                return _unauthorized(authenticator, "Authentication credentials were not provided.")
+            request.user = result[0]
+            return await view(request, *args, **kwargs)
+
+        return inner
+
+    return decorator
+
+
+def _unauthorized(authenticator, detail):
+    response = JsonResponse({"detail": str(detail)}, status=401)
+    response["WWW-Authenticate"] = authenticator.authenticate_header(None)
+    return response
@@ -0,0 +1,214 @@
+"""
+Coach assignment for new AI-training and Zoom-booking rows.
+
+The add-on signals and the sync_ai_training / sync_zoom_bookings backfills
+used to hand every client to `User.objects.filter(role="coach").first()`.
+They now ask `assign_coach` (the backfills `assign_coaches`, per batch),
+which works from an in-process roster of coaches: ids, specialty keywords
+and open-queue loads (pending CoachTrainingProgress + CoachBooking rows).
+The roster loads with two queries and is then kept current incrementally:
+the User / CoachProfile signals add, update or drop single coaches, and
+each assignment bumps the chosen coach's load. Other processes notice a
+change through a generation number in Django's cache and reload. Loads
+drift as work gets completed, so the roster also reloads every
+COACH_ROSTER_TTL seconds.
+
+Strategies (settings.COACH_ASSIGNMENT_STRATEGY):
+  - least_loaded: coach with the fewest open items (heap, O(log coaches))
+  - round_robin: next coach in id order (O(1))
+  - specialty: least-loaded coach whose CoachProfile.specialties mention
+    the client's primary goal, falling back to least_loaded
+"""
+import heapq
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+_GENERATION_KEY = "coach-roster:generation"
+
+
+def _keywords(specialties):
+    """'Fat loss, muscle-gain' -> {"fat_loss", "muscle_gain"}"""
+    parts = re.split(r"[,;/\n]+", (specialties or "").lower())
+    return {re.sub(r"[\s-]+", "_", p.strip()) for p in parts if p.strip()}
+
+
+class CoachRoster:
+    """Thread-safe in-memory view of the coaches and their open-queue loads."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._generation = None
+        self._coaches = []      # ids, ascending (round-robin order)
+        self._loads = {}        # coach id -> open items
+        self._keywords = {}     # coach id -> specialty keywords
+        self._heap = []         # (load, coach id); stale entries skipped lazily
+        self._next = 0
+
+    # -- loading ----------------------------------------------------------
+
+    def _stale(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            return True
+        return cache.get(_GENERATION_KEY) != self._generation
+
+    def _load(self):
+        from users.models import User, CoachTrainingProgress, CoachBooking
+
+        coaches = dict(
+            User.objects.filter(role="coach")
+            .order_by("id")
+            .values_list("id", "coachprofile__specialties")
+        )
+        loads = dict.fromkeys(coaches, 0)
+        for model in (CoachTrainingProgress, CoachBooking):
+            open_items = (
+                model.objects.filter(coach_id__in=coaches, status="Pending")
+                .order_by()
+                .values("coach_id")
+                .annotate(n=Count("id"))
+            )
+            for row in open_items:
+                loads[row["coach_id"]] += row["n"]
+
+        self._coaches = list(coaches)
+        self._loads = loads
+        self._keywords = {coach_id: _keywords(text) for coach_id, text in coaches.items()}
+        self._heap = [(load, coach_id) for coach_id, load in loads.items()]
+        heapq.heapify(self._heap)
+        self._next = 0
+        self._loaded_at = time.monotonic()
+        self._generation = cache.get(_GENERATION_KEY)
+
+    def _ensure_loaded(self):
+        if self._stale():
+            self._load()
+
+    # -- strategies -------------------------------------------------------
+
+    def _take(self, coach_id):
+        self._loads[coach_id] += 1
+        heapq.heappush(self._heap, (self._loads[coach_id], coach_id))
+        return coach_id
+
+    def least_loaded(self):
+        while self._heap:
+            load, coach_id = heapq.heappop(self._heap)
+            if self._loads.get(coach_id) == load:
+                return self._take(coach_id)
+        return None
+
+    def round_robin(self):
+        if not self._coaches:
+            return None
+        coach_id = self._coaches[self._next % len(self._coaches)]
+        self._next += 1
+        return self._take(coach_id)
+
+    def specialist(self, keyword):
+        matches = [c for c in self._coaches if keyword in self._keywords[c]] if keyword else []
+        if not matches:
+            return self.least_loaded()
+        return self._take(min(matches, key=lambda c: (self._loads[c], c)))
+
+    def assign(self, strategy, keyword=None):
+        with self._lock:
+            self._ensure_loaded()
+            if strategy == "round_robin":
+                return self.round_robin()
+            if strategy == "specialty":
+                return self.specialist(keyword)
+            return self.least_loaded()
+
+    # -- incremental updates (signals) ------------------------------------
+
+    def _bump_generation(self):
+        # Other processes reload; this one stays current without reloading
+        cache.add(_GENERATION_KEY, 0, timeout=None)
+        try:
+            generation = cache.incr(_GENERATION_KEY)
+        except ValueError:  # evicted between add and incr
+            generation = None
+        if self._loaded_at is not None:
+            self._generation = generation
+
+    def upsert(self, coach_id, specialties=None):
+        with self._lock:
+            if self._loaded_at is not None:
+                if coach_id not in self._loads:
+                    self._loads[coach_id] = 0
+                    self._coaches = sorted(self._coaches + [coach_id])
+                    heapq.heappush(self._heap, (0, coach_id))
+                    self._keywords[coach_id] = set()
+                if specialties is not None:
+                    self._keywords[coach_id] = _keywords(specialties)
+            self._bump_generation()
+
+    def remove(self, coach_id, was_coach=False):
+        """
+        Drop `coach_id`. Other processes are only told to reload when it was
+        in this roster or the caller knows it was a coach (demotion, delete),
+        so saves of plain clients don't invalidate every roster.
+        """
+        with self._lock:
+            known = self._loads.pop(coach_id, None) is not None
+            if known:
+                self._coaches.remove(coach_id)
+                self._keywords.pop(coach_id, None)
+            if known or was_coach:
+                self._bump_generation()
+
+    def loads(self):
+        with self._lock:
+            self._ensure_loaded()
+            return dict(self._loads)
+
+
+_roster = None
+_roster_lock = threading.Lock()
+
+
+def get_coach_roster():
+    global _roster
+    if _roster is None:
+        with _roster_lock:
+            if _roster is None:
+                _roster = CoachRoster(ttl=settings.COACH_ROSTER_TTL)
+    return _roster
+
+
+def reset_coach_roster():
+    global _roster
+    with _roster_lock:
+        _roster = None
+
+
+def _client_goal(user_id):
+    from users.models import UserProfile
+
+    return UserProfile.objects.filter(user_id=user_id).values_list("primary_goal", flat=True).first()
+
+
+def assign_coach(user_id):
+    """Pick the coach id for a new queue item of client `user_id` (None: no coach)."""
+    strategy = settings.COACH_ASSIGNMENT_STRATEGY
+    keyword = _client_goal(user_id) if strategy == "specialty" else None
+    return get_coach_roster().assign(strategy, keyword)
+
+
+def assign_coaches(user_ids):
+    """`assign_coach` for a batch of new queue items, in order (one goal query at most)."""
+    from users.models import UserProfile
+
+    strategy = settings.COACH_ASSIGNMENT_STRATEGY
+    goals = {}
+    if strategy == "specialty":
+        goals = dict(UserProfile.objects.filter(user_id__in=set(user_ids)).values_list("user_id", "primary_goal"))
+    roster = get_coach_roster()
+    return [roster.assign(strategy, goals.get(user_id)) for user_id in user_ids]
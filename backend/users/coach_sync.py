@@ -0,0 +1,74 @@
+"""
+Set-based backfill of the coach tables from active add-ons (used by the
+sync_ai_training / sync_zoom_bookings commands).
+
+Add-ons still missing their coach row are found with a single anti-join
+(NOT EXISTS), streamed with .iterator() and inserted with bulk_create in
+batches, each batch's coaches picked through the roster like the add-on
+signals do (users/coach_assignment.py). ignore_conflicts skips rows that a concurrent sync or the add-on
+signals (users/models.py) inserted in the meantime: CoachTrainingProgress
+is one-to-one with its add-on and CoachBooking allows one pending booking
+per add-on. The reported count is the rows actually inserted, taken from
+the batch's row count before and after the INSERT.
+"""
+import time
+
+from django.db.models import Exists, OuterRef
+
+from .coach_assignment import assign_coaches
+from .conditional import bump_coach_lists
+from .models import AddOn
+
+
+def missing_addons(addon_type, existing):
+    """(addon id, user id) of active `addon_type` add-ons with no row in `existing`."""
+    return (
+        AddOn.objects
+        .filter(addon_type=addon_type, status="active")
+        .filter(~Exists(existing.filter(addon=OuterRef("pk"))))
+        .order_by("id")
+        .values_list("id", "user_id")
+    )
+
+
+def sync_missing(missing, existing, make_row, batch_size, dry_run=False):
+    """
+    Create `make_row(addon_id, user_id, coach_id)` for every row of `missing`
+    (the `missing_addons` of `existing`). Returns (rows inserted, seconds); a
+    dry run only counts them.
+    """
+    start = time.perf_counter()
+    if dry_run:
+        return missing.count(), time.perf_counter() - start
+
+    synced = 0
+    batch = []
+    for addon_id, user_id in missing.iterator(chunk_size=batch_size):
+        batch.append((addon_id, user_id))
+        if len(batch) >= batch_size:
+            synced += _flush(batch, existing, make_row)
+    if batch:
+        synced += _flush(batch, existing, make_row)
+    return synced, time.perf_counter() - start
+
+
+def _flush(batch, existing, make_row):
+    coaches = assign_coaches([user_id for _, user_id in batch])
+    rows = [
+        make_row(addon_id, user_id, coach_id)
+        for (addon_id, user_id), coach_id in zip(batch, coaches)
+        if coach_id  # the last coach left meanwhile
+    ]
+    batch.clear()
+    if not rows:
+        return 0
+    # bulk_create can't tell which rows ignore_conflicts skipped: count them
+    present = existing.filter(addon_id__in=[row.addon_id for row in rows])
+    before = present.count()
+    type(rows[0]).objects.bulk_create(rows, ignore_conflicts=True)
+    bump_coach_lists()  # bulk_create sends no post_save
+    return present.count() - before
+
+
+def throughput(count, seconds):
+    return f"{seconds:.2f}s ({count / seconds if seconds else 0:,.0f} rows/s)"
@@ -0,0 +1,156 @@
+"""
+Conditional GET (ETag) for the read endpoints the SPA polls.
+
+Each endpoint supplies a validator: a cheap function returning the row
+versions / `updated_at` watermarks its payload is built from. The strong
+ETag is a digest of those values, so the view (queries + serialization) only
+runs when something it reads has changed; otherwise a 304 is returned
+straight away. No Last-Modified is sent: a watermark is the newest current
+row, so deleting that row moves it backwards and If-Modified-Since would
+answer 304 for changed data. The (count, newest) pairs in the ETag catch it. Outcomes are counted per endpoint in the Django cache so the
+304 rate can be reported (see `manage.py conditional_stats`).
+
+Rows touched through queryset.update() or save(update_fields=...) must set
+`updated_at` explicitly, otherwise the watermark does not move.
+
+The coach listings span every client, so watermarks over them would scan
+whole tables on each poll. They use one version number in the shared cache
+instead (`coach_lists_version`), bumped by every write a coach list can
+show: the per-user invalidations (`invalidate_user_payloads`), the queue
+row signals and the coach_sync bulk inserts. Without a shared cache the
+coach lists get no conditional handling at all.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Subquery, Value
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+ENDPOINTS = set()
+OUTCOMES = ("full", "not_modified")
+_COUNTER_KEY = "conditional:{endpoint}:{outcome}"
+_COACH_LISTS_KEY = "conditional:coach-lists:version"
+
+
+def watermarks(user, *querysets):
+    """
+    Row versions for a validator, fetched in a single query anchored on the
+    requesting user's row: (user.updated_at, (count, newest), ...) with one
+    (row count, newest `updated_at`) pair per queryset. Pass `(queryset, field)`
+    to use another timestamp column. The count makes deletes move the value.
+    """
+    from users.models import User
+
+    columns = {"_user": F("updated_at")}
+    for i, spec in enumerate(querysets):
+        qs, field = spec if isinstance(spec, tuple) else (spec, "updated_at")
+        # Grouping on a constant yields a single aggregate row: a scalar subquery
+        whole = qs.order_by().annotate(_all=Value(1)).values("_all")
+        columns[f"_n{i}"] = Subquery(whole.annotate(n=Count("pk")).values("n"))
+        columns[f"_m{i}"] = Subquery(whole.annotate(m=Max(field)).values("m"))
+
+    row = User.objects.filter(pk=user.pk).annotate(**columns).values_list(*columns).first()
+    if row is None:
+        return None
+    user_version, rest = row[0], row[1:]
+    return (user_version,) + tuple(zip(rest[::2], rest[1::2]))
+
+
+def coach_lists_version():
+    """Current version of the coach listings; None without a shared cache."""
+    if not settings.SHARED_CACHE:
+        return None
+    version = cache.get(_COACH_LISTS_KEY)
+    if version is None:
+        # Start from the clock so a version lost to eviction can't be reused
+        version = time.time_ns()
+        if not cache.add(_COACH_LISTS_KEY, version, timeout=None):
+            version = cache.get(_COACH_LISTS_KEY, version)
+    return version
+
+
+def bump_coach_lists():
+    """Change the coach listings' ETags after a write they may show."""
+    try:
+        cache.incr(_COACH_LISTS_KEY)
+    except ValueError:  # no version yet: nothing has been served under one
+        pass
+
+
+def conditional(endpoint, validator):
+    """
+    View decorator (place it under @api_view / @permission_classes).
+    `validator(request, *args, **kwargs)` returns a tuple of hashable values
+    describing the payload version, or None to skip conditional handling
+    (e.g. unknown user; the view then produces its own error).
+    """
+    ENDPOINTS.add(endpoint)
+
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+
+            parts = validator(request, *args, **kwargs)
+            if parts is None:
+                return view(request, *args, **kwargs)
+
+            etag = _etag(endpoint, parts)
+
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                record(endpoint, "not_modified")
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                record(endpoint, "full")
+
+            response["ETag"] = etag
+            # Per-user data: browsers may keep it but must revalidate each time
+            response["Cache-Control"] = "private, no-cache"
+            patch_vary_headers(response, ("Authorization",))
+            return response
+
+        return inner
+
+    return decorator
+
+
+def _etag(endpoint, parts):
+    blob = repr((endpoint,) + tuple(parts)).encode()
+    return f'"{hashlib.sha256(blob).hexdigest()[:32]}"'
+
+
+def record(endpoint, outcome):
+    key = _COUNTER_KEY.format(endpoint=endpoint, outcome=outcome)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:  # evicted between add and incr
+        cache.set(key, 1, timeout=None)
+
+
+def conditional_stats():
+    """{endpoint: {"full", "not_modified", "not_modified_rate"}} for this cache."""
+    stats = {}
+    for endpoint in sorted(ENDPOINTS):
+        counts = {
+            outcome: cache.get(_COUNTER_KEY.format(endpoint=endpoint, outcome=outcome), 0)
+            for outcome in OUTCOMES
+        }
+        total = sum(counts.values())
+        counts["not_modified_rate"] = counts["not_modified"] / total if total else 0.0
+        stats[endpoint] = counts
+    return stats
+
+
+def reset_conditional_stats():
+    cache.delete_many([
+        _COUNTER_KEY.format(endpoint=endpoint, outcome=outcome)
+        for endpoint in ENDPOINTS for outcome in OUTCOMES
+    ])
@@ -0,0 +1,81 @@
+"""
+Resolve the `users.User` row behind the authenticated Auth0 subject.
+
+Views used to run `User.objects.filter(auth0_id=...).first()` themselves
+(and `_require_coach` ran it a second time). `get_current_user` does the
+lookup once per request, attaches the result to the request, and keeps a
+short-TTL copy in Django's cache so repeat requests don't hit the database.
+The cache entry is dropped by the User post_save/post_delete signals, so
+the cache is only enabled on a shared (Redis) cache; see settings.py.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+_UNRESOLVED = object()
+
+
+def _cache_key(auth0_id):
+    return f"users:by-auth0:{auth0_id}"
+
+
+def _auth0_id(request):
+    payload = getattr(request.user, "payload", None) or {}
+    return payload.get("sub")
+
+
+def get_current_user(request):
+    """
+    Return the User for `request.user.payload["sub"]` (or None).
+
+    The result is memoised on the underlying HttpRequest as
+    `request.resolved_user`, so every helper called during the same request
+    shares a single lookup.
+    """
+    http_request = getattr(request, "_request", request)
+    resolved = getattr(http_request, "resolved_user", _UNRESOLVED)
+    if resolved is not _UNRESOLVED:
+        return resolved
+
+    auth0_id = _auth0_id(request)
+    user = None
+    if auth0_id:
+        ttl = settings.USER_RESOLVE_CACHE_TTL
+        if ttl:
+            user = cache.get(_cache_key(auth0_id))
+        if user is None:
+            from users.models import User
+
+            user = User.objects.filter(auth0_id=auth0_id).first()
+            if user is not None and ttl:
+                cache.set(_cache_key(auth0_id), user, ttl)
+
+    http_request.resolved_user = user
+    return user
+
+
+async def aget_current_user(request):
+    """`get_current_user` for async views (async cache and ORM calls)."""
+    resolved = getattr(request, "resolved_user", _UNRESOLVED)
+    if resolved is not _UNRESOLVED:
+        return resolved
+
+    auth0_id = _auth0_id(request)
+    user = None
+    if auth0_id:
+        ttl = settings.USER_RESOLVE_CACHE_TTL
+        if ttl:
+            user = await cache.aget(_cache_key(auth0_id))
+        if user is None:
+            from users.models import User
+
+            user = await User.objects.filter(auth0_id=auth0_id).afirst()
+            if user is not None and ttl:
+                await cache.aset(_cache_key(auth0_id), user, ttl)
+
+    request.resolved_user = user
+    return user
+
+
+def invalidate_cached_user(auth0_id):
+    if auth0_id:
+        cache.delete(_cache_key(auth0_id))
@@ -0,0 +1,127 @@
+"""
+Batch expiry of subscriptions and add-ons whose end_date has passed.
+
+Rows are expired in chunks: each batch claims up to `batch_size` overdue
+ids with SELECT ... FOR UPDATE SKIP LOCKED and flips them with one set-based
+UPDATE, so several runners (the management command, the scheduler thread
+of the Stripe event worker) can work at the same time without blocking
+or double-counting each other. Re-running is harmless: only rows still
+'active' are touched.
+
+Because queryset.update() bypasses signals, each batch sets `updated_at`
+(ETag watermarks) and invalidates the owners' cached payloads (and cached
+User rows, see current_user.py) itself.
+Clients left without an active subscription fall back to plan 'none', and
+add-on batches recompute their owners' AddOnBalance rows in the same
+transaction.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .addon_ledger import refresh_balances
+from .current_user import invalidate_cached_user
+from .models import User, Subscription, AddOn
+from .payload_cache import invalidate_user_payloads
+
+logger = logging.getLogger(__name__)
+
+EXPIRABLE = {
+    "subscriptions": Subscription,
+    "addons": AddOn,
+}
+
+
+def expire_batch(model, now, batch_size):
+    """Expire one chunk of overdue `model` rows. Returns (rows expired, owner ids)."""
+    with transaction.atomic():
+        rows = list(
+            model.objects.select_for_update(skip_locked=True)
+            .filter(status="active", end_date__lt=now)
+            .order_by()
+            .values_list("id", "user_id")[:batch_size]
+        )
+        if not rows:
+            return 0, set()
+        expired = model.objects.filter(id__in=[pk for pk, _ in rows], status="active").update(
+            status="expired", updated_at=now
+        )
+        user_ids = {user_id for _, user_id in rows}
+        if model is AddOn:
+            refresh_balances(user_ids, now)
+    return expired, user_ids
+
+
+def _lapse_plans(user_ids, now):
+    lapsed = dict(
+        User.objects.filter(id__in=user_ids)
+        .exclude(subscription_plan="none")
+        .exclude(subscriptions__status="active")
+        .values_list("id", "auth0_id")
+    )
+    if not lapsed:
+        return 0
+    # Re-check in the UPDATE: a renewal may have landed since the select
+    updated = User.objects.filter(id__in=lapsed).exclude(subscriptions__status="active").update(
+        subscription_plan="none", updated_at=now
+    )
+    for auth0_id in lapsed.values():
+        invalidate_cached_user(auth0_id)
+    return updated
+
+
+def run_expiry(batch_size=None, now=None):
+    """
+    Expire every overdue row, batch by batch. Returns the run's metrics:
+    rows expired per table, plans lapsed, batches and duration.
+    """
+    batch_size = batch_size or settings.EXPIRY_BATCH_SIZE
+    now = now or timezone.now()
+    started = time.perf_counter()
+    stats = {name: 0 for name in EXPIRABLE}
+    stats.update(plans_lapsed=0, batches=0)
+
+    for name, model in EXPIRABLE.items():
+        while True:
+            expired, user_ids = expire_batch(model, now, batch_size)
+            if not user_ids:
+                break
+            stats["batches"] += 1
+            stats[name] += expired
+            if model is Subscription:
+                stats["plans_lapsed"] += _lapse_plans(user_ids, now)
+            for user_id in user_ids:
+                invalidate_user_payloads(user_id)
+
+    stats["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info("Expiry run: %s", stats, extra={"expiry": stats})
+    return stats
+
+
+def start_expiry_scheduler(interval=None, batch_size=None):
+    """
+    Run `run_expiry` every `interval` seconds on a daemon thread of this
+    process. Returns the threading.Event that stops the thread once set, or
+    None when the interval is 0 (disabled). Started by the long-running
+    worker commands, never on app import.
+    """
+    interval = settings.EXPIRY_SCHEDULER_INTERVAL if interval is None else interval
+    if interval <= 0:
+        return None
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            close_old_connections()
+            try:
+                run_expiry(batch_size)
+            except Exception:
+                logger.exception("Expiry run failed")
+        close_old_connections()
+
+    threading.Thread(target=loop, name="expiry-scheduler", daemon=True).start()
+    return stop
@@ -0,0 +1,237 @@
+"""
+Process-wide JWKS key store used by Auth0JSONWebTokenAuthentication.
+
+Auth0 signing keys change very rarely, so instead of downloading
+/.well-known/jwks.json on every request we keep the parsed keys in memory,
+indexed by `kid`, and share them between all threads of the process.
+Downloads go through the pooled "auth0" session (users/outbound_http.py).
+Async views use `aget_key`, which downloads through the shared httpx client
+(users/async_http.py) instead of blocking the event loop.
+"""
+import asyncio
+import re
+import threading
+import time
+import weakref
+
+from django.conf import settings
+
+from .async_http import get_async_client
+from .outbound_http import get_session
+
+
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+def _parse_max_age(cache_control):
+    """Return the max-age (seconds) of a Cache-Control header, or None."""
+    if not isinstance(cache_control, str):
+        return None
+    if "no-cache" in cache_control.lower() or "no-store" in cache_control.lower():
+        return 0
+    match = _MAX_AGE_RE.search(cache_control)
+    return int(match.group(1)) if match else None
+
+
+class JWKSKeyStore:
+    """
+    Thread-safe in-memory JWKS cache.
+
+    - Keys are indexed by `kid` (O(1) lookup instead of scanning the key list).
+    - The TTL comes from the Cache-Control header of the JWKS response
+      (falling back to `default_ttl`). Once expired, keys keep being served
+      while a background thread refreshes them.
+    - An unknown `kid` triggers one synchronous refetch (key rotation),
+      rate limited by `min_refetch_interval` so bogus tokens can't hammer Auth0.
+    - If Auth0 is unreachable, the last known keys are kept (stale serving).
+    """
+
+    def __init__(self, jwks_url, default_ttl=600, min_refetch_interval=30, timeout=5):
+        self.jwks_url = jwks_url
+        self.default_ttl = default_ttl
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+
+        self._keys = {}
+        self._expires_at = 0.0
+        self._last_fetch_at = None
+        self._refreshing = False
+        self._state_lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._async_fetch_locks = weakref.WeakKeyDictionary()  # event loop -> asyncio.Lock
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "stale_served": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def get_key(self, kid):
+        """Return the RSA JWK dict for `kid`, or None if Auth0 doesn't know it."""
+        key = self._keys.get(kid)
+        if key is not None:
+            self._incr("hits")
+            if time.monotonic() >= self._expires_at:
+                self._incr("stale_served")
+                self._refresh_in_background()
+            return key
+
+        self._incr("misses")
+        self._refetch_for_unknown_kid(kid)
+        return self._keys.get(kid)
+
+    async def aget_key(self, kid):
+        """`get_key` for async callers: an unknown `kid` is fetched without blocking the loop."""
+        key = self._keys.get(kid)
+        if key is not None:
+            self._incr("hits")
+            if time.monotonic() >= self._expires_at:
+                self._incr("stale_served")
+                self._refresh_in_background()
+            return key
+
+        self._incr("misses")
+        loop = asyncio.get_running_loop()
+        lock = self._async_fetch_locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            if kid not in self._keys and self._may_refetch():
+                await self._afetch()
+        return self._keys.get(kid)
+
+    def stats(self):
+        """Snapshot of the hit/miss/refresh counters."""
+        with self._state_lock:
+            snapshot = dict(self._stats)
+        snapshot["keys"] = len(self._keys)
+        snapshot["expires_in"] = max(0.0, self._expires_at - time.monotonic())
+        return snapshot
+
+    def clear(self):
+        with self._state_lock:
+            self._keys = {}
+            self._expires_at = 0.0
+            self._last_fetch_at = None
+            for name in self._stats:
+                self._stats[name] = 0
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _incr(self, name):
+        with self._state_lock:
+            self._stats[name] += 1
+
+    def _refetch_for_unknown_kid(self, kid):
+        # One thread fetches, the others wait and then re-check the index.
+        with self._fetch_lock:
+            if kid in self._keys or not self._may_refetch():
+                return
+            self._fetch()
+
+    def _may_refetch(self):
+        return (self._last_fetch_at is None
+                or time.monotonic() - self._last_fetch_at >= self.min_refetch_interval)
+
+    def _refresh_in_background(self):
+        with self._state_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _run():
+            try:
+                with self._fetch_lock:
+                    if time.monotonic() < self._expires_at:
+                        return  # someone else refreshed in the meantime
+                    self._fetch()
+            finally:
+                with self._state_lock:
+                    self._refreshing = False
+
+        threading.Thread(target=_run, name="jwks-refresh", daemon=True).start()
+
+    def _fetch(self):
+        """Download the JWKS and swap the index. Must hold `_fetch_lock`."""
+        self._last_fetch_at = time.monotonic()
+        try:
+            resp = get_session("auth0").get(self.jwks_url, timeout=self.timeout)
+            resp.raise_for_status()
+            keys = _index_keys(resp.json())
+        except Exception:
+            return self._fetch_failed()
+        return self._install(keys, resp.headers.get("Cache-Control"))
+
+    async def _afetch(self):
+        """`_fetch` over the shared async client. Must hold the loop's async fetch lock."""
+        self._last_fetch_at = time.monotonic()
+        try:
+            resp = await get_async_client().get(self.jwks_url, timeout=self.timeout)
+            resp.raise_for_status()
+            keys = _index_keys(resp.json())
+        except Exception:
+            return self._fetch_failed()
+        return self._install(keys, resp.headers.get("Cache-Control"))
+
+    def _fetch_failed(self):
+        # Keep serving whatever we had; retry after min_refetch_interval.
+        self._incr("refresh_failures")
+        with self._state_lock:
+            self._expires_at = time.monotonic() + self.min_refetch_interval
+        return False
+
+    def _install(self, keys, cache_control):
+        ttl = _parse_max_age(cache_control)
+        if ttl is None:
+            ttl = self.default_ttl
+
+        with self._state_lock:
+            self._keys = keys
+            self._expires_at = time.monotonic() + ttl
+            self._stats["refreshes"] += 1
+        return True
+
+
+def _index_keys(jwks):
+    """RSA keys of a JWKS document, indexed by `kid`."""
+    keys = {}
+    for key in jwks.get("keys", []):
+        if key.get("kty") != "RSA" or "kid" not in key:
+            continue
+        keys[key["kid"]] = {
+            "kty": key["kty"],
+            "kid": key["kid"],
+            "use": key.get("use", "sig"),
+            "n": key["n"],
+            "e": key["e"],
+        }
+    return keys
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_jwks_store():
+    """Return the process-wide JWKS store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = JWKSKeyStore(
+                    f"https://{settings.AUTH0_DOMAIN}/.well-known/jwks.json",
+                    default_ttl=settings.JWKS_CACHE_TTL,
+                    min_refetch_interval=settings.JWKS_MIN_REFETCH_INTERVAL,
+                    timeout=settings.OUTBOUND_HTTP_TIMEOUTS["auth0"][1],
+                )
+    return _store
+
+
+def reset_jwks_store():
+    """Drop the process-wide store (used by tests and settings changes)."""
+    global _store
+    with _store_lock:
+        _store = None
@@ -0,0 +1,82 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from users.models import User
+from users.search import search_clients, trigram_search_available
+
+SEED_PREFIX = "bench-search-"
+
+
+class Command(BaseCommand):
+    help = "Seed N users and time the coach client search (run against PostgreSQL)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000_000, help="Rows to seed (default 1M)")
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--query", action="append", dest="queries",
+                            help="Search term (repeatable). Defaults to a few typical terms.")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query")
+        parser.add_argument("--limit", type=int, default=50)
+        parser.add_argument("--cleanup", action="store_true", help="Delete the seeded rows afterwards")
+
+    def handle(self, *args, **opts):
+        if not trigram_search_available():
+            self.stdout.write(self.style.WARNING(
+                f"Database vendor is '{connection.vendor}': trigram indexes are not used, "
+                "timings only reflect the icontains fallback."
+            ))
+
+        self._seed(opts["users"], opts["batch_size"])
+        queries = opts["queries"] or ["4242", "bench-search-99999", "user_1234", "zzz-no-match"]
+
+        for q in queries:
+            qs, ranked = search_clients(User.objects.filter(role="user"), q)
+            ordering = ("-search_rank", "id") if ranked else ("id",)
+            page = qs.order_by(*ordering).values_list("id", flat=True)[:opts["limit"]]
+
+            timings = []
+            for _ in range(opts["repeat"]):
+                start = time.perf_counter()
+                list(page.all())  # fresh clone: no result cache
+                timings.append((time.perf_counter() - start) * 1000)
+
+            timings.sort()
+            p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+            self.stdout.write(
+                f"q={q!r:<24} p50={statistics.median(timings):8.2f} ms  "
+                f"p95={p95:8.2f} ms  max={timings[-1]:8.2f} ms"
+            )
+            if connection.vendor == "postgresql":
+                self.stdout.write("  plan: " + page.explain().splitlines()[0])
+
+        if opts["cleanup"]:
+            deleted, _ = User.objects.filter(email__startswith=SEED_PREFIX).delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} seeded rows."))
+
+    def _seed(self, total, batch_size):
+        existing = User.objects.filter(email__startswith=SEED_PREFIX).count()
+        if existing >= total:
+            self.stdout.write(f"{existing} seeded users already present.")
+            return
+
+        start = time.perf_counter()
+        for offset in range(existing, total, batch_size):
+            batch = [
+                User(
+                    auth0_id=f"{SEED_PREFIX}{i}",
+                    email=f"{SEED_PREFIX}{i}@example.com",
+                    username=f"user_{i}",
+                    role="user",
+                )
+                for i in range(offset, min(offset + batch_size, total))
+            ]
+            User.objects.bulk_create(batch, ignore_conflicts=True)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE users_user")
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {total - existing} users in {time.perf_counter() - start:.1f}s."
+        ))
@@ -0,0 +1,133 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from users.models import User, AddOn, AddOnBalance, CoachTrainingProgress, CoachBooking
+from users.views import _training_rows, _booking_rows
+
+SEED_PREFIX = "bench-queue-"
+
+
+def _legacy_training_rows():
+    # The per-client loop coach_training_list used to run, kept for comparison.
+    rows = []
+    grouped = (AddOn.objects.filter(addon_type="ai", status="active")
+               .values("user_id").annotate(total_qty=Sum("quantity")).order_by("user_id"))
+    for row in grouped:
+        u = User.objects.filter(id=row["user_id"]).first()
+        if not u:
+            continue
+        prog = CoachTrainingProgress.objects.filter(user_id=u.id).order_by("-last_updated").first()
+        rows.append({
+            "id": u.id, "user_id": u.id, "user_email": u.email, "quantity": row["total_qty"] or 0,
+            "status": "Pending", "notes": prog.notes if prog else "",
+            "last_updated": prog.last_updated if prog else u.created_at,
+        })
+    return rows
+
+
+def _legacy_booking_rows():
+    # The per-client loop coach_list_bookings used to run, kept for comparison.
+    rows = []
+    grouped = (AddOn.objects.filter(addon_type="zoom", status="active")
+               .values("user_id").annotate(total_qty=Sum("quantity")).order_by("user_id"))
+    for row in grouped:
+        u = User.objects.filter(id=row["user_id"]).first()
+        if not u:
+            continue
+        booking = CoachBooking.objects.filter(user=u).order_by("-updated_at").first()
+        rows.append({
+            "id": u.id, "user_email": u.email, "quantity": row["total_qty"] or 0,
+            "scheduled_date": booking.scheduled_date if booking else None,
+            "completion_date": booking.completion_date if booking else None,
+            "status": booking.status if booking else "Pending",
+            "notes": booking.notes if booking else "",
+            "last_updated": booking.updated_at if booking else timezone.now(),
+        })
+    return rows
+
+
+def _counting(queries):
+    # CaptureQueriesContext keeps at most 9000 queries; the loop runs far more
+    def wrapper(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+    return wrapper
+
+
+class Command(BaseCommand):
+    help = "Seed N clients with AI/Zoom add-ons and compare the coach queue queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=10_000, help="Clients to seed (default 10k)")
+        parser.add_argument("--batch-size", type=int, default=2_000)
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per strategy")
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded rows afterwards")
+
+    def handle(self, *args, **opts):
+        self._seed(opts["clients"], opts["batch_size"])
+        try:
+            for queue, legacy, annotated in (
+                ("training", _legacy_training_rows, _training_rows),
+                ("bookings", _legacy_booking_rows, _booking_rows),
+            ):
+                for label, build in (("loop", legacy), ("annotated", annotated)):
+                    timings = []
+                    for _ in range(opts["repeat"]):
+                        queries = []
+                        with connection.execute_wrapper(_counting(queries)):
+                            start = time.perf_counter()
+                            rows = build()
+                            timings.append((time.perf_counter() - start) * 1000)
+                    self.stdout.write(
+                        f"{queue:>8} {label:>9}: {len(rows):6d} rows  {len(queries):6d} queries  "
+                        f"median {statistics.median(timings):9.2f} ms  max {max(timings):9.2f} ms"
+                    )
+        finally:
+            if not opts["keep"]:
+                deleted, _ = User.objects.filter(email__startswith=SEED_PREFIX).delete()
+                self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} seeded rows."))
+
+    def _seed(self, total, batch_size):
+        # bulk_create skips the add-on signals, so balances, progress rows and
+        # bookings are seeded explicitly (the latter two for every other
+        # client, like a real queue).
+        coach, _ = User.objects.get_or_create(
+            auth0_id=f"{SEED_PREFIX}coach", defaults={"email": f"{SEED_PREFIX}coach@example.com", "role": "coach"}
+        )
+        existing = User.objects.filter(email__startswith=SEED_PREFIX, role="user").count()
+        if existing >= total:
+            self.stdout.write(f"{existing} seeded clients already present.")
+            return
+
+        start = time.perf_counter()
+        for offset in range(existing, total, batch_size):
+            users = User.objects.bulk_create([
+                User(auth0_id=f"{SEED_PREFIX}{i}", email=f"{SEED_PREFIX}{i}@example.com", role="user")
+                for i in range(offset, min(offset + batch_size, total))
+            ])
+            users = list(User.objects.filter(email__in=[u.email for u in users]).order_by("id"))
+            addons = AddOn.objects.bulk_create([
+                AddOn(user=u, addon_type=addon_type, quantity=2, status="active")
+                for u in users for addon_type in ("ai", "zoom")
+            ])
+            AddOnBalance.objects.bulk_create([
+                AddOnBalance(user=u, addon_type=addon_type, quantity=2)
+                for u in users for addon_type in ("ai", "zoom")
+            ])
+            addons = AddOn.objects.filter(user__in=users).order_by("id")
+            CoachTrainingProgress.objects.bulk_create([
+                CoachTrainingProgress(user_id=a.user_id, coach=coach, addon=a, notes="seeded")
+                for a in addons if a.addon_type == "ai" and a.user_id % 2
+            ])
+            CoachBooking.objects.bulk_create([
+                CoachBooking(user_id=a.user_id, coach=coach, addon=a)
+                for a in addons if a.addon_type == "zoom" and a.user_id % 2
+            ])
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {total - existing} clients in {time.perf_counter() - start:.1f}s."
+        ))
@@ -0,0 +1,26 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.conditional import conditional_stats, reset_conditional_stats
+
+
+class Command(BaseCommand):
+    help = "Show per-endpoint conditional GET outcomes (304 rate)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after printing")
+
+    def handle(self, *args, **opts):
+        # Importing the URLconf registers every decorated endpoint
+        import_module(settings.ROOT_URLCONF)
+
+        for endpoint, counts in conditional_stats().items():
+            self.stdout.write(
+                f"{endpoint:<20} full={counts['full']:<8} not_modified={counts['not_modified']:<8} "
+                f"304 rate={counts['not_modified_rate']:.1%}"
+            )
+        if opts["reset"]:
+            reset_conditional_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from users.expiry import run_expiry
+
+
+class Command(BaseCommand):
+    help = "Expire subscriptions and add-ons whose end_date has passed (safe to run concurrently)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.EXPIRY_BATCH_SIZE,
+                            help="Rows claimed and updated per statement")
+        parser.add_argument("--interval", type=int, default=0,
+                            help="Repeat every N seconds instead of running once")
+
+    def handle(self, *args, **opts):
+        while True:
+            close_old_connections()
+            stats = run_expiry(opts["batch_size"])
+            self.stdout.write(
+                f"Expired {stats['subscriptions']} subscription(s) and {stats['addons']} add-on(s), "
+                f"{stats['plans_lapsed']} plan(s) lapsed, in {stats['batches']} batch(es) "
+                f"/ {stats['duration_ms']} ms"
+            )
+            if opts["interval"] <= 0:
+                break
+            time.sleep(opts["interval"])
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from users.outbound_http import BUCKETS_MS, outbound_stats, reset_outbound_stats
+
+
+def _bound(ms):
+    return "inf" if ms == float("inf") else f"{ms}ms"
+
+
+class Command(BaseCommand):
+    help = "Show per-target latency histograms of the outbound HTTP calls (Ollama, Auth0, Stripe)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--buckets", action="store_true", help="Print every histogram bucket")
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after printing")
+
+    def handle(self, *args, **opts):
+        for target, stats in outbound_stats().items():
+            self.stdout.write(
+                f"{target:<8} calls={stats['count']:<8} errors={stats['errors']:<6} "
+                f"mean={stats['mean_ms']:.1f}ms p50<={_bound(stats['p50_ms'])} "
+                f"p95<={_bound(stats['p95_ms'])} p99<={_bound(stats['p99_ms'])}"
+            )
+            if opts["buckets"]:
+                for bound in BUCKETS_MS:
+                    self.stdout.write(f"    <= {_bound(bound):<8} {stats['buckets'][bound]}")
+        if opts["reset"]:
+            reset_outbound_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
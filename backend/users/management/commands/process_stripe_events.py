@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from users.expiry import start_expiry_scheduler
+from users.stripe_events import process_pending_events
+
+
+class Command(BaseCommand):
+    help = "Fulfil Stripe webhook events recorded in the StripeEvent ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll-interval", type=float, default=settings.STRIPE_WORKER_POLL_INTERVAL,
+                            help="Seconds to wait between polls when the ledger is empty")
+        parser.add_argument("--once", action="store_true", help="Drain pending events and exit")
+
+    def handle(self, *args, **opts):
+        self.stdout.write("Stripe event worker started")
+        stop_expiry = None if opts["once"] else start_expiry_scheduler()
+        try:
+            while True:
+                close_old_connections()
+                counts = process_pending_events()
+                if counts:
+                    summary = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+                    style = self.style.ERROR if counts.get("failed") else self.style.SUCCESS
+                    self.stdout.write(style(f"Events: {summary}"))
+                if opts["once"]:
+                    break
+                if not counts:
+                    time.sleep(opts["poll_interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping Stripe event worker")
+        finally:
+            if stop_expiry is not None:
+                stop_expiry.set()
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from users.addon_ledger import rebuild_balances
+
+
+class Command(BaseCommand):
+    help = "Recompute AddOnBalance rows from the add-ons and repair any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Users reconciled per batch")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Report drifted balances without fixing them")
+
+    def handle(self, *args, **opts):
+        stats = rebuild_balances(opts["batch_size"], dry_run=opts["dry_run"])
+        self.stdout.write(
+            f"Checked {stats['checked']} balance(s) of {stats['users']} user(s): "
+            f"{stats['drifted']} drifted, {stats['fixed']} fixed, in {stats['duration_ms']} ms"
+        )
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+import stripe
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from users.stripe_events import HANDLERS, record_event, requeue_failed_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill the StripeEvent ledger from Stripe's event API (deliveries that never "
+        "reached us) and/or queue failed events again. process_stripe_events fulfils them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Fetch events created in the last N days (Stripe keeps 30)")
+        parser.add_argument("--failed", action="store_true", help="Queue events that failed fulfilment again")
+
+    def handle(self, *args, **opts):
+        if opts["days"] is None and not opts["failed"]:
+            raise CommandError("Nothing to do: pass --days N and/or --failed")
+
+        if opts["failed"]:
+            self.stdout.write(f"Requeued {requeue_failed_events()} failed event(s).")
+
+        if opts["days"] is not None:
+            stripe.api_key = settings.STRIPE_SECRET_KEY
+            since = int((timezone.now() - timedelta(days=opts["days"])).timestamp())
+            fetched = added = 0
+            for event_type in HANDLERS:
+                events = stripe.Event.list(type=event_type, created={"gte": since}, limit=100)
+                for event in events.auto_paging_iter():
+                    fetched += 1
+                    added += record_event(event.to_dict())  # plain JSON for the ledger
+            self.stdout.write(self.style.SUCCESS(
+                f"Fetched {fetched} event(s) from Stripe, {added} new in the ledger."
+            ))
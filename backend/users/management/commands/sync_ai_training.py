@@ -1,27 +1,36 @@
 from django.core.management.base import BaseCommand
-from users.models import User, AddOn, CoachTrainingProgress
+from users.coach_assignment import get_coach_roster
+from users.coach_sync import missing_addons, sync_missing, throughput
+from users.models import CoachTrainingProgress
 
 class Command(BaseCommand):
     help = "Sync all active AI AddOns to CoachTrainingProgress table"
 
-    def handle(self, *args, **kwargs):
-        coach = User.objects.filter(role="coach").first()
-        if not coach:
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk insert")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the add-ons to sync")
+
+    def handle(self, *args, **opts):
+        if not get_coach_roster().loads():
             self.stdout.write(self.style.ERROR("No coach found. Create one first."))
             return
 
-        ai_addons = AddOn.objects.filter(addon_type="ai", status="active")
-
-        count = 0
-        for addon in ai_addons:
-            if not hasattr(addon, "training_progress"):
-                CoachTrainingProgress.objects.create(
-                    user=addon.user,
-                    coach=coach,
-                    addon=addon,
-                    status="Pending",
-                    notes=""
-                )
-                count += 1
+        existing = CoachTrainingProgress.objects.all()
+        count, seconds = sync_missing(
+            missing_addons("ai", existing),
+            existing,
+            lambda addon_id, user_id, coach_id: CoachTrainingProgress(
+                user_id=user_id,
+                coach_id=coach_id,
+                addon_id=addon_id,
+                status="Pending",
+                notes=""
+            ),
+            batch_size=opts["batch_size"],
+            dry_run=opts["dry_run"],
+        )
 
-        self.stdout.write(self.style.SUCCESS(f"Synced {count} AI add-ons."))
+        if opts["dry_run"]:
+            self.stdout.write(f"Would sync {count} AI add-ons.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Synced {count} AI add-ons in {throughput(count, seconds)}."))
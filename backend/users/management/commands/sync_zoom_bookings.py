@@ -1,31 +1,39 @@
 from django.core.management.base import BaseCommand
-from users.models import User, AddOn
-from users.models import CoachBooking 
+from users.coach_assignment import get_coach_roster
+from users.coach_sync import missing_addons, sync_missing, throughput
+from users.models import CoachBooking
 
 class Command(BaseCommand):
     help = "Sync all active Zoom AddOns to CoachBooking table"
 
-    def handle(self, *args, **kwargs):
-        coach = User.objects.filter(role="coach").first()
-        if not coach:
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk insert")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the add-ons to sync")
+
+    def handle(self, *args, **opts):
+        if not get_coach_roster().loads():
             self.stdout.write(self.style.ERROR("No coach found. Create one first."))
             return
 
-        zoom_addons = AddOn.objects.filter(addon_type="zoom", status="active")
-
-        count = 0
-        for addon in zoom_addons:
-            # Create a pending booking if none exists for this add-on
-            if not CoachBooking.objects.filter(addon=addon, status="Pending").exists():
-                CoachBooking.objects.create(
-                    user=addon.user,
-                    coach=coach,
-                    addon=addon,
-                    status="Pending",
-                    scheduled_date=None,
-                    completion_date=None,
-                    notes=""
-                )
-                count += 1
+        # Create a pending booking for add-ons that have none
+        existing = CoachBooking.objects.filter(status="Pending")
+        count, seconds = sync_missing(
+            missing_addons("zoom", existing),
+            existing,
+            lambda addon_id, user_id, coach_id: CoachBooking(
+                user_id=user_id,
+                coach_id=coach_id,
+                addon_id=addon_id,
+                status="Pending",
+                scheduled_date=None,
+                completion_date=None,
+                notes=""
+            ),
+            batch_size=opts["batch_size"],
+            dry_run=opts["dry_run"],
+        )
 
-        self.stdout.write(self.style.SUCCESS(f"Synced {count} Zoom add-ons."))
+        if opts["dry_run"]:
+            self.stdout.write(f"Would sync {count} Zoom add-ons.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Synced {count} Zoom add-ons in {throughput(count, seconds)}."))
@@ -0,0 +1,41 @@
+# Trigram indexes backing the coach client search (users/search.py).
+# PostgreSQL only: on other databases this migration is a no-op.
+
+from django.db import migrations
+
+
+INDEXES = {
+    "users_user_email_trgm": "email",
+    "users_user_username_trgm": "username",
+}
+
+
+def create_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, column in INDEXES.items():
+        # Django compiles `icontains` to UPPER(col::text) LIKE UPPER(%s),
+        # so the index must be on that exact expression to be usable.
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON users_user '
+            f'USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_subscription_created_at_alter_subscription_plan_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trgm_indexes, drop_trgm_indexes),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.3 on 2026-10-17 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_updated_at_watermarks'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='addon',
+            index=models.Index(fields=['user', 'addon_type', 'status'], name='addon_user_type_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='addon',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['addon_type', 'user'], name='addon_active_type_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coachbooking',
+            index=models.Index(fields=['user', '-updated_at'], name='booking_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coachtrainingprogress',
+            index=models.Index(fields=['user', '-last_updated'], name='progress_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['user', '-start_date'], name='sub_active_user_start_idx'),
+        ),
+    ]
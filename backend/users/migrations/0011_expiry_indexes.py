@@ -0,0 +1,21 @@
+# Generated by Django 5.0.3 on 2026-10-17 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='addon',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['end_date'], name='addon_active_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['end_date'], name='sub_active_end_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.3 on 2026-10-17 17:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_balances(apps, schema_editor):
+    # One balance row per (user, type) that currently holds active units
+    AddOn = apps.get_model("users", "AddOn")
+    AddOnBalance = apps.get_model("users", "AddOnBalance")
+    totals = (
+        AddOn.objects.filter(status="active")
+        .order_by()
+        .values("user_id", "addon_type")
+        .annotate(total=Sum("quantity"))
+    )
+    AddOnBalance.objects.bulk_create(
+        (
+            AddOnBalance(user_id=row["user_id"], addon_type=row["addon_type"], quantity=row["total"] or 0)
+            for row in totals.iterator(chunk_size=2000)
+        ),
+        batch_size=2000,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_stripe_event_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AddOnBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('addon_type', models.CharField(choices=[('ebook', 'E-Book'), ('zoom', 'Zoom Consultation'), ('ai', 'AI Training Plan')], max_length=20)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='addon_balances', to='users.user')),
+            ],
+            options={
+                'db_table': 'users_addon_balance',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='addonbalance',
+            constraint=models.UniqueConstraint(fields=('user', 'addon_type'), name='addon_balance_user_type_uniq'),
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.3 on 2026-10-17 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_addon_balance'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='add_ons',
+        ),
+        migrations.AddIndex(
+            model_name='addonbalance',
+            index=models.Index(condition=models.Q(('quantity__gt', 0)), fields=['addon_type', 'user'], name='addon_balance_type_user_idx'),
+        ),
+    ]
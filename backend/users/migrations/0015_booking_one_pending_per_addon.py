@@ -0,0 +1,31 @@
+# Generated by Django 5.0.3 on 2026-10-17 18:49
+
+from django.db import migrations, models
+
+
+def drop_duplicate_pending_bookings(apps, schema_editor):
+    # Concurrent zoom syncs could queue the same add-on twice; keep the
+    # booking the coach touched last
+    CoachBooking = apps.get_model("users", "CoachBooking")
+    seen, duplicates = set(), []
+    pending = CoachBooking.objects.filter(status="Pending").order_by("addon_id", "-updated_at", "-id")
+    for booking_id, addon_id in pending.values_list("id", "addon_id"):
+        if addon_id in seen:
+            duplicates.append(booking_id)
+        seen.add(addon_id)
+    CoachBooking.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_addon_balance_reads'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_pending_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='coachbooking',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'Pending')), fields=('addon',), name='booking_one_pending_per_addon'),
+        ),
+    ]
@@ -3,7 +3,7 @@ from django.utils import timezone
 from datetime import timedelta
 from django.contrib.postgres.fields import JSONField  
 from django.db.models import JSONField 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 
@@ -19,8 +19,14 @@ class User(models.Model):
     role = models.CharField(max_length=10, choices=[("user", "User"), ("coach", "Coach")], default="user")
     subscription_plan = models.CharField(max_length=10, choices=[("none", "None"), ("basic", "Basic"), ("advanced", "Advanced")], default="none")
     created_at = models.DateTimeField(auto_now_add=True)
-    add_ons = JSONField(default=dict, blank=True)  
+    updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Role as loaded, so the roster signal can tell a demoted coach apart
+        instance._loaded_role = instance.__dict__.get("role")
+        return instance
 
     def __str__(self):
         return f"{self.username or self.email} - {self.role}"
@@ -68,6 +74,7 @@ class UserProfile(models.Model):
 
     # Timestamp
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.username or self.user.email} Profile"
@@ -115,10 +122,21 @@ class AddOn(models.Model):
     start_date = models.DateTimeField(default=timezone.now)
     end_date = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="active")
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = "users_addons"
         ordering = ["-start_date"]
+        indexes = [
+            # Per-user lookups: dashboard add-ons, coach completion/decrement
+            models.Index(fields=["user", "addon_type", "status"], name="addon_user_type_status_idx"),
+            # Coach queues: active add-ons of one type grouped by user
+            models.Index(fields=["addon_type", "user"], name="addon_active_type_user_idx",
+                         condition=models.Q(status="active")),
+            # Expiry job: overdue active add-ons (users/expiry.py)
+            models.Index(fields=["end_date"], name="addon_active_end_idx",
+                         condition=models.Q(status="active")),
+        ]
 
     def save(self, *args, **kwargs):
         # If it's a Zoom or AI plan and end_date not set, default to 1-year validity
@@ -138,6 +156,33 @@ class AddOn(models.Model):
         return f"{self.user.username or self.user.email} - {self.addon_type} x{self.quantity} ({self.status})"
 
 
+class AddOnBalance(models.Model):
+    """
+    Active units per (user, add-on type): the single source for balances
+    shown to clients and coaches, read with point lookups instead of SUMs
+    over AddOn rows. Maintained by users/addon_ledger.py on purchase,
+    consumption and expiry; `manage.py rebuild_addon_balances` repairs drift.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="addon_balances")
+    addon_type = models.CharField(max_length=20, choices=AddOn.ADDON_CHOICES)
+    quantity = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "users_addon_balance"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "addon_type"], name="addon_balance_user_type_uniq"),
+        ]
+        indexes = [
+            # Coach queues: clients holding units of one type
+            models.Index(fields=["addon_type", "user"], name="addon_balance_type_user_idx",
+                         condition=models.Q(quantity__gt=0)),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.addon_type}: {self.quantity}"
+
+
 # ----------------------------------------------------
 # Coach Bookings (ai_trainings)
 # ----------------------------------------------------
@@ -157,6 +202,9 @@ class CoachTrainingProgress(models.Model):
     class Meta:
         db_table = "coach_training_progress"
         ordering = ["-last_updated"]
+        indexes = [
+            models.Index(fields=["user", "-last_updated"], name="progress_user_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.email} ({self.status})"
@@ -182,6 +230,17 @@ class CoachBooking(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-updated_at"], name="booking_user_updated_idx"),
+        ]
+        constraints = [
+            # One open booking per Zoom add-on (coach_sync relies on it to skip races)
+            models.UniqueConstraint(
+                fields=["addon"], condition=models.Q(status="Pending"), name="booking_one_pending_per_addon"
+            ),
+        ]
+
     def __str__(self):
         return f"ZoomBooking({self.user.email}, {self.status})"
     
@@ -199,11 +258,54 @@ class Subscription(models.Model):
     end_date = models.DateTimeField()
     status = models.CharField(max_length=10, default="active")  # active | expired
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Latest active subscription per user (dashboard, coach client list)
+            models.Index(fields=["user", "-start_date"], name="sub_active_user_start_idx",
+                         condition=models.Q(status="active")),
+            models.Index(fields=["end_date"], name="sub_active_end_idx",
+                         condition=models.Q(status="active")),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.plan} ({self.status})"
 
 
+class StripeEvent(models.Model):
+    """
+    Ledger of received Stripe webhook events, unique on Stripe's event id.
+    The webhook only records the event; `process_stripe_events` fulfils it
+    (see users/stripe_events.py), so retries and duplicates are no-ops.
+    """
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processed", "Processed"),
+        ("ignored", "Ignored"),
+        ("failed", "Failed"),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["received_at"], name="stripe_event_pending_idx",
+                         condition=models.Q(status="pending")),
+        ]
+
+    def __str__(self):
+        return f"StripeEvent({self.event_id}, {self.type}, {self.status})"
+
+
 # --------------------------------------------------------------------
 # Automatic synchronization of add-ons to coach tables
 # --------------------------------------------------------------------
@@ -214,21 +316,24 @@ def auto_create_ai_training_progress(sender, instance, created, **kwargs):
     automatically create a CoachTrainingProgress record.
     """
     if instance.addon_type == "ai" and instance.status == "active":
-        from users.models import CoachTrainingProgress, User
+        from users.coach_assignment import assign_coach
+        from users.models import CoachTrainingProgress
 
-        coach = User.objects.filter(role="coach").first()
-        if not coach:
+        # Create only if no record exists for this AddOn
+        if CoachTrainingProgress.objects.filter(addon=instance).exists():
             return
 
-        # Create only if no record exists for this AddOn
-        if not CoachTrainingProgress.objects.filter(addon=instance).exists():
-            CoachTrainingProgress.objects.create(
-                user=instance.user,
-                coach=coach,
-                addon=instance,
-                status="Pending",
-                notes=""
-            )
+        coach_id = assign_coach(instance.user_id)
+        if not coach_id:
+            return
+
+        CoachTrainingProgress.objects.create(
+            user_id=instance.user_id,
+            coach_id=coach_id,
+            addon=instance,
+            status="Pending",
+            notes=""
+        )
 
 
 @receiver(post_save, sender=AddOn)
@@ -238,17 +343,110 @@ def auto_create_zoom_booking(sender, instance, created, **kwargs):
     automatically create a CoachBooking record.
     """
     if instance.addon_type == "zoom" and instance.status == "active":
-        from users.models import CoachBooking, User
+        from users.coach_assignment import assign_coach
+        from users.models import CoachBooking
+
+        if CoachBooking.objects.filter(addon=instance).exists():
+            return
 
-        coach = User.objects.filter(role="coach").first()
-        if not coach:
+        coach_id = assign_coach(instance.user_id)
+        if not coach_id:
             return
 
-        if not CoachBooking.objects.filter(addon=instance).exists():
-            CoachBooking.objects.create(
-                user=instance.user,
-                coach=coach,
-                addon=instance,
-                status="Pending"
-            )
+        CoachBooking.objects.create(
+            user_id=instance.user_id,
+            coach_id=coach_id,
+            addon=instance,
+            status="Pending"
+        )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_resolved_user(sender, instance, **kwargs):
+    """
+    Drop the cached auth0_id -> User entry used by get_current_user
+    whenever the row changes, so role/plan updates are seen immediately.
+    """
+    from users.current_user import invalidate_cached_user
+
+    invalidate_cached_user(instance.auth0_id)
+
+
+@receiver(post_save, sender=CoachTrainingProgress)
+@receiver(post_delete, sender=CoachTrainingProgress)
+@receiver(post_save, sender=CoachBooking)
+@receiver(post_delete, sender=CoachBooking)
+def invalidate_coach_lists(sender, instance, **kwargs):
+    """Queue rows are only shown in the coach listings: move their version."""
+    from users.conditional import bump_coach_lists
+
+    bump_coach_lists()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+@receiver(post_save, sender=AddOn)
+@receiver(post_delete, sender=AddOn)
+def invalidate_user_payload_cache(sender, instance, **kwargs):
+    """
+    Bump the owner's payload generation so the cached user-detail / add-on
+    payloads are rebuilt on the next read.
+    """
+    from users.payload_cache import invalidate_user_payloads
+
+    invalidate_user_payloads(instance.id if sender is User else instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refresh_coach_roster(sender, instance, **kwargs):
+    """
+    Keep the coach assignment roster in step with coach accounts. Saves
+    that cannot have changed who is a coach (update_fields without `role`,
+    a client staying a client) leave it, and the other processes, alone.
+    """
+    from users.coach_assignment import get_coach_roster
+
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and "role" not in update_fields:
+        return
+
+    roster = get_coach_roster()
+    was_coach = getattr(instance, "_loaded_role", None) == "coach"
+    if kwargs["signal"] is post_save and instance.role == "coach":
+        roster.upsert(instance.id)
+    else:
+        roster.remove(instance.id, was_coach=was_coach or instance.role == "coach")
+    instance._loaded_role = instance.role
+
+
+@receiver(post_save, sender=CoachProfile)
+def refresh_coach_specialties(sender, instance, **kwargs):
+    from users.coach_assignment import get_coach_roster
+
+    get_coach_roster().upsert(instance.user_id, instance.specialties)
+
+
+@receiver(post_save, sender=AddOn)
+@receiver(post_delete, sender=AddOn)
+def maintain_addon_balance(sender, instance, created=False, origin=None, **kwargs):
+    """
+    Purchases credit the balance directly; other saves and deletes (admin
+    edits, rare) recompute it. Consumption and expiry go through
+    users/addon_ledger.py, which updates the balance itself.
+    """
+    if origin is not None and getattr(origin, "model", type(origin)) is not AddOn:
+        return  # cascade from deleting the user: the balance rows go too
+
+    from users.addon_ledger import credit_balance, refresh_balance
 
+    if created:
+        if instance.status == "active" and instance.quantity:
+            credit_balance(instance.user_id, instance.addon_type, instance.quantity)
+    else:
+        refresh_balance(instance.user_id, instance.addon_type)
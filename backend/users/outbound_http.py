@@ -0,0 +1,182 @@
+"""
+Pooled, keep-alive requests sessions for the synchronous outbound calls
+(Ollama generation from the worker, Auth0 JWKS downloads, the Stripe SDK).
+
+Calling `requests.get/post` directly opens a new TCP/TLS connection per
+call. `get_session(target)` instead returns one Session per target host,
+shared by all threads of the process, whose adapter keeps up to
+OUTBOUND_HTTP_POOL_SIZE connections alive. Each target has:
+  - default (connect, read) timeouts from OUTBOUND_HTTP_TIMEOUTS, used
+    when the caller passes none
+  - retries with exponential backoff (OUTBOUND_HTTP_RETRIES /
+    OUTBOUND_HTTP_BACKOFF) on connection errors and 502/503/504, for
+    idempotent methods only; a POST is retried only when it never reached
+    the server (connect error). Stripe gets no adapter retries: the SDK
+    retries itself with idempotency keys (stripe.max_network_retries).
+
+Every call's wall time (retries included) is recorded in a per-target
+latency histogram in Django's cache, so all workers add to the same
+counters (see `manage.py outbound_http_stats`). The async views use
+users/async_http.py instead.
+"""
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+TARGETS = ("ollama", "auth0", "stripe")
+# Upper bounds (ms) of the histogram buckets; the last one catches the rest
+BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, float("inf"))
+_COUNTER_KEY = "outbound:{target}:{counter}"
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class TargetSession(requests.Session):
+    """Session that applies the target's default timeout and times every request."""
+
+    def __init__(self, target, timeout):
+        super().__init__()
+        self.target = target
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = super().request(method, url, **kwargs)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            record(self.target, (time.perf_counter() - started) * 1000, failed)
+
+
+def _retry(target):
+    if target == "stripe":
+        return Retry(total=0, raise_on_status=False)
+    return Retry(
+        total=settings.OUTBOUND_HTTP_RETRIES,
+        backoff_factor=settings.OUTBOUND_HTTP_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,  # idempotent only
+        raise_on_status=False,
+    )
+
+
+def _new_session(target):
+    session = TargetSession(target, settings.OUTBOUND_HTTP_TIMEOUTS[target])
+    adapter = HTTPAdapter(
+        pool_connections=1,  # one host per target
+        pool_maxsize=settings.OUTBOUND_HTTP_POOL_SIZE,
+        max_retries=_retry(target),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(target):
+    """Return the process-wide pooled session of `target`, creating it on first use."""
+    session = _sessions.get(target)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(target)
+            if session is None:
+                session = _sessions[target] = _new_session(target)
+    return session
+
+
+def reset_sessions():
+    """Close and drop every session (used by tests and settings changes)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+    configure_stripe()  # the SDK held the old "stripe" session
+
+
+def configure_stripe():
+    """Route the Stripe SDK through the pooled "stripe" session."""
+    import stripe
+
+    stripe.default_http_client = stripe.RequestsClient(
+        session=get_session("stripe"), timeout=settings.OUTBOUND_HTTP_TIMEOUTS["stripe"]
+    )
+    stripe.max_network_retries = settings.OUTBOUND_HTTP_RETRIES
+
+
+# -- latency histograms ---------------------------------------------------
+
+def _bucket(elapsed_ms):
+    for bound in BUCKETS_MS:
+        if elapsed_ms <= bound:
+            return bound
+    return BUCKETS_MS[-1]
+
+
+def _incr(key, delta=1):
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:  # evicted between add and incr
+        cache.set(key, delta, timeout=None)
+
+
+def _key(target, counter):
+    return _COUNTER_KEY.format(target=target, counter=counter)
+
+
+def _counters():
+    return ["count", "errors", "sum_ms"] + [f"le_{bound}" for bound in BUCKETS_MS]
+
+
+def record(target, elapsed_ms, failed=False):
+    _incr(_key(target, f"le_{_bucket(elapsed_ms)}"))
+    _incr(_key(target, "count"))
+    _incr(_key(target, "sum_ms"), int(round(elapsed_ms)))
+    if failed:
+        _incr(_key(target, "errors"))
+
+
+def _percentile(buckets, count, fraction):
+    """Upper bound of the bucket holding the `fraction` quantile."""
+    seen = 0
+    for bound in BUCKETS_MS:
+        seen += buckets[bound]
+        if seen >= fraction * count:
+            return bound
+    return BUCKETS_MS[-1]
+
+
+def outbound_stats():
+    """
+    {target: {"count", "errors", "mean_ms", "p50_ms", "p95_ms", "p99_ms",
+    "buckets"}}. Percentiles are bucket upper bounds.
+    """
+    stats = {}
+    for target in TARGETS:
+        values = cache.get_many([_key(target, counter) for counter in _counters()])
+        counts = {counter: values.get(_key(target, counter), 0) for counter in _counters()}
+        count = counts["count"]
+        buckets = {bound: counts[f"le_{bound}"] for bound in BUCKETS_MS}
+        stats[target] = {
+            "count": count,
+            "errors": counts["errors"],
+            "mean_ms": counts["sum_ms"] / count if count else 0.0,
+            "p50_ms": _percentile(buckets, count, 0.50) if count else 0,
+            "p95_ms": _percentile(buckets, count, 0.95) if count else 0,
+            "p99_ms": _percentile(buckets, count, 0.99) if count else 0,
+            "buckets": buckets,
+        }
+    return stats
+
+
+def reset_outbound_stats():
+    cache.delete_many([_key(target, counter) for target in TARGETS for counter in _counters()])
@@ -0,0 +1,115 @@
+"""
+Keyset (cursor) pagination helpers for the coach listings.
+
+OFFSET pagination makes the database walk and discard every row before the
+requested page, and the matching COUNT(*) scans the whole result set. With a
+keyset cursor the next page is a plain index range scan:
+
+    WHERE (created_at, id) > (:last_created_at, :last_id) ORDER BY created_at, id LIMIT n
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Supported orderings: name -> model fields (all ascending, `id` as tie-breaker)
+KEYSET_ORDERINGS = {
+    "id": ("id",),
+    "created_at": ("created_at", "id"),
+}
+
+# COUNT(*) stops after this many rows when an approximate count is requested
+APPROX_COUNT_CAP = 10000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(ordering, obj):
+    values = []
+    for field in KEYSET_ORDERINGS[ordering]:
+        value = getattr(obj, field)
+        values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+    raw = json.dumps({"o": ordering, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _parse_id(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise TypeError("id must be an integer")
+    return value
+
+
+def _parse_created_at(value):
+    if not isinstance(value, str):
+        raise TypeError("created_at must be an ISO 8601 string")
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError("created_at is not a datetime")
+    return parsed
+
+
+# Cursor value parsers per keyset field; they raise TypeError / ValueError
+_FIELD_PARSERS = {"id": _parse_id, "created_at": _parse_created_at}
+
+
+def decode_cursor(cursor, ordering):
+    """
+    Return the key values stored in `cursor` (None for an empty cursor),
+    typed for the ordering's fields. Raises InvalidCursor for anything a
+    client could have crafted.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = data["v"]
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+    fields = KEYSET_ORDERINGS[ordering]
+    if data.get("o") != ordering or not isinstance(values, list) or len(values) != len(fields):
+        raise InvalidCursor("Cursor does not match the requested ordering")
+    try:
+        return [_FIELD_PARSERS[field](value) for field, value in zip(fields, values)]
+    except (TypeError, ValueError):
+        raise InvalidCursor("Malformed cursor")
+
+
+def keyset_filter(ordering, values):
+    """Q object selecting the rows strictly after `values` in `ordering`."""
+    fields = KEYSET_ORDERINGS[ordering]
+    if len(fields) == 1:
+        return Q(**{f"{fields[0]}__gt": values[0]})
+    # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+    return Q(**{f"{fields[0]}__gt": values[0]}) | Q(**{fields[0]: values[0], f"{fields[1]}__gt": values[1]})
+
+
+def keyset_page(qs, ordering, after, limit):
+    """
+    Slice one page out of `qs`. Returns (rows, next_cursor); next_cursor is
+    None on the last page. Fetches limit + 1 rows to detect the end.
+    """
+    values = decode_cursor(after, ordering)
+    if values is not None:
+        qs = qs.filter(keyset_filter(ordering, values))
+    rows = list(qs.order_by(*KEYSET_ORDERINGS[ordering])[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(ordering, rows[-1]) if has_more and rows else None
+    return rows, next_cursor
+
+
+def count_rows(qs, mode):
+    """
+    mode: "exact" -> COUNT(*), "approx" -> COUNT(*) capped at APPROX_COUNT_CAP
+    rows, anything else -> skipped. Returns (count, is_approximate).
+    """
+    if mode == "exact":
+        return qs.count(), False
+    if mode == "approx":
+        count = qs.order_by().values("pk")[:APPROX_COUNT_CAP].count()
+        return count, count >= APPROX_COUNT_CAP
+    return None, False
@@ -0,0 +1,92 @@
+"""
+Per-user read-through cache for dashboard payloads (user-detail, add-ons).
+
+Payloads live in Django's cache under a key that embeds a per-user
+generation number. The cache is only enabled when REDIS_URL points at a
+shared cache (see settings.py): the generation is bumped in the process that
+writes, and a per-process cache would hide that from every other worker. Saving or
+deleting the user's User / UserProfile / Subscription / AddOn rows bumps the
+generation (see the receivers in users/models.py), so stale entries are
+simply never read again and expire on their own. Code that changes those
+tables with queryset.update() must call `invalidate_user_payloads` itself.
+
+A miss takes a short lock with cache.add() before querying the database, so
+a burst of concurrent requests for the same user runs the builder once while
+the others wait for its result.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .conditional import bump_coach_lists
+
+
+def _generation_key(user_id):
+    return f"payload:gen:{user_id}"
+
+
+def _payload_key(kind, user_id, generation):
+    return f"payload:{kind}:{user_id}:{generation}"
+
+
+def _generation(user_id):
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Start from the clock so a generation lost to eviction can't be reused
+        generation = time.time_ns()
+        if not cache.add(key, generation, timeout=None):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def invalidate_user_payloads(user_id):
+    """
+    Make every cached payload of `user_id` unreachable. The user's rows also
+    appear in the coach listings, so their version moves too.
+    """
+    bump_coach_lists()
+    key = _generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:  # no generation yet: nothing cached for this user
+        pass
+
+
+def cached_user_payload(kind, user_id, build):
+    """
+    Return the cached `kind` payload for `user_id`, calling `build()` on a
+    miss. Concurrent misses for the same key wait for a single builder.
+    """
+    ttl = settings.USER_PAYLOAD_CACHE_TTL
+    if not ttl:
+        return build()
+
+    generation = _generation(user_id)
+    key = _payload_key(kind, user_id, generation)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    lock_key = f"{key}:lock"
+    lock_timeout = settings.USER_PAYLOAD_CACHE_LOCK_TIMEOUT
+    if cache.add(lock_key, 1, timeout=lock_timeout):
+        try:
+            payload = build()
+            cache.set(key, payload, ttl)
+        finally:
+            cache.delete(lock_key)
+        return payload
+
+    # Someone else is building this payload: wait for it rather than
+    # running the same queries again.
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(settings.USER_PAYLOAD_CACHE_POLL_INTERVAL)
+        payload = cache.get(key)
+        if payload is not None:
+            return payload
+        if cache.get(lock_key) is None:
+            break  # builder failed or finished without storing
+    return build()
@@ -0,0 +1,34 @@
+"""
+Client search for the coach dashboard.
+
+On PostgreSQL the `email__icontains` / `username__icontains` filters are
+served by the pg_trgm GIN indexes created in migration 0008 (they are built
+on UPPER(column) because that is the expression Django emits for
+icontains), and results are ranked by trigram similarity. Other databases
+(SQLite in tests) get the plain unranked icontains filter.
+"""
+from django.db import connections
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+def trigram_search_available(using="default"):
+    return connections[using].vendor == "postgresql"
+
+
+def search_clients(qs, q):
+    """
+    Filter `qs` (Users) on `q`. Returns (queryset, ranked); when ranked is
+    True the queryset carries a `search_rank` annotation (0..1).
+    """
+    qs = qs.filter(Q(email__icontains=q) | Q(username__icontains=q))
+    if not trigram_search_available(qs.db):
+        return qs, False
+
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    qs = qs.annotate(search_rank=Greatest(
+        TrigramSimilarity("email", q),
+        TrigramSimilarity(Coalesce("username", Value("")), q),
+    ))
+    return qs, True
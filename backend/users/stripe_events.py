@@ -0,0 +1,177 @@
+"""
+Stripe webhook ingestion and fulfilment.
+
+The webhook view verifies the signature, records the event in the
+StripeEvent ledger (unique on Stripe's event id) and answers 200 straight
+away, so Stripe's retries and duplicate deliveries cost one rejected
+insert and never reach fulfilment twice.
+
+`process_stripe_events` fulfils pending events one at a time: the event row
+is claimed with SELECT ... FOR UPDATE SKIP LOCKED and its fulfilment
+commits in the same transaction as the status change, so each event's
+side effects are applied exactly once. A crash rolls both back, and
+concurrent workers skip the locked row. Failed events stay 'failed' until
+`replay_stripe_events --failed` queues them again.
+"""
+import json
+import logging
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import User, Subscription, AddOn, StripeEvent
+from .payload_cache import invalidate_user_payloads
+
+logger = logging.getLogger(__name__)
+
+
+class Ignored(Exception):
+    """Raised by a handler when the event needs no fulfilment (e.g. unknown user)."""
+
+
+def record_event(event):
+    """
+    Add a verified Stripe event (a plain dict: the parsed webhook body or
+    `stripe.Event.to_dict()`) to the ledger. Returns False when it was
+    already recorded (a retry or duplicate delivery). Event types without a
+    handler are stored as 'ignored'.
+    """
+    event_type = event["type"]
+    try:
+        with transaction.atomic():
+            StripeEvent.objects.create(
+                event_id=event["id"],
+                type=event_type,
+                payload=event,
+                status="pending" if event_type in HANDLERS else "ignored",
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def fulfil_checkout(event):
+    """checkout.session.completed: start the purchased plan and add-ons."""
+    session = event["data"]["object"]
+    metadata = session.get("metadata", {}) or {}
+    plan = metadata.get("plan", "none")
+    add_ons_raw = metadata.get("add_ons", "{}")
+
+    try:
+        addons = json.loads(add_ons_raw)
+    except json.JSONDecodeError:
+        addons = {}
+
+    email = metadata.get("email") or session.get("customer_email")
+    auth0_id = metadata.get("auth0_id")
+
+    user = None
+    if auth0_id:
+        user = User.objects.filter(auth0_id=auth0_id).first()
+    if not user and email:
+        user = User.objects.filter(email=email).first()
+
+    if not user:
+        raise Ignored(f"No user found for: {email}")
+
+    # --- Update subscription ---
+    if plan in ["basic", "advanced"]:
+        Subscription.objects.filter(user=user, status="active").update(status="expired", updated_at=timezone.now())
+        invalidate_user_payloads(user.id)
+        start_date = timezone.now()
+        end_date = start_date + timedelta(days=30)
+        Subscription.objects.create(
+            user=user,
+            plan=plan,
+            start_date=start_date,
+            end_date=end_date,
+            status="active",
+        )
+        user.subscription_plan = plan
+
+    # --- Update add-ons (balances are credited by the AddOn signal) ---
+    purchased = {}
+    for key, qty in addons.items():
+        qty = int(qty)
+        if qty <= 0:
+            continue
+        if key == "ebook":
+            exists = AddOn.objects.filter(
+                user=user, addon_type="ebook", status__in=["active", "used"]
+            ).exists()
+            if not exists:
+                AddOn.objects.create(
+                    user=user,
+                    addon_type="ebook",
+                    quantity=1,
+                    start_date=timezone.now(),
+                    end_date=None,
+                    status="active",
+                )
+                purchased["ebook"] = 1
+            continue
+        end_date = timezone.now() + timedelta(days=30)
+        AddOn.objects.create(
+            user=user,
+            addon_type=key,
+            quantity=qty,
+            start_date=timezone.now(),
+            end_date=end_date,
+            status="active",
+        )
+        purchased[key] = purchased.get(key, 0) + qty
+
+    user.save(update_fields=["subscription_plan", "updated_at"])
+    logger.info("Fulfilled checkout for %s: plan=%s, addons=%s", user.email, plan, purchased)
+
+
+HANDLERS = {
+    "checkout.session.completed": fulfil_checkout,
+}
+
+
+def process_next_event():
+    """
+    Fulfil the oldest pending event. Returns it (with its final status), or
+    None when nothing is pending or every pending row is locked elsewhere.
+    """
+    with transaction.atomic():
+        event = (
+            StripeEvent.objects.select_for_update(skip_locked=True)
+            .filter(status="pending")
+            .order_by("received_at")
+            .first()
+        )
+        if event is None:
+            return None
+
+        event.attempts += 1
+        try:
+            with transaction.atomic():  # savepoint: a failure undoes only the fulfilment
+                HANDLERS[event.type](event.payload)
+        except Ignored as e:
+            event.status, event.error = "ignored", str(e)
+        except Exception as e:
+            logger.exception("Stripe event %s failed", event.event_id)
+            event.status, event.error = "failed", str(e)
+        else:
+            event.status, event.error = "processed", ""
+        event.processed_at = timezone.now()
+        event.save(update_fields=["status", "error", "attempts", "processed_at"])
+    return event
+
+
+def process_pending_events(limit=None):
+    """Drain the queue (or up to `limit` events). Returns {status: count}."""
+    counts = {}
+    while limit is None or sum(counts.values()) < limit:
+        event = process_next_event()
+        if event is None:
+            break
+        counts[event.status] = counts.get(event.status, 0) + 1
+    return counts
+
+
+def requeue_failed_events():
+    return StripeEvent.objects.filter(status="failed").update(status="pending", error="")
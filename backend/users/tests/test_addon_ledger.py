@@ -0,0 +1,167 @@
+# users/tests/test_addon_ledger.py
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.addon_ledger import consume_addon, get_balance, rebuild_balances, refresh_balance
+from users.expiry import run_expiry
+from users.models import User, AddOn, AddOnBalance
+
+
+@pytest.fixture
+def client_user():
+    return User.objects.create(auth0_id="auth0|ledger", email="ledger@example.com")
+
+
+@pytest.mark.django_db
+def test_purchase_credits_balance(client_user):
+    AddOn.objects.create(user=client_user, addon_type="zoom", quantity=2)
+    AddOn.objects.create(user=client_user, addon_type="zoom", quantity=3)
+    AddOn.objects.create(user=client_user, addon_type="zoom", quantity=4, status="used")
+
+    assert get_balance(client_user.id, "zoom") == 5
+    assert get_balance(client_user.id, "ai") == 0
+
+
+@pytest.mark.django_db
+def test_consume_takes_largest_row_and_flips_status(client_user):
+    small = AddOn.objects.create(user=client_user, addon_type="ai", quantity=1)
+    big = AddOn.objects.create(user=client_user, addon_type="ai", quantity=2)
+
+    first = consume_addon(client_user.id, "ai")
+    assert (first.addon_id, first.addon_quantity, first.addon_status, first.remaining) == (big.id, 1, "active", 2)
+
+    consume_addon(client_user.id, "ai")
+    last = consume_addon(client_user.id, "ai")
+    assert last.remaining == 0
+    assert consume_addon(client_user.id, "ai") is None
+
+    small.refresh_from_db()
+    big.refresh_from_db()
+    assert (small.quantity, small.status) == (0, "used")
+    assert (big.quantity, big.status) == (0, "used")
+    assert get_balance(client_user.id, "ai") == 0
+
+
+@pytest.mark.django_db
+def test_consume_is_not_fooled_by_stale_instances(client_user):
+    addon = AddOn.objects.create(user=client_user, addon_type="zoom", quantity=1)
+    stale = AddOn.objects.get(pk=addon.pk)  # another request read it earlier
+
+    assert consume_addon(client_user.id, "zoom", addon_id=stale.id).addon_status == "used"
+    assert consume_addon(client_user.id, "zoom", addon_id=stale.id) is None
+
+    addon.refresh_from_db()
+    assert addon.quantity == 0
+
+
+@pytest.mark.django_db
+def test_consume_only_touches_the_requested_addon(client_user):
+    used = AddOn.objects.create(user=client_user, addon_type="zoom", quantity=1, status="used")
+    AddOn.objects.create(user=client_user, addon_type="zoom", quantity=2)
+
+    assert consume_addon(client_user.id, "zoom", addon_id=used.id) is None
+    assert get_balance(client_user.id, "zoom") == 2
+
+
+@pytest.mark.django_db
+def test_consume_is_two_statements(client_user):
+    AddOn.objects.create(user=client_user, addon_type="ai", quantity=3)
+
+    with CaptureQueriesContext(connection) as ctx:
+        consume_addon(client_user.id, "ai")
+    updates = [q["sql"] for q in ctx.captured_queries if q["sql"].lstrip().upper().startswith("UPDATE")]
+    assert len(updates) == 2
+    assert not any("SUM(" in q["sql"].upper() for q in ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_missing_balance_row_is_rebuilt(client_user):
+    AddOn.objects.create(user=client_user, addon_type="ai", quantity=3)
+    AddOnBalance.objects.filter(user=client_user).delete()
+
+    assert consume_addon(client_user.id, "ai").remaining == 2
+    assert get_balance(client_user.id, "ai") == 2
+
+
+@pytest.mark.django_db
+def test_edits_and_deletes_recompute_balance(client_user):
+    addon = AddOn.objects.create(user=client_user, addon_type="ai", quantity=3)
+    addon.quantity = 5
+    addon.save()
+    assert get_balance(client_user.id, "ai") == 5
+
+    addon.delete()
+    assert get_balance(client_user.id, "ai") == 0
+    assert refresh_balance(client_user.id, "ai") == 0
+
+
+@pytest.mark.django_db
+def test_deleting_user_drops_balances(client_user):
+    AddOn.objects.create(user=client_user, addon_type="ai", quantity=3)
+    client_user.delete()
+    assert not AddOnBalance.objects.exists()
+
+
+@pytest.mark.django_db
+def test_expiry_refreshes_balances(client_user):
+    AddOn.objects.create(user=client_user, addon_type="zoom", quantity=2, end_date=timezone.now() - timedelta(days=1))
+    AddOn.objects.create(user=client_user, addon_type="zoom", quantity=1, end_date=timezone.now() + timedelta(days=5))
+    assert get_balance(client_user.id, "zoom") == 3
+
+    run_expiry(batch_size=10)
+    assert get_balance(client_user.id, "zoom") == 1
+
+
+@pytest.mark.django_db
+def test_subscription_endpoint_reads_balances(client_user):
+    client = APIClient()
+    client.force_authenticate(user=SimpleNamespace(is_authenticated=True, payload={"sub": client_user.auth0_id}))
+    url = reverse("get_user_subscription")
+    AddOn.objects.create(user=client_user, addon_type="ai", quantity=2)
+
+    first = client.get(url)
+    assert first.json()["add_ons"] == {"ai": 2}
+
+    consume_addon(client_user.id, "ai")
+    again = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert again.status_code == 200
+    assert again.json()["add_ons"] == {"ai": 1}
+
+
+@pytest.mark.django_db
+def test_rebuild_repairs_drift(client_user):
+    other = User.objects.create(auth0_id="auth0|ledger2", email="ledger2@example.com")
+    AddOn.objects.create(user=client_user, addon_type="ai", quantity=3)
+    AddOn.objects.create(user=other, addon_type="zoom", quantity=1)
+    AddOn.objects.bulk_create([AddOn(user=other, addon_type="ebook", quantity=1)])  # no signal: missing row
+    AddOnBalance.objects.filter(user=client_user).update(quantity=7)  # stale row
+
+    assert rebuild_balances(batch_size=1, dry_run=True)["drifted"] == 2
+    assert get_balance(client_user.id, "ai") == 7
+
+    stats = rebuild_balances(batch_size=1)
+    assert (stats["users"], stats["drifted"], stats["fixed"]) == (2, 2, 2)
+    assert get_balance(client_user.id, "ai") == 3
+    assert get_balance(other.id, "ebook") == 1
+    assert rebuild_balances()["drifted"] == 0
+
+
+@pytest.mark.django_db
+def test_rebuild_command(client_user):
+    AddOn.objects.create(user=client_user, addon_type="ai", quantity=3)
+    AddOnBalance.objects.all().delete()
+
+    out = StringIO()
+    call_command("rebuild_addon_balances", "--dry-run", stdout=out)
+    assert "1 drifted, 0 fixed" in out.getvalue()
+    call_command("rebuild_addon_balances", stdout=out)
+    assert get_balance(client_user.id, "ai") == 3
@@ -21,7 +21,9 @@ from jose import jwt as jose_jwt
 import json
 from rest_framework.test import APIClient
 
-from users.models import User, Subscription, AddOn
+from users.models import User, Subscription, AddOn, StripeEvent
+from users.addon_ledger import balances_for
+from users.stripe_events import process_pending_events
 
 def _body(res):
     # DRF Response
@@ -65,7 +67,6 @@ class APITestSuite(APITestCase):
             username="testuser",
             role="user",
             subscription_plan="basic",
-            add_ons={},
         )
 
         # COACH user for coach-only endpoints
@@ -75,7 +76,6 @@ class APITestSuite(APITestCase):
             username="coach",
             role="coach",
             subscription_plan="none",
-            add_ons={},
         )
 
         # default: act as COACH for coach endpoints
@@ -200,11 +200,11 @@ class APITestSuite(APITestCase):
         # Create two client users + data to exercise aggregation/pagination
         u1 = User.objects.create(
             auth0_id="auth0|u1", email="u1@example.com", username="u1",
-            role="user", subscription_plan="basic", add_ons={}
+            role="user", subscription_plan="basic"
         )
         u2 = User.objects.create(
             auth0_id="auth0|u2", email="alpha@example.com", username="alpha",
-            role="user", subscription_plan="none", add_ons={}
+            role="user", subscription_plan="none"
         )
 
         # Active subscription for u1
@@ -275,7 +275,7 @@ class APITestSuite(APITestCase):
         # Ensure a user exists for this sub
         User.objects.create(
             auth0_id="auth0|exists", email="exists@example.com",
-            username="exists", role="user", subscription_plan="none", add_ons={}
+            username="exists", role="user", subscription_plan="none"
         )
         c = APIClient()
         auth_stub = SimpleNamespace(
@@ -409,8 +409,8 @@ class APITestSuite(APITestCase):
 
     def test_coach_list_bookings_aggregates_zoom_and_latest_booking(self):
         zoom = AddOn.objects.create(user=self.user, addon_type="zoom", quantity=2, status="active")
-        CoachBooking.objects.create(
-            user=self.user, coach=self.coach, addon=zoom, status="Pending", notes="init"
+        CoachBooking.objects.update_or_create(
+            user=self.user, addon=zoom, status="Pending", defaults={"coach": self.coach, "notes": "init"}
         )
 
         url = reverse("coach-list-bookings")
@@ -440,6 +440,18 @@ class APITestSuite(APITestCase):
         booking = CoachBooking.objects.filter(user=self.user, coach=self.coach).first()
         assert booking and booking.status == "Completed" and booking.notes == "done"
 
+    def test_coach_update_booking_takes_over_another_coachs_pending_booking(self):
+        other = User.objects.create(auth0_id="auth0|coach2", email="coach2@example.com", role="coach")
+        addon = AddOn.objects.create(user=self.user, addon_type="zoom", quantity=2, status="active")
+        assert CoachBooking.objects.filter(addon=addon).update(coach=other) == 1  # signal-created
+
+        url = reverse("coach-update-booking", args=[self.user.id])
+        res = self.client.patch(url, {"notes": "mine now"}, format="json")
+        assert res.status_code == 200
+
+        booking = CoachBooking.objects.get(addon=addon, status="Pending")
+        assert (booking.coach_id, booking.notes) == (self.coach.id, "mine now")
+
     def test_coach_update_booking_no_addon_400(self):
         url = reverse("coach-update-booking", args=[self.user.id])
         res = self.client.patch(url, {"status": "Completed"}, format="json")
@@ -527,6 +539,7 @@ def test_stripe_webhook_invalid_signature(mock_construct):
 @patch("users.views.stripe.Webhook.construct_event")
 def test_stripe_webhook_completed_no_user_ok(mock_construct):
     event = {
+        "id": "evt_ghost",
         "type": "checkout.session.completed",
         "data": {"object": {
             "customer_email": "ghost@example.com",
@@ -537,8 +550,9 @@ def test_stripe_webhook_completed_no_user_ok(mock_construct):
 
     client = APIClient()
     url = _rev_or("stripe-webhook", "/stripe-webhook/")
-    res = client.post(url, data=b"{}", content_type="application/json")
-    assert res.status_code == 200  # quietly ignores if user not found
+    res = client.post(url, data=json.dumps(event), content_type="application/json")
+    assert res.status_code == 200
+    assert process_pending_events() == {"ignored": 1}  # quietly ignores if user not found
 
 
 # 5) stripe_webhook: completed, updates plan + add-ons (ebook unique rule)
@@ -548,7 +562,7 @@ def test_stripe_webhook_completed_no_user_ok(mock_construct):
 def test_stripe_webhook_completed_updates_user(mock_construct):
     user = User.objects.create(
         auth0_id="auth0|buyer", email="buyer@example.com",
-        username="buyer", role="user", subscription_plan="none", add_ons={}
+        username="buyer", role="user", subscription_plan="none"
     )
     # Pre-existing active subscription to ensure it gets expired
     Subscription.objects.create(
@@ -566,13 +580,14 @@ def test_stripe_webhook_completed_updates_user(mock_construct):
         "billing_period": "monthly",
         "add_ons": json.dumps({"zoom": 2, "ai": 3, "ebook": 1}),
     }
-    event = {"type": "checkout.session.completed", "data": {"object": {"metadata": meta}}}
+    event = {"id": "evt_buyer", "type": "checkout.session.completed", "data": {"object": {"metadata": meta}}}
     mock_construct.return_value = event
 
     client = APIClient()
     url = _rev_or("stripe-webhook", "/stripe-webhook/")
-    res = client.post(url, data=b"{}", content_type="application/json")
+    res = client.post(url, data=json.dumps(event), content_type="application/json")
     assert res.status_code == 200
+    assert process_pending_events() == {"processed": 1}
 
     # Assertions: subscription
     user.refresh_from_db()
@@ -589,20 +604,19 @@ def test_stripe_webhook_completed_updates_user(mock_construct):
     assert zoom_total == 2
     assert ai_total == 3
 
-    assert user.add_ons.get("zoom") == 2
-    assert user.add_ons.get("ai") == 3
-    assert user.add_ons.get("ebook") in (None, 1)
+    # balances credited for the new units
+    assert balances_for(user.id) == {"zoom": 2, "ai": 3, "ebook": 1}
 
 
-# 6) stripe_webhook: DB error during atomic -> 500
+# 6) stripe_webhook: DB error during fulfilment -> event failed, nothing applied
 @pytest.mark.django_db
 @patch("users.views.settings.STRIPE_WEBHOOK_SECRET", "whsec_test")
 @patch("users.views.AddOn.objects.create", side_effect=Exception("DB fail"))
 @patch("users.views.stripe.Webhook.construct_event")
-def test_stripe_webhook_db_error_returns_500(mock_construct, _mock_create):
+def test_stripe_webhook_db_error_marks_event_failed(mock_construct, _mock_create):
     user = User.objects.create(
         auth0_id="auth0|buyer", email="buyer@example.com",
-        username="buyer", role="user", subscription_plan="none", add_ons={}
+        username="buyer", role="user", subscription_plan="none"
     )
     meta = {
         "auth0_id": user.auth0_id,
@@ -611,13 +625,17 @@ def test_stripe_webhook_db_error_returns_500(mock_construct, _mock_create):
         "billing_period": "monthly",
         "add_ons": json.dumps({"zoom": 1}),
     }
-    event = {"type": "checkout.session.completed", "data": {"object": {"metadata": meta}}}
+    event = {"id": "evt_fail", "type": "checkout.session.completed", "data": {"object": {"metadata": meta}}}
     mock_construct.return_value = event
 
     client = APIClient()
     url = _rev_or("stripe-webhook", "/stripe-webhook/")
-    res = client.post(url, data=b"{}", content_type="application/json")
-    assert res.status_code == 500
+    res = client.post(url, data=json.dumps(event), content_type="application/json")
+    assert res.status_code == 200
+    assert process_pending_events() == {"failed": 1}
+
+    assert StripeEvent.objects.get(event_id="evt_fail").error == "DB fail"
+    assert not Subscription.objects.filter(user=user).exists()  # rolled back with the failure
 
 # ---------- helpers ----------
 def _auth_header(token="tok123"):
@@ -668,7 +686,7 @@ def test_verify_jwt_success_builds_rsa_key_and_decodes():
     jwks = {"keys": [{"kid": "abc", "kty": "RSA", "use": "sig", "n": "modulusN", "e": "AQAB"}]}
     token = "header.payload.sig"
 
-    with patch("users.authentication.requests.get") as mock_get, \
+    with patch("users.outbound_http.TargetSession.get") as mock_get, \
          patch("users.authentication.jwt.get_unverified_header", return_value={"kid": "abc"}) as mock_hdr, \
          patch("users.authentication.jwt.decode", return_value={"ok": True}) as mock_decode:
 
@@ -692,7 +710,7 @@ def test_verify_jwt_no_matching_kid_raises():
     jwks = {"keys": [{"kid": "other", "kty": "RSA", "use": "sig", "n": "N", "e": "AQAB"}]}
     token = "t"
 
-    with patch("users.authentication.requests.get", return_value=MagicMock(json=lambda: jwks)), \
+    with patch("users.outbound_http.TargetSession.get", return_value=MagicMock(json=lambda: jwks)), \
          patch("users.authentication.jwt.get_unverified_header", return_value={"kid": "abc"}):
         auth = Auth0JSONWebTokenAuthentication()
         with pytest.raises(AuthenticationFailed) as exc:
@@ -705,7 +723,7 @@ def test_verify_jwt_expired_signature_raises():
     jwks = {"keys": [{"kid": "abc", "kty": "RSA", "use": "sig", "n": "N", "e": "AQAB"}]}
     token = "t"
 
-    with patch("users.authentication.requests.get", return_value=MagicMock(json=lambda: jwks)), \
+    with patch("users.outbound_http.TargetSession.get", return_value=MagicMock(json=lambda: jwks)), \
          patch("users.authentication.jwt.get_unverified_header", return_value={"kid": "abc"}), \
          patch("users.authentication.jwt.decode", side_effect=jose_jwt.ExpiredSignatureError()):
         auth = Auth0JSONWebTokenAuthentication()
@@ -719,7 +737,7 @@ def test_verify_jwt_claims_error_raises():
     jwks = {"keys": [{"kid": "abc", "kty": "RSA", "use": "sig", "n": "N", "e": "AQAB"}]}
     token = "t"
 
-    with patch("users.authentication.requests.get", return_value=MagicMock(json=lambda: jwks)), \
+    with patch("users.outbound_http.TargetSession.get", return_value=MagicMock(json=lambda: jwks)), \
          patch("users.authentication.jwt.get_unverified_header", return_value={"kid": "abc"}), \
          patch("users.authentication.jwt.decode", side_effect=jose_jwt.JWTClaimsError("bad claims")):
         auth = Auth0JSONWebTokenAuthentication()
@@ -733,7 +751,7 @@ def test_verify_jwt_generic_error_raises():
     jwks = {"keys": [{"kid": "abc", "kty": "RSA", "use": "sig", "n": "N", "e": "AQAB"}]}
     token = "t"
 
-    with patch("users.authentication.requests.get", return_value=MagicMock(json=lambda: jwks)), \
+    with patch("users.outbound_http.TargetSession.get", return_value=MagicMock(json=lambda: jwks)), \
          patch("users.authentication.jwt.get_unverified_header", return_value={"kid": "abc"}), \
          patch("users.authentication.jwt.decode", side_effect=Exception("boom")):
         auth = Auth0JSONWebTokenAuthentication()
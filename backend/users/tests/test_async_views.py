@@ -0,0 +1,80 @@
+# users/tests/test_async_views.py
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ai_program_generator.jobs import enqueue_generation
+from users.async_http import aclose_async_client, get_async_client
+from users.models import User
+from users.token_cache import get_token_cache
+
+TOKEN = "header.payload.signature"
+
+
+@pytest.fixture
+def user():
+    return User.objects.create(auth0_id="auth0|async", email="async@example.com")
+
+
+def _verified(token, sub):
+    """Seed the verified-token cache, as if the token had passed RS256 checks."""
+    get_token_cache().put(token, {"sub": sub, "exp": time.time() + 60})
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bearer_token_authenticates_async_view(user):
+    job, _ = enqueue_generation(user)
+    _verified(TOKEN, user.auth0_id)
+
+    res = asyncio.run(AsyncClient().get(
+        reverse("generation_job_status", args=[job.id]), headers={"Authorization": f"Bearer {TOKEN}"}
+    ))
+    assert res.status_code == 200
+    assert res.json()["job_id"] == job.id
+
+
+@pytest.mark.django_db
+def test_missing_or_bad_token_is_rejected_like_drf():
+    url = reverse("generation_job_status", args=[1])
+    client = AsyncClient()
+
+    missing = asyncio.run(client.get(url))
+    assert missing.status_code == 401
+    assert missing.json() == {"detail": "Authentication credentials were not provided."}
+    assert missing["WWW-Authenticate"].startswith("Bearer")
+
+    bad = asyncio.run(client.get(url, headers={"Authorization": "Bearer not-a-jwt"}))
+    assert bad.status_code == 401
+    assert bad.json()["detail"].startswith("JWT Authentication failed")
+
+
+@pytest.mark.django_db
+def test_async_view_has_no_force_authenticate_bypass(user):
+    client = APIClient()
+    client.force_authenticate(user=SimpleNamespace(is_authenticated=True, payload={"sub": user.auth0_id}))
+    assert client.get(reverse("generation_job_status", args=[1])).status_code == 401
+
+
+@pytest.mark.django_db
+def test_async_view_allows_only_its_methods(user):
+    _verified(TOKEN, user.auth0_id)
+    res = asyncio.run(AsyncClient().get(
+        reverse("generate_training_program"), headers={"Authorization": f"Bearer {TOKEN}"}
+    ))
+    assert res.status_code == 405
+
+
+def test_async_client_is_shared_per_event_loop():
+    async def twice():
+        first, second = get_async_client(), get_async_client()
+        await aclose_async_client()
+        return first, second, get_async_client()
+
+    first, second, reopened = asyncio.run(twice())
+    assert first is second
+    assert first.is_closed and reopened is not first
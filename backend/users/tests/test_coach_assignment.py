@@ -0,0 +1,127 @@
+# users/tests/test_coach_assignment.py
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.coach_assignment import _GENERATION_KEY, get_coach_roster, reset_coach_roster
+from users.models import User, UserProfile, CoachProfile, AddOn, CoachTrainingProgress, CoachBooking
+
+
+def _coach(name, specialties=None):
+    coach = User.objects.create(auth0_id=f"auth0|{name}", email=f"{name}@example.com", role="coach")
+    if specialties is not None:
+        CoachProfile.objects.create(user=coach, certifications="", experience_years=3, specialties=specialties)
+    return coach
+
+
+def _client(i, goal=None):
+    user = User.objects.create(auth0_id=f"auth0|client{i}", email=f"client{i}@example.com")
+    if goal:
+        UserProfile.objects.create(
+            user=user, age=30, height_cm=180, weight_kg=80, fitness_level="beginner",
+            primary_goal=goal, workout_frequency="3-4x per week",
+            daily_activity_level="active", sleep_hours=7,
+        )
+    return user
+
+
+def _assigned(addon_type="ai"):
+    model = CoachTrainingProgress if addon_type == "ai" else CoachBooking
+    return list(model.objects.order_by("id").values_list("coach_id", flat=True))
+
+
+@pytest.mark.django_db
+def test_least_loaded_spreads_new_items():
+    busy, idle = _coach("busy"), _coach("idle")
+    for i in range(3):
+        AddOn.objects.create(user=_client(i), addon_type="zoom")
+    CoachBooking.objects.update(coach=busy)  # busy now owns 3 open bookings
+
+    reset_coach_roster()  # next assignment reloads the live queue counts
+    for i in range(3, 7):
+        AddOn.objects.create(user=_client(i), addon_type="ai")
+
+    assert _assigned("ai") == [idle.id, idle.id, idle.id, busy.id]
+    assert get_coach_roster().loads() == {busy.id: 4, idle.id: 3}
+
+
+@pytest.mark.django_db
+def test_round_robin_cycles(settings):
+    settings.COACH_ASSIGNMENT_STRATEGY = "round_robin"
+    coaches = [_coach(f"rr{i}").id for i in range(3)]
+    for i in range(4):
+        AddOn.objects.create(user=_client(i), addon_type="ai")
+    assert _assigned() == coaches + coaches[:1]
+
+
+@pytest.mark.django_db
+def test_specialty_matches_client_goal(settings):
+    settings.COACH_ASSIGNMENT_STRATEGY = "specialty"
+    _coach("generalist", "mobility")
+    lifter = _coach("lifter", "Strength, muscle gain")
+    cutter = _coach("cutter", "Fat-loss; endurance")
+
+    AddOn.objects.create(user=_client(1, "muscle_gain"), addon_type="ai")
+    AddOn.objects.create(user=_client(2, "fat_loss"), addon_type="ai")
+    AddOn.objects.create(user=_client(3, "endurance"), addon_type="ai")
+    assert _assigned() == [lifter.id, cutter.id, cutter.id]
+
+    AddOn.objects.create(user=_client(4), addon_type="ai")  # no profile: least loaded
+    assert _assigned()[-1] not in (lifter.id, cutter.id)
+
+
+@pytest.mark.django_db
+def test_roster_follows_coach_changes_without_reloading():
+    first = _coach("first")
+    AddOn.objects.create(user=_client(1), addon_type="ai")
+
+    second = _coach("second")
+    first.role = "user"
+    first.save()
+    with CaptureQueriesContext(connection) as ctx:
+        AddOn.objects.create(user=_client(2), addon_type="ai")
+
+    assert _assigned() == [first.id, second.id]
+    assert not any('"role"' in q["sql"] and "SELECT" in q["sql"] for q in ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_client_saves_do_not_bump_the_roster_generation():
+    coach = _coach("steady")
+    client = _client(0)
+    get_coach_roster().loads()
+    generation = cache.get(_GENERATION_KEY)
+
+    reset_coach_roster()  # a process whose roster is not loaded
+    for i in range(5):
+        client.email = f"renamed{i}@example.com"
+        client.save()
+    User.objects.get(pk=client.pk).save(update_fields=["email"])
+    coach.save(update_fields=["email"])
+    assert cache.get(_GENERATION_KEY) == generation
+
+    demoted = User.objects.get(pk=coach.pk)
+    demoted.role = "user"
+    demoted.save()
+    assert cache.get(_GENERATION_KEY) == generation + 1
+
+
+@pytest.mark.django_db
+def test_addon_save_does_not_query_coaches_once_loaded():
+    _coach("only")
+    AddOn.objects.create(user=_client(0), addon_type="ai")  # loads the roster
+    client = _client(1)
+
+    with CaptureQueriesContext(connection) as ctx:
+        AddOn.objects.create(user=client, addon_type="ai")
+    # INSERT add-on + balance upsert + existence check + INSERT progress
+    assert len(ctx.captured_queries) == 4
+
+
+@pytest.mark.django_db
+def test_no_coach_creates_nothing():
+    AddOn.objects.create(user=_client(0), addon_type="ai")
+    AddOn.objects.create(user=_client(1), addon_type="zoom")
+    assert not CoachTrainingProgress.objects.exists()
+    assert not CoachBooking.objects.exists()
@@ -0,0 +1,150 @@
+# users/tests/test_coach_queries.py
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User, UserProfile, Subscription, AddOn, CoachTrainingProgress, CoachBooking
+
+
+def _coach_client():
+    User.objects.create(auth0_id="auth0|coach", email="coach@example.com", role="coach")
+    client = APIClient()
+    client.force_authenticate(user=SimpleNamespace(is_authenticated=True, payload={"sub": "auth0|coach"}))
+    return client
+
+
+def _seed_clients(n, start=0):
+    now = timezone.now()
+    for i in range(start, start + n):
+        u = User.objects.create(auth0_id=f"auth0|c{i}", email=f"c{i}@example.com", username=f"c{i}")
+        UserProfile.objects.create(
+            user=u, age=30, height_cm=180, weight_kg=80, fitness_level="beginner",
+            primary_goal="fat_loss", workout_frequency="3-4x per week",
+            daily_activity_level="active", sleep_hours=8,
+        )
+        Subscription.objects.create(user=u, plan="basic", start_date=now - timedelta(days=40),
+                                    end_date=now - timedelta(days=10), status="active")
+        Subscription.objects.create(user=u, plan="advanced", start_date=now - timedelta(days=1),
+                                    end_date=now + timedelta(days=29), status="active")
+        AddOn.objects.create(user=u, addon_type="ebook", quantity=1, status="active")
+        AddOn.objects.create(user=u, addon_type="ai", quantity=2, status="used")
+
+
+def _count_queries(client, url, params):
+    with CaptureQueriesContext(connection) as ctx:
+        res = client.get(url, params)
+    assert res.status_code == 200
+    return len(ctx.captured_queries), res
+
+
+@pytest.mark.django_db
+def test_coach_list_clients_query_count_is_constant():
+    client = _coach_client()
+    url = reverse("coach-list-clients")
+
+    client.get(url)  # warm the resolved-user cache
+    _seed_clients(2)
+    small, res_small = _count_queries(client, url, {"limit": 100})
+    _seed_clients(20, start=2)
+    large, res_large = _count_queries(client, url, {"limit": 100})
+
+    assert len(res_small.data["results"]) == 2
+    assert len(res_large.data["results"]) == 22
+    assert small == large == 3  # count + page + latest subscriptions (ETag from the cache)
+
+    row = res_large.data["results"][0]
+    assert row["subscription_details"]["plan"] == "advanced"
+    assert row["addons"] == {"ebook": 1, "zoom": 0, "ai": 0}
+    assert row["profile"]["age"] == 30
+
+
+def _seed_queues(n, start=0):
+    """Clients with active AI/Zoom add-ons; odd ones have touched progress and bookings."""
+    later = timezone.now() + timedelta(hours=1)
+    for i in range(start, start + n):
+        u = User.objects.create(auth0_id=f"auth0|q{i}", email=f"q{i}@example.com")
+        ai = AddOn.objects.create(user=u, addon_type="ai", quantity=2, status="active")
+        AddOn.objects.create(user=u, addon_type="ai", quantity=1, status="active")
+        AddOn.objects.create(user=u, addon_type="zoom", quantity=3, status="active")
+        # The add-on signals created a pending progress row per AI add-on and a booking
+        if i % 2:
+            CoachTrainingProgress.objects.filter(addon=ai).update(notes=f"new {i}", last_updated=later)
+            CoachBooking.objects.filter(user=u).update(status="Completed", notes=None, updated_at=later)
+        else:
+            CoachTrainingProgress.objects.filter(user=u).delete()
+            CoachBooking.objects.filter(user=u).delete()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name", ["coach-training-list", "coach-list-bookings"])
+def test_coach_queues_query_count_is_constant(url_name):
+    client = _coach_client()
+    url = reverse(url_name)
+
+    client.get(url)  # warm the resolved-user cache
+    _seed_queues(2)
+    small, res_small = _count_queries(client, url, {})
+    _seed_queues(20, start=2)
+    large, res_large = _count_queries(client, url, {})
+
+    assert len(res_small.data) == 2
+    assert len(res_large.data) == 22
+    assert small == large == 1  # one annotated queue query (ETag from the cache)
+
+
+@pytest.mark.django_db
+def test_coach_queue_rows_use_latest_progress_and_booking():
+    client = _coach_client()
+    _seed_queues(2)
+
+    training = client.get(reverse("coach-training-list")).data
+    assert [(r["user_email"], r["quantity"], r["notes"]) for r in training] == [
+        ("q0@example.com", 3, ""),
+        ("q1@example.com", 3, "new 1"),
+    ]
+    assert training[0]["last_updated"] == User.objects.get(email="q0@example.com").created_at
+
+    bookings = client.get(reverse("coach-list-bookings")).data
+    assert [(r["user_email"], r["quantity"], r["status"], r["notes"]) for r in bookings] == [
+        ("q0@example.com", 3, "Pending", ""),
+        ("q1@example.com", 3, "Completed", None),
+    ]
+
+
+@pytest.mark.django_db
+def test_coach_queue_rows_match_legacy_loop():
+    from users.management.commands.bench_coach_queues import _legacy_training_rows
+    from users.views import _training_rows
+
+    _coach_client()
+    _seed_queues(5)
+    assert _training_rows() == _legacy_training_rows()
+
+
+@pytest.mark.django_db
+def test_bench_coach_queues_command():
+    out = StringIO()
+    call_command("bench_coach_queues", "--clients=20", "--batch-size=8", "--repeat=1", stdout=out)
+    lines = out.getvalue().splitlines()
+    annotated = [line for line in lines if "annotated" in line]
+    assert len(annotated) == 2
+    assert all(" 20 rows" in line and "      1 queries" in line for line in annotated)
+    assert not User.objects.filter(email__startswith="bench-queue-").exists()
+
+
+@pytest.mark.django_db
+def test_client_search_falls_back_to_icontains_on_sqlite():
+    from users.search import search_clients
+
+    _seed_clients(3)
+    qs, ranked = search_clients(User.objects.filter(role="user"), "C1@EXAMPLE")
+    assert ranked is False
+    assert list(qs.values_list("email", flat=True)) == ["c1@example.com"]
@@ -0,0 +1,113 @@
+# users/tests/test_coach_sync.py
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from users.coach_sync import missing_addons, sync_missing
+from users.models import User, AddOn, CoachTrainingProgress, CoachBooking
+
+
+def _run(command, *args):
+    out = StringIO()
+    call_command(command, *args, stdout=out)
+    return out.getvalue()
+
+
+@pytest.fixture
+def addons():
+    """Add-ons bought before any coach existed, so the signals created nothing."""
+    clients = [User.objects.create(auth0_id=f"auth0|s{i}", email=f"s{i}@example.com") for i in range(5)]
+    created = {
+        addon_type: [AddOn.objects.create(user=u, addon_type=addon_type) for u in clients]
+        for addon_type in ("ai", "zoom")
+    }
+    AddOn.objects.create(user=clients[0], addon_type="ai", status="used")
+    coach = User.objects.create(auth0_id="auth0|sync-coach", email="sync-coach@example.com", role="coach")
+    return coach, created
+
+
+@pytest.mark.django_db
+def test_ai_sync_creates_missing_rows_in_batches(addons):
+    coach, created = addons
+    CoachTrainingProgress.objects.create(user=created["ai"][0].user, coach=coach, addon=created["ai"][0])
+
+    with CaptureQueriesContext(connection) as ctx:
+        out = _run("sync_ai_training", "--batch-size=2")
+
+    assert "Synced 4 AI add-ons in" in out and "rows/s" in out
+    assert len(ctx.captured_queries) == 1 + 3 * 2  # anti-join (roster loaded), INSERT and two counts per batch of 2
+    assert set(CoachTrainingProgress.objects.values_list("addon_id", flat=True)) == {a.id for a in created["ai"]}
+    assert "Synced 0 AI add-ons" in _run("sync_ai_training")
+
+
+@pytest.mark.django_db
+def test_zoom_sync_only_skips_addons_with_a_pending_booking(addons):
+    coach, created = addons
+    pending, completed = created["zoom"][:2]
+    CoachBooking.objects.create(user=pending.user, coach=coach, addon=pending, status="Pending")
+    CoachBooking.objects.create(user=completed.user, coach=coach, addon=completed, status="Completed")
+
+    assert "Synced 4 Zoom add-ons" in _run("sync_zoom_bookings", "--batch-size=3")
+    assert CoachBooking.objects.filter(status="Pending").count() == 5
+    assert CoachBooking.objects.filter(addon=pending).count() == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("addon_type, model, existing", [
+    ("ai", CoachTrainingProgress, CoachTrainingProgress.objects.all()),
+    ("zoom", CoachBooking, CoachBooking.objects.filter(status="Pending")),
+])
+def test_sync_skips_rows_inserted_concurrently_and_counts_the_rest(addons, addon_type, model, existing):
+    coach, created = addons
+    raced = created[addon_type][1]
+
+    def make_row(addon_id, user_id, coach_id):
+        if not model.objects.filter(addon=raced).exists():
+            # A concurrent sync inserts this add-on's row after our anti-join
+            model.objects.create(user=raced.user, coach=coach, addon=raced, status="Pending")
+        return model(user_id=user_id, coach_id=coach_id, addon_id=addon_id, status="Pending")
+
+    synced, _ = sync_missing(missing_addons(addon_type, existing), existing, make_row, batch_size=10)
+
+    assert synced == 4
+    assert model.objects.filter(addon=raced).count() == 1
+    assert model.objects.count() == 5
+
+
+@pytest.mark.django_db
+def test_one_pending_booking_per_addon(addons):
+    coach, created = addons
+    addon = created["zoom"][0]
+    CoachBooking.objects.create(user=addon.user, coach=coach, addon=addon, status="Completed")
+    CoachBooking.objects.create(user=addon.user, coach=coach, addon=addon, status="Pending")
+    with pytest.raises(IntegrityError), transaction.atomic():
+        CoachBooking.objects.create(user=addon.user, coach=coach, addon=addon, status="Pending")
+
+
+@pytest.mark.django_db
+def test_sync_spreads_rows_over_coaches_like_the_signals(addons, settings):
+    settings.COACH_ASSIGNMENT_STRATEGY = "least_loaded"
+    coach, _ = addons
+    second = User.objects.create(auth0_id="auth0|sync-coach2", email="sync-coach2@example.com", role="coach")
+
+    _run("sync_zoom_bookings", "--batch-size=2")
+
+    loads = Counter(CoachBooking.objects.values_list("coach_id", flat=True))
+    assert sorted(loads.values()) == [2, 3] and set(loads) == {coach.id, second.id}
+
+
+@pytest.mark.django_db
+def test_dry_run_only_counts(addons):
+    assert _run("sync_ai_training", "--dry-run").strip() == "Would sync 5 AI add-ons."
+    assert _run("sync_zoom_bookings", "--dry-run").strip() == "Would sync 5 Zoom add-ons."
+    assert not CoachTrainingProgress.objects.exists()
+    assert not CoachBooking.objects.exists()
+
+
+@pytest.mark.django_db
+def test_sync_requires_a_coach():
+    assert "No coach found" in _run("sync_ai_training")
@@ -0,0 +1,158 @@
+# users/tests/test_conditional.py
+from io import StringIO
+from types import SimpleNamespace
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from ai_program_generator.management.commands.bench_program_persistence import _sample_program
+from ai_program_generator.models import Exercise
+from ai_program_generator.persistence import persist_program
+from users.conditional import conditional_stats
+from users.models import AddOn, CoachBooking, User
+from users.payload_cache import invalidate_user_payloads
+
+
+def _client(sub):
+    client = APIClient()
+    client.force_authenticate(user=SimpleNamespace(is_authenticated=True, payload={"sub": sub}))
+    return client
+
+
+@pytest.fixture
+def user():
+    return User.objects.create(auth0_id="auth0|etag", email="etag@example.com", role="user")
+
+
+@pytest.mark.django_db
+def test_unchanged_addons_return_304_with_same_etag(user):
+    client = _client(user.auth0_id)
+    url = reverse("get_user_addons")
+
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first["ETag"]
+    assert etag.startswith('"') and "private" in first["Cache-Control"]
+
+    again = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert again.status_code == 304
+    assert again["ETag"] == etag
+    assert again.content == b""
+
+
+@pytest.mark.django_db
+def test_addon_change_invalidates_etag(user):
+    client = _client(user.auth0_id)
+    url = reverse("get_user_addons")
+    etag = client.get(url)["ETag"]
+
+    addon = AddOn.objects.create(user=user, addon_type="ebook", quantity=1)
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    etag = client.get(url)["ETag"]
+    addon.delete()
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_304_skips_the_view_queries(user):
+    client = _client(user.auth0_id)
+    url = reverse("user_detail")
+    etag = client.get(url)["ETag"]
+
+    invalidate_user_payloads(user.id)  # measure a cold payload build
+    with CaptureQueriesContext(connection) as full:
+        client.get(url)
+    with CaptureQueriesContext(connection) as revalidated:
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert len(revalidated.captured_queries) < len(full.captured_queries)
+
+
+@pytest.mark.django_db
+def test_deleting_the_newest_row_is_not_hidden_by_if_modified_since(user):
+    client = _client(user.auth0_id)
+    url = reverse("get_user_addons")
+    AddOn.objects.create(user=user, addon_type="ebook")
+    newest = AddOn.objects.create(user=user, addon_type="ebook")
+    first = client.get(url)
+    assert not first.has_header("Last-Modified")
+
+    newest.delete()
+    since = http_date(timezone.now().timestamp())
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=since).status_code == 200
+    assert client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 200
+
+
+@pytest.mark.django_db
+def test_active_program_etag_follows_document_version(user):
+    program = persist_program(user, _sample_program(2)).program
+    client = _client(user.auth0_id)
+    url = reverse("get_active_program")
+    etag = client.get(url)["ETag"]
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    exercise = Exercise.objects.filter(program_day__program=program).first()
+    exercise.notes = "slow tempo"
+    exercise.save()
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_coach_list_etag_varies_with_query_and_skips_non_coaches(user):
+    User.objects.create(auth0_id="auth0|coach-etag", email="coach-etag@example.com", role="coach")
+    coach = _client("auth0|coach-etag")
+    url = reverse("coach_list_clients")
+
+    etag = coach.get(url, {"limit": 5})["ETag"]
+    assert coach.get(url, {"limit": 5}, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert coach.get(url, {"limit": 6}, HTTP_IF_NONE_MATCH=etag).status_code == 200
+    assert _client(user.auth0_id).get(url, HTTP_IF_NONE_MATCH=etag).status_code == 403
+
+
+@pytest.mark.django_db
+def test_coach_list_etags_follow_writes_without_table_scans(user, settings):
+    User.objects.create(auth0_id="auth0|coach-etag", email="coach-etag@example.com", role="coach")
+    coach = _client("auth0|coach-etag")
+    clients_url, bookings_url = reverse("coach_list_clients"), reverse("coach_list_bookings")
+
+    clients_etag = coach.get(clients_url)["ETag"]
+    bookings_etag = coach.get(bookings_url)["ETag"]
+    with CaptureQueriesContext(connection) as ctx:
+        assert coach.get(bookings_url, HTTP_IF_NONE_MATCH=bookings_etag).status_code == 304
+    assert not [q for q in ctx.captured_queries if "COUNT(" in q["sql"] or "MAX(" in q["sql"]]
+
+    User.objects.filter(pk=user.pk).update(email="renamed@example.com")
+    invalidate_user_payloads(user.pk)
+    assert coach.get(clients_url, HTTP_IF_NONE_MATCH=clients_etag).status_code == 200
+
+    bookings_etag = coach.get(bookings_url)["ETag"]
+    addon = AddOn.objects.create(user=user, addon_type="zoom")
+    CoachBooking.objects.create(user=user, addon=addon, status="Completed")
+    assert coach.get(bookings_url, HTTP_IF_NONE_MATCH=bookings_etag).status_code == 200
+
+    settings.SHARED_CACHE = False  # per-process cache: no version to trust
+    res = coach.get(bookings_url)
+    assert res.status_code == 200 and not res.has_header("ETag")
+
+
+@pytest.mark.django_db
+def test_outcomes_are_counted_per_endpoint(user):
+    client = _client(user.auth0_id)
+    url = reverse("get_user_addons")
+    etag = client.get(url)["ETag"]
+    client.get(url, HTTP_IF_NONE_MATCH=etag)
+    client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    stats = conditional_stats()["user-addons"]
+    assert (stats["full"], stats["not_modified"]) == (1, 2)
+
+    out = StringIO()
+    call_command("conditional_stats", stdout=out)
+    assert "user-addons" in out.getvalue() and "66.7%" in out.getvalue()
@@ -0,0 +1,63 @@
+# users/tests/test_current_user.py
+from types import SimpleNamespace
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from users.current_user import get_current_user
+from users.models import User
+
+
+def _request(sub):
+    req = APIRequestFactory().get("/")
+    req.user = SimpleNamespace(is_authenticated=True, payload={"sub": sub})
+    return req
+
+
+@pytest.mark.django_db
+def test_user_resolved_once_per_request():
+    user = User.objects.create(auth0_id="auth0|once", email="once@example.com")
+    req = _request("auth0|once")
+
+    assert get_current_user(req).id == user.id
+    with CaptureQueriesContext(connection) as ctx:
+        assert get_current_user(req).id == user.id
+        assert req.resolved_user.id == user.id
+    assert len(ctx.captured_queries) == 0
+
+
+@pytest.mark.django_db
+def test_cached_user_skips_query_and_is_invalidated_on_save(settings):
+    settings.USER_RESOLVE_CACHE_TTL = 30
+    user = User.objects.create(auth0_id="auth0|c", email="c@example.com", role="user")
+    get_current_user(_request("auth0|c"))
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert get_current_user(_request("auth0|c")).role == "user"
+    assert len(ctx.captured_queries) == 0
+
+    user.role = "coach"
+    user.save()
+    assert get_current_user(_request("auth0|c")).role == "coach"
+
+    user.delete()
+    assert get_current_user(_request("auth0|c")) is None
+
+
+@pytest.mark.django_db
+def test_cache_disabled_always_queries(settings):
+    settings.USER_RESOLVE_CACHE_TTL = 0
+    User.objects.create(auth0_id="auth0|nc", email="nc@example.com")
+    get_current_user(_request("auth0|nc"))
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert get_current_user(_request("auth0|nc")) is not None
+    assert len(ctx.captured_queries) == 1
+
+
+@pytest.mark.django_db
+def test_unknown_subject_resolves_to_none():
+    assert get_current_user(_request("auth0|ghost")) is None
+    assert get_current_user(_request(None)) is None
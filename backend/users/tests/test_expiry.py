@@ -0,0 +1,131 @@
+# users/tests/test_expiry.py
+import threading
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users import expiry
+from users.expiry import run_expiry, start_expiry_scheduler
+from users.models import User, Subscription, AddOn
+
+
+def _sub(user, days_left, status="active"):
+    now = timezone.now()
+    return Subscription.objects.create(
+        user=user, plan=user.subscription_plan, status=status,
+        start_date=now - timedelta(days=30), end_date=now + timedelta(days=days_left),
+    )
+
+
+@pytest.fixture
+def lapsed():
+    """Basic client whose only subscription and AI add-on ran out yesterday."""
+    user = User.objects.create(auth0_id="auth0|lapsed", email="lapsed@example.com", subscription_plan="basic")
+    _sub(user, -1)
+    _sub(user, -40, status="expired")
+    AddOn.objects.create(user=user, addon_type="ai", end_date=timezone.now() - timedelta(days=1))
+    AddOn.objects.create(user=user, addon_type="zoom", status="used", end_date=timezone.now() - timedelta(days=1))
+    AddOn.objects.create(user=user, addon_type="ebook")
+    return user
+
+
+@pytest.fixture
+def renewed():
+    """Advanced client with an overdue period and a current one."""
+    user = User.objects.create(auth0_id="auth0|renewed", email="renewed@example.com", subscription_plan="advanced")
+    _sub(user, -2)
+    _sub(user, 28)
+    AddOn.objects.create(user=user, addon_type="zoom", end_date=timezone.now() + timedelta(days=10))
+    return user
+
+
+@pytest.mark.django_db
+def test_run_expires_overdue_rows_in_batches(lapsed, renewed):
+    stats = run_expiry(batch_size=1)
+
+    assert {k: stats[k] for k in ("subscriptions", "addons", "plans_lapsed", "batches")} == {
+        "subscriptions": 2, "addons": 1, "plans_lapsed": 1, "batches": 3,
+    }
+    assert list(Subscription.objects.filter(status="active").values_list("user_id", flat=True)) == [renewed.id]
+    assert set(AddOn.objects.filter(user=lapsed).values_list("addon_type", "status")) == {
+        ("ai", "expired"), ("zoom", "used"), ("ebook", "active"),
+    }
+    lapsed.refresh_from_db()
+    renewed.refresh_from_db()
+    assert (lapsed.subscription_plan, renewed.subscription_plan) == ("none", "advanced")
+
+
+@pytest.mark.django_db
+def test_second_run_is_a_no_op(lapsed, renewed):
+    run_expiry()
+    stats = run_expiry()
+    assert (stats["subscriptions"], stats["addons"], stats["plans_lapsed"], stats["batches"]) == (0, 0, 0, 0)
+
+
+@pytest.mark.django_db
+def test_expiry_refreshes_cached_payloads(lapsed):
+    client = APIClient()
+    client.force_authenticate(user=SimpleNamespace(is_authenticated=True, payload={"sub": lapsed.auth0_id}))
+    url = reverse("user_detail")
+    before = client.get(url)
+    assert before.json()["subscription_details"]["status"] == "active"
+
+    run_expiry()
+    after = client.get(url, HTTP_IF_NONE_MATCH=before["ETag"])
+    assert after.status_code == 200
+    assert after.json()["subscription_details"] is None
+    assert after.json()["subscription_plan"] == "none"
+
+
+@pytest.mark.django_db
+def test_expire_records_command(lapsed):
+    out = StringIO()
+    call_command("expire_records", "--batch-size=10", stdout=out)
+    assert "Expired 1 subscription(s) and 1 add-on(s), 1 plan(s) lapsed" in out.getvalue()
+
+
+@pytest.fixture
+def scheduler():
+    """Start schedulers through this fixture so teardown stops their threads."""
+    stops = []
+
+    def start(**kwargs):
+        stop = start_expiry_scheduler(**kwargs)
+        if stop is not None:
+            stops.append(stop)
+        return stop
+
+    yield start
+    for stop in stops:
+        stop.set()
+
+
+def _scheduler_threads():
+    return [t for t in threading.enumerate() if t.name == "expiry-scheduler"]
+
+
+def test_scheduler_runs_periodically_until_stopped(monkeypatch, scheduler):
+    assert scheduler(interval=0) is None
+
+    ran = threading.Event()
+    monkeypatch.setattr(expiry, "run_expiry", lambda batch_size=None: ran.set())
+    stop = scheduler(interval=0.01)
+    assert ran.wait(2)
+
+    [thread] = _scheduler_threads()
+    stop.set()
+    thread.join(2)
+    assert not thread.is_alive()
+
+
+def test_scheduler_is_not_started_on_app_import(settings):
+    settings.EXPIRY_SCHEDULER_INTERVAL = 60
+    apps.get_app_config("users").ready()
+    assert not _scheduler_threads()
@@ -0,0 +1,222 @@
+# users/tests/test_generation_jobs.py
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ai_program_generator.jobs import claim_jobs, enqueue_generation, heartbeat, requeue_stale_jobs, run_job
+from ai_program_generator.models import AIProgram, GenerationJob
+from ai_program_generator.services import GenerationError
+from users.models import User, UserProfile
+
+PROGRAM = {
+    "program_summary": {"goal": "Build Muscle", "difficulty": "Intermediate"},
+    "week_plan": [
+        {
+            "day_name": f"Day {i}",
+            "focus": "Rest" if i % 3 == 0 else "Strength",
+            "is_rest_day": i % 3 == 0,
+            "sessions": [] if i % 3 == 0 else [
+                {"exercise_name": "Squat", "sets": 3, "reps": "8-10", "intensity": "RPE 8", "notes": ""}
+            ],
+        }
+        for i in range(1, 8)
+    ],
+}
+
+
+def _user(sub="auth0|gen", email="gen@example.com", profile=True):
+    user = User.objects.create(auth0_id=sub, email=email, username=sub.split("|")[1], role="user")
+    if profile:
+        UserProfile.objects.create(
+            user=user, age=30, height_cm=180, weight_kg=78, fitness_level="intermediate",
+            primary_goal="muscle_gain", workout_frequency="5x_week",
+            daily_activity_level="active", sleep_hours=8,
+        )
+    return user
+
+
+def _client(user, bearer):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=bearer({"email": user.email, "sub": user.auth0_id}))
+    return client
+
+
+@pytest.mark.django_db
+def test_generate_returns_202_and_reuses_pending_job(bearer):
+    user = _user()
+    client = _client(user, bearer)
+
+    res = client.post(reverse("generate_training_program"))
+    assert res.status_code == 202
+    assert res.json()["status"] == "queued"
+    assert res.json()["status_url"] == reverse("generation_job_status", args=[res.json()["job_id"]])
+
+    again = client.post(reverse("generate_training_program"))
+    assert again.json()["job_id"] == res.json()["job_id"]
+    assert GenerationJob.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_generate_without_profile_is_rejected_before_queueing(bearer):
+    user = _user(profile=False)
+    res = _client(user, bearer).post(reverse("generate_training_program"))
+    assert res.status_code == 400
+    assert not GenerationJob.objects.exists()
+
+
+@pytest.mark.django_db
+def test_job_status_is_scoped_to_owner(bearer):
+    owner = _user()
+    other = _user(sub="auth0|other", email="other@example.com")
+    job, _ = enqueue_generation(owner)
+
+    assert _client(owner, bearer).get(reverse("generation_job_status", args=[job.id])).status_code == 200
+    assert _client(other, bearer).get(reverse("generation_job_status", args=[job.id])).status_code == 404
+
+
+@pytest.mark.django_db
+@patch("ai_program_generator.services.call_ollama")
+def test_run_job_saves_program(mock_ollama, bearer):
+    mock_ollama.return_value = json.dumps(PROGRAM)
+    user = _user()
+    enqueue_generation(user)
+
+    [job] = claim_jobs(5, "test")
+    assert job.status == "running" and job.attempts == 1
+    run_job(job)
+
+    job.refresh_from_db()
+    program = AIProgram.objects.get(user=user)
+    assert job.status == "succeeded" and job.program_id == program.id
+    assert program.days.count() == 7
+
+    res = _client(user, bearer).get(reverse("generation_job_status", args=[job.id]))
+    assert res.json()["program_id"] == program.id
+
+
+@pytest.mark.django_db
+@patch("ai_program_generator.services.call_ollama")
+def test_run_job_records_generation_error(mock_ollama, bearer):
+    mock_ollama.side_effect = GenerationError("Ollama request timed out. Try again.", status=504)
+    user = _user()
+    enqueue_generation(user)
+
+    [job] = claim_jobs(1, "test")
+    run_job(job)
+
+    job.refresh_from_db()
+    assert job.status == "failed"
+    assert job.error_details["status"] == 504
+    res = _client(user, bearer).get(reverse("generation_job_status", args=[job.id]))
+    assert "timed out" in res.json()["error"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("outcome", ["success", "error"])
+@patch("ai_program_generator.services.call_ollama")
+def test_late_finish_of_a_requeued_job_is_discarded(mock_ollama, outcome):
+    if outcome == "success":
+        mock_ollama.return_value = json.dumps(PROGRAM)
+    else:
+        mock_ollama.side_effect = GenerationError("Ollama request timed out. Try again.", status=504)
+    user = _user()
+    enqueue_generation(user)
+    [job] = claim_jobs(1, "worker-a")
+    # worker-a missed its heartbeats; the job was requeued and worker-b runs it now
+    GenerationJob.objects.filter(id=job.id).update(worker="worker-b", attempts=2)
+
+    run_job(job)
+
+    job.refresh_from_db()
+    assert (job.status, job.worker, job.program_id, job.error) == ("running", "worker-b", None, "")
+    assert not AIProgram.objects.filter(user=user).exists()
+
+
+@pytest.mark.django_db
+def test_claim_respects_limit_and_skips_claimed_jobs():
+    for i in range(3):
+        enqueue_generation(_user(sub=f"auth0|u{i}", email=f"u{i}@example.com"))
+
+    assert len(claim_jobs(2, "a")) == 2
+    assert len(claim_jobs(2, "b")) == 1
+    assert claim_jobs(2, "c") == []
+
+
+@pytest.mark.django_db
+def test_stale_running_jobs_are_requeued_then_failed():
+    job, _ = enqueue_generation(_user())
+    GenerationJob.objects.filter(id=job.id).update(
+        status="running", attempts=1, heartbeat_at=timezone.now() - timedelta(hours=1)
+    )
+    assert requeue_stale_jobs(stale_after=60, max_attempts=2) == 1
+    job.refresh_from_db()
+    assert job.status == "queued"
+
+    GenerationJob.objects.filter(id=job.id).update(
+        status="running", attempts=2, heartbeat_at=timezone.now() - timedelta(hours=1)
+    )
+    requeue_stale_jobs(stale_after=60, max_attempts=2)
+    job.refresh_from_db()
+    assert job.status == "failed"
+
+
+@pytest.mark.django_db
+@patch("ai_program_generator.management.commands.run_generation_worker.run_job")
+def test_worker_once_drains_queue(mock_run_job):
+    mock_run_job.side_effect = lambda job: job
+    for i in range(3):
+        enqueue_generation(_user(sub=f"auth0|w{i}", email=f"w{i}@example.com"))
+
+    call_command("run_generation_worker", "--once", "--concurrency=2", "--poll-interval=0.01")
+
+    assert mock_run_job.call_count == 3
+    assert not GenerationJob.objects.filter(status="queued").exists()
+
+
+@pytest.mark.django_db
+def test_slow_job_with_fresh_heartbeat_is_not_requeued():
+    job, _ = enqueue_generation(_user())
+    [claimed] = claim_jobs(1, "worker-a")
+    GenerationJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=1))
+
+    assert heartbeat([job.id], "worker-b") == 0  # not its job
+    assert heartbeat([job.id], "worker-a") == 1
+    assert requeue_stale_jobs(stale_after=60) == 0
+    job.refresh_from_db()
+    assert (job.status, job.worker) == ("running", "worker-a")
+
+
+@pytest.mark.django_db
+def test_concurrent_enqueue_returns_the_job_that_won():
+    user = _user()
+    winner, _ = enqueue_generation(user)
+    real_first = QuerySet.first
+    calls = []
+
+    def first_missing_once(self):
+        # The second request's pre-check ran before the winner committed
+        calls.append(self)
+        return None if len(calls) == 1 else real_first(self)
+
+    with patch.object(QuerySet, "first", first_missing_once):
+        job, created = enqueue_generation(user)
+
+    assert (job.id, created) == (winner.id, False)
+    assert GenerationJob.objects.filter(user=user).count() == 1
+
+
+@pytest.mark.django_db
+def test_database_allows_one_pending_job_per_user():
+    user = _user()
+    GenerationJob.objects.create(user=user, status="succeeded")
+    GenerationJob.objects.create(user=user, status="running")
+    with pytest.raises(IntegrityError), transaction.atomic():
+        GenerationJob.objects.create(user=user)
@@ -0,0 +1,120 @@
+# users/tests/test_jwks.py
+import asyncio
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+from users.jwks import JWKSKeyStore, _parse_max_age
+
+URL = "https://tenant.example.com/.well-known/jwks.json"
+
+
+def _jwks_response(*kids, cache_control="public, max-age=600"):
+    keys = [{"kid": k, "kty": "RSA", "use": "sig", "n": f"n-{k}", "e": "AQAB"} for k in kids]
+    resp = MagicMock(headers={"Cache-Control": cache_control})
+    resp.json.return_value = {"keys": keys}
+    return resp
+
+
+def test_parse_max_age():
+    assert _parse_max_age("public, max-age=15474, must-revalidate") == 15474
+    assert _parse_max_age("no-store") == 0
+    assert _parse_max_age("public") is None
+    assert _parse_max_age(None) is None
+
+
+def test_keys_are_cached_and_indexed_by_kid():
+    store = JWKSKeyStore(URL)
+    with patch("users.outbound_http.TargetSession.get", return_value=_jwks_response("a", "b")) as mock_get:
+        assert store.get_key("a")["n"] == "n-a"
+        assert store.get_key("b")["n"] == "n-b"
+        assert store.get_key("a")["kid"] == "a"
+
+    mock_get.assert_called_once()
+    stats = store.stats()
+    assert stats["misses"] == 1 and stats["hits"] == 2 and stats["refreshes"] == 1
+    assert stats["keys"] == 2
+
+
+def test_unknown_kid_refetches_once_then_rate_limits():
+    store = JWKSKeyStore(URL, min_refetch_interval=60)
+    with patch("users.outbound_http.TargetSession.get", return_value=_jwks_response("a")) as mock_get:
+        store.get_key("a")
+        # "a" was just fetched, so an unknown kid must not hit Auth0 again yet
+        assert store.get_key("rotated") is None
+        assert store.get_key("rotated") is None
+    assert mock_get.call_count == 1
+
+    store._last_fetch_at -= 61
+    with patch("users.outbound_http.TargetSession.get", return_value=_jwks_response("a", "rotated")) as mock_get:
+        assert store.get_key("rotated")["kid"] == "rotated"
+    mock_get.assert_called_once()
+
+
+def test_stale_keys_served_while_auth0_is_down():
+    store = JWKSKeyStore(URL, min_refetch_interval=0)
+    with patch("users.outbound_http.TargetSession.get", return_value=_jwks_response("a", cache_control="max-age=0")):
+        store.get_key("a")
+
+    with patch("users.outbound_http.TargetSession.get", side_effect=ConnectionError("down")):
+        assert store.get_key("a")["kid"] == "a"
+        # wait for the background refresh thread to give up
+        for _ in range(100):
+            if store.stats()["refresh_failures"]:
+                break
+            time.sleep(0.01)
+
+    stats = store.stats()
+    assert stats["refresh_failures"] == 1
+    assert stats["stale_served"] >= 1
+    assert store.get_key("a")["kid"] == "a"
+
+
+def test_expired_keys_refresh_in_background():
+    store = JWKSKeyStore(URL)
+    with patch("users.outbound_http.TargetSession.get", return_value=_jwks_response("a", cache_control="max-age=0")):
+        store.get_key("a")
+
+    with patch("users.outbound_http.TargetSession.get", return_value=_jwks_response("a", "b")) as mock_get:
+        store.get_key("a")
+        for _ in range(100):
+            if store.stats()["refreshes"] == 2:
+                break
+            time.sleep(0.01)
+        assert mock_get.call_count == 1
+
+    assert store.stats()["keys"] == 2
+
+
+def test_async_lookup_fetches_once_over_the_shared_client():
+    calls = []
+
+    def handler(request):
+        calls.append(str(request.url))
+        keys = [{"kid": "a", "kty": "RSA", "n": "n-a", "e": "AQAB"}]
+        return httpx.Response(200, text=json.dumps({"keys": keys}), headers={"Cache-Control": "max-age=600"})
+
+    async def lookups(store):
+        # concurrent misses for the same kid share one download
+        return await asyncio.gather(store.aget_key("a"), store.aget_key("a"), store.aget_key("zzz"))
+
+    store = JWKSKeyStore(URL, min_refetch_interval=60)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with patch("users.jwks.get_async_client", return_value=client):
+        first, second, unknown = asyncio.run(lookups(store))
+
+    assert first["n"] == second["n"] == "n-a" and unknown is None
+    assert calls == [URL]
+    assert store.stats()["refreshes"] == 1
+
+
+def test_async_lookup_keeps_keys_when_auth0_is_down():
+    store = JWKSKeyStore(URL, min_refetch_interval=0)
+    store._install({"a": {"kid": "a"}}, "max-age=600")
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+    with patch("users.jwks.get_async_client", return_value=client):
+        assert asyncio.run(store.aget_key("rotated")) is None
+    assert store.get_key("a") == {"kid": "a"}
+    assert store.stats()["refresh_failures"] == 1
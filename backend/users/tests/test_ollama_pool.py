@@ -0,0 +1,121 @@
+# users/tests/test_ollama_pool.py
+import time
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+
+from ai_program_generator.ollama_pool import OllamaPool, get_ollama_pool
+from ai_program_generator.services import OLLAMA_MODEL, GenerationError, call_ollama
+
+URLS = ["http://gpu1:11434", "http://gpu2:11434/"]
+
+
+def _pool(**kwargs):
+    kwargs.setdefault("health_interval", 0)
+    return OllamaPool(URLS, OLLAMA_MODEL, **kwargs)
+
+
+def _tags(*models, status=200):
+    return MagicMock(status_code=status, json=lambda: {"models": [{"name": m} for m in models]})
+
+
+def test_routes_to_the_least_loaded_node():
+    pool = _pool()
+    with pool.lease() as first, pool.lease() as second:
+        assert (first.url, second.url) == ("http://gpu1:11434", "http://gpu2:11434")
+        with pool.lease() as third:
+            assert third.url == "http://gpu1:11434"  # tie on load: first node
+    assert [n["in_flight"] for n in pool.status()] == [0, 0]
+
+
+def test_ties_on_load_go_to_the_faster_node():
+    pool = _pool()
+    pool.nodes[0].latencies.extend([2.0, 4.0])
+    pool.nodes[1].latencies.append(1.0)
+    with pool.lease() as lease:
+        assert lease.url == "http://gpu2:11434"
+    assert pool.status()[0]["latency_ms"] == 3000.0
+
+
+def test_consecutive_failures_eject_node_until_half_open_trial_succeeds():
+    pool = _pool(failure_threshold=2, cooldown=0.05)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            with pool.lease() as lease:
+                assert lease.url == "http://gpu1:11434"
+                raise ConnectionError("refused")
+    assert pool.status()[0]["breaker"] == "open"
+    with pool.lease() as lease:
+        assert lease.url == "http://gpu2:11434"
+
+    time.sleep(0.06)
+    assert pool.status()[0]["breaker"] == "half-open"
+    with pool.lease() as trial:
+        assert trial.url == "http://gpu1:11434"
+        with pool.lease() as other:  # only one trial request at a time
+            assert other.url == "http://gpu2:11434"
+    assert pool.status()[0]["breaker"] == "closed"
+
+
+def test_no_available_node_fails_fast_with_503():
+    pool = _pool(failure_threshold=1)
+    for node in pool.nodes:
+        node.healthy = False
+    with pytest.raises(GenerationError) as exc:
+        with pool.lease():
+            pass
+    assert exc.value.status == 503
+
+
+def test_cancelled_call_does_not_count_against_the_node():
+    pool = _pool(failure_threshold=1)
+    with pytest.raises(GeneratorExit):
+        with pool.lease():
+            raise GeneratorExit
+    assert pool.status()[0]["breaker"] == "closed"
+    assert pool.status()[0]["in_flight"] == 0
+
+
+def test_probe_marks_nodes_without_the_model_down():
+    pool = _pool()
+    responses = {
+        "http://gpu1:11434/api/tags": _tags(OLLAMA_MODEL),
+        "http://gpu2:11434/api/tags": _tags("mistral:7b"),
+    }
+    with patch("users.outbound_http.TargetSession.get", side_effect=lambda url, **kw: responses[url]):
+        nodes = pool.probe()
+    assert [n["healthy"] for n in nodes] == [True, False]
+    with pool.lease() as first, pool.lease() as second:
+        assert first.url == second.url == "http://gpu1:11434"
+
+
+@override_settings(OLLAMA_URLS=URLS)
+def test_call_ollama_spreads_over_the_pool_and_skips_failing_nodes():
+    calls = []
+
+    def post(url, **kwargs):
+        calls.append(url)
+        if url.startswith("http://gpu1"):
+            return MagicMock(status_code=503, text="overloaded")
+        return MagicMock(status_code=200, json=lambda: {"response": "{}"})
+
+    with override_settings(OLLAMA_BREAKER_FAILURES=1), \
+            patch("users.outbound_http.TargetSession.post", side_effect=post):
+        with pytest.raises(GenerationError):
+            call_ollama("prompt")
+        assert call_ollama("prompt") == "{}"
+        assert call_ollama("prompt") == "{}"
+    assert calls == ["http://gpu1:11434/api/generate"] + ["http://gpu2:11434/api/generate"] * 2
+    assert get_ollama_pool().status()[0]["breaker"] == "open"
+
+
+@override_settings(OLLAMA_URLS=URLS)
+def test_ollama_backends_command():
+    with patch("users.outbound_http.TargetSession.get", return_value=_tags(OLLAMA_MODEL)):
+        out = StringIO()
+        call_command("ollama_backends", stdout=out)
+    assert "http://gpu2:11434" in out.getvalue()
+    assert f"2/2 node(s) serving {OLLAMA_MODEL}" in out.getvalue()
@@ -0,0 +1,104 @@
+# users/tests/test_outbound_http.py
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+
+import pytest
+import requests
+import stripe
+from django.core.management import call_command
+from django.test import override_settings
+
+from users.outbound_http import get_session, outbound_stats, record, reset_sessions
+
+
+@pytest.fixture
+def server():
+    """Local HTTP/1.1 server answering with the queued status codes (200 once empty)."""
+    state = {"statuses": [], "requests": [], "connections": set()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _answer(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            state["requests"].append(self.command)
+            state["connections"].add(self.client_address)
+            status = state["statuses"].pop(0) if state["statuses"] else 200
+            self.send_response(status)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        do_GET = do_POST = _answer
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    state["url"] = f"http://127.0.0.1:{httpd.server_address[1]}/"
+    yield state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@override_settings(OUTBOUND_HTTP_BACKOFF=0)
+def test_connections_are_kept_alive_and_shared(server):
+    session = get_session("ollama")
+    assert get_session("ollama") is session
+    for _ in range(5):
+        assert session.get(server["url"]).status_code == 200
+    assert len(server["connections"]) == 1
+    assert session.timeout == (5.0, 180.0)
+
+
+@override_settings(OUTBOUND_HTTP_BACKOFF=0)
+def test_idempotent_calls_retry_on_gateway_errors(server):
+    server["statuses"] = [503, 502]
+    assert get_session("auth0").get(server["url"]).status_code == 200
+    assert server["requests"] == ["GET", "GET", "GET"]
+
+
+@override_settings(OUTBOUND_HTTP_BACKOFF=0)
+def test_post_is_not_retried_after_reaching_the_server(server):
+    server["statuses"] = [503]
+    assert get_session("ollama").post(server["url"], json={}).status_code == 503
+    assert server["requests"] == ["POST"]
+
+
+@override_settings(OUTBOUND_HTTP_BACKOFF=0, OUTBOUND_HTTP_RETRIES=1)
+def test_connection_errors_are_retried_then_raised():
+    reset_sessions()
+    with pytest.raises(requests.ConnectionError):
+        get_session("ollama").get("http://127.0.0.1:9/")  # discard port: refused
+    assert outbound_stats()["ollama"]["errors"] == 1
+
+
+def test_latency_histogram_per_target(server):
+    get_session("auth0").get(server["url"])
+    record("ollama", 4200)
+    record("ollama", 40)
+    record("ollama", 9000, failed=True)
+
+    stats = outbound_stats()
+    assert stats["auth0"]["count"] == 1 and stats["auth0"]["errors"] == 0
+    ollama = stats["ollama"]
+    assert (ollama["count"], ollama["errors"]) == (3, 1)
+    assert ollama["buckets"][50] == ollama["buckets"][5000] == ollama["buckets"][10000] == 1
+    assert ollama["p50_ms"] == 5000 and ollama["p99_ms"] == 10000
+    assert stats["stripe"]["count"] == 0
+
+    out = StringIO()
+    call_command("outbound_http_stats", "--reset", stdout=out)
+    assert "ollama   calls=3" in out.getvalue()
+    assert outbound_stats()["ollama"]["count"] == 0
+
+
+def test_stripe_sdk_uses_the_pooled_session():
+    client = stripe.default_http_client
+    assert isinstance(client, stripe.RequestsClient)
+    assert client._session is get_session("stripe")
+    assert client._timeout == (5.0, 30.0)
@@ -0,0 +1,92 @@
+# users/tests/test_pagination.py
+import base64
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import User
+from users.pagination import decode_cursor, encode_cursor, InvalidCursor
+
+
+@pytest.fixture
+def coach_client(db):
+    User.objects.create(auth0_id="auth0|coach", email="coach@example.com", role="coach")
+    client = APIClient()
+    client.force_authenticate(user=SimpleNamespace(is_authenticated=True, payload={"sub": "auth0|coach"}))
+    return client
+
+
+def _seed(n):
+    return [User.objects.create(auth0_id=f"auth0|p{i}", email=f"p{i}@example.com", username=f"p{i}")
+            for i in range(n)]
+
+
+def _walk(client, params):
+    url = reverse("coach-list-clients")
+    seen, after = [], ""
+    while True:
+        res = client.get(url, {**params, "after": after})
+        assert res.status_code == 200
+        seen += [r["id"] for r in res.data["results"]]
+        after = res.data["next"]
+        if after is None:
+            return seen, res
+
+
+@pytest.mark.parametrize("order", ["id", "created_at"])
+def test_cursor_walk_returns_every_client_once(coach_client, order):
+    users = _seed(7)
+    seen, last = _walk(coach_client, {"limit": 3, "order": order})
+    assert seen == [u.id for u in users]
+    assert last.data["count"] is None
+
+
+def test_cursor_mode_counts_on_request(coach_client):
+    _seed(5)
+    url = reverse("coach-list-clients")
+    res = coach_client.get(url, {"after": "", "count": "exact", "limit": 2})
+    assert res.data["count"] == 5 and res.data["count_is_approximate"] is False
+
+    with patch("users.pagination.APPROX_COUNT_CAP", 3):
+        res = coach_client.get(url, {"after": "", "count": "approx", "limit": 2})
+    assert res.data["count"] == 3 and res.data["count_is_approximate"] is True
+
+
+def test_cursor_mode_with_search(coach_client):
+    _seed(12)
+    seen, _ = _walk(coach_client, {"limit": 2, "q": "p1"})
+    assert len(seen) == 3  # p1, p10, p11
+
+
+def test_invalid_cursor_returns_400(coach_client):
+    url = reverse("coach-list-clients")
+    assert coach_client.get(url, {"after": "not-a-cursor"}).status_code == 400
+    assert coach_client.get(url, {"after": "", "order": "email"}).status_code == 400
+
+
+@pytest.mark.parametrize("order, values", [
+    ("created_at", [[1, 2], 1]),
+    ("created_at", ["2024-13-45T00:00:00", 1]),
+    ("created_at", ["2024-01-01T00:00:00+00:00", "abc"]),
+    ("id", ["abc"]),
+    ("id", [True]),
+    ("id", {"a": 1}),
+])
+def test_crafted_cursor_values_return_400(coach_client, order, values):
+    raw = json.dumps({"o": order, "v": values}).encode()
+    cursor = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+    res = coach_client.get(reverse("coach-list-clients"), {"after": cursor, "order": order})
+    assert res.status_code == 400
+
+
+def test_cursor_roundtrip_and_ordering_mismatch(db):
+    user = User.objects.create(auth0_id="auth0|x", email="x@example.com")
+    cursor = encode_cursor("created_at", user)
+    created_at, pk = decode_cursor(cursor, "created_at")
+    assert created_at == user.created_at and pk == user.id
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "id")
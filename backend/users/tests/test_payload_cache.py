@@ -0,0 +1,115 @@
+# users/tests/test_payload_cache.py
+import threading
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import AddOn, User, UserProfile
+from users.payload_cache import cached_user_payload, invalidate_user_payloads
+
+
+@pytest.fixture
+def user():
+    return User.objects.create(auth0_id="auth0|payload", email="payload@example.com")
+
+
+def _client(user):
+    client = APIClient()
+    client.force_authenticate(user=SimpleNamespace(is_authenticated=True, payload={"sub": user.auth0_id}))
+    return client
+
+
+@pytest.mark.django_db
+def test_cached_user_detail_skips_payload_queries(user):
+    client = _client(user)
+    url = reverse("user_detail")
+
+    with CaptureQueriesContext(connection) as cold:
+        first = client.get(url)
+    with CaptureQueriesContext(connection) as warm:
+        second = client.get(url)
+
+    assert first.json() == second.json()
+    assert len(warm.captured_queries) < len(cold.captured_queries)
+
+
+@pytest.mark.django_db
+def test_saving_related_rows_invalidates_payloads(user):
+    client = _client(user)
+    assert client.get(reverse("get_user_addons")).json()["addons"] == []
+    assert client.get(reverse("user_detail")).json()["profile"] is None
+
+    addon = AddOn.objects.create(user=user, addon_type="ebook", quantity=2)
+    UserProfile.objects.create(
+        user=user, age=30, height_cm=180, weight_kg=80, fitness_level="beginner",
+        primary_goal="fat_loss", workout_frequency="3-4x per week",
+        daily_activity_level="active", sleep_hours=7,
+    )
+    assert client.get(reverse("get_user_addons")).json()["addons"][0]["quantity"] == 2
+    assert client.get(reverse("user_detail")).json()["profile"]["age"] == 30
+
+    addon.delete()
+    assert client.get(reverse("get_user_addons")).json()["addons"] == []
+
+
+@pytest.mark.django_db
+def test_explicit_invalidation_and_ttl_zero(user, settings):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    assert cached_user_payload("probe", user.id, build) == {"n": 1}
+    assert cached_user_payload("probe", user.id, build) == {"n": 1}
+    invalidate_user_payloads(user.id)
+    assert cached_user_payload("probe", user.id, build) == {"n": 2}
+
+    settings.USER_PAYLOAD_CACHE_TTL = 0
+    assert cached_user_payload("probe", user.id, build) == {"n": 3}
+
+
+def test_concurrent_misses_build_once(settings):
+    settings.USER_PAYLOAD_CACHE_POLL_INTERVAL = 0.01
+    building = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def build():
+        calls.append(1)
+        building.set()
+        release.wait(5)
+        return {"ok": True}
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cached_user_payload("probe", 7, build)))
+    first.start()
+    building.wait(5)
+    waiters = [
+        threading.Thread(target=lambda: results.append(cached_user_payload("probe", 7, build)))
+        for _ in range(4)
+    ]
+    for t in waiters:
+        t.start()
+    release.set()
+    for t in [first, *waiters]:
+        t.join(5)
+
+    assert results == [{"ok": True}] * 5
+    assert len(calls) == 1
+    assert cache.get("payload:gen:7") is not None
+
+
+def test_user_caches_need_a_shared_cache(monkeypatch):
+    from backend import settings as base
+
+    monkeypatch.setenv("USER_PAYLOAD_CACHE_TTL", "300")
+    monkeypatch.setattr(base, "SHARED_CACHE", False)
+    assert base._shared_cache_ttl("USER_PAYLOAD_CACHE_TTL", "300") == 0
+    monkeypatch.setattr(base, "SHARED_CACHE", True)
+    assert base._shared_cache_ttl("USER_PAYLOAD_CACHE_TTL", "300") == 300
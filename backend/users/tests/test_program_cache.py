@@ -0,0 +1,169 @@
+# users/tests/test_program_cache.py
+import json
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from ai_program_generator.models import AIProgram, ProgramTemplate
+from ai_program_generator.program_cache import ProgramTemplateCache, cache_stats, evict, normalize_profile
+from ai_program_generator.services import generate_program
+from users.models import User, UserProfile
+
+PROGRAM = {
+    "program_summary": {"goal": "Endurance", "difficulty": "beginner"},
+    "week_plan": [
+        {
+            "day_name": f"Day {i}",
+            "focus": "Cardio",
+            "is_rest_day": False,
+            "sessions": [{"exercise_name": "Run", "sets": 1, "reps": "30 min", "intensity": "easy", "notes": ""}],
+        }
+        for i in range(1, 8)
+    ],
+}
+
+
+def _profile(**overrides):
+    fields = dict(
+        age=31, height_cm=178, weight_kg=72.4, fitness_level="beginner", primary_goal="endurance",
+        workout_frequency="3-4x per week", daily_activity_level="active", sleep_hours=7,
+        body_type=None, body_fat_percentage=None,
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+def _user(n, **overrides):
+    user = User.objects.create(auth0_id=f"auth0|pc{n}", email=f"pc{n}@example.com", username=f"pc{n}")
+    fields = vars(_profile(**overrides))
+    UserProfile.objects.create(user=user, **fields)
+    return user
+
+
+def test_profiles_in_same_bucket_share_fingerprint():
+    cache = ProgramTemplateCache("1", "m")
+    a = cache.fingerprint(normalize_profile(_profile(age=31, weight_kg=72.4)))
+    b = cache.fingerprint(normalize_profile(_profile(age=33, weight_kg=74.9)))
+    c = cache.fingerprint(normalize_profile(_profile(age=36)))
+    assert a == b
+    assert a != c
+
+
+def test_fingerprint_depends_on_prompt_and_model():
+    key = normalize_profile(_profile())
+    assert ProgramTemplateCache("1", "m").fingerprint(key) != ProgramTemplateCache("2", "m").fingerprint(key)
+    assert ProgramTemplateCache("1", "m").fingerprint(key) != ProgramTemplateCache("1", "n").fingerprint(key)
+
+
+def test_bucket_widths_are_configurable(settings):
+    settings.PROGRAM_CACHE_BUCKETS = {}
+    assert normalize_profile(_profile(age=31))["age"] == 31
+    settings.PROGRAM_CACHE_BUCKETS = {"age": 10}
+    assert normalize_profile(_profile(age=31))["age"] == "30-40"
+
+
+@pytest.mark.django_db
+@patch("ai_program_generator.services.call_ollama")
+def test_second_similar_user_is_served_from_cache(mock_ollama):
+    mock_ollama.return_value = json.dumps(PROGRAM)
+    first, second = _user(1), _user(2, age=32)
+
+    generate_program(first)
+    program, data = generate_program(second)
+
+    assert mock_ollama.call_count == 1
+    assert program.user == second and program.is_active
+    assert program.days.count() == 7
+    assert AIProgram.objects.count() == 2
+
+    stats = cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert ProgramTemplate.objects.get().hit_count == 1
+
+
+@pytest.mark.django_db
+@patch("ai_program_generator.services.call_ollama")
+def test_loosely_typed_sets_and_reps_are_coerced(mock_ollama):
+    program = json.loads(json.dumps(PROGRAM))
+    program["week_plan"][0]["sessions"][0].update(sets="3-4", reps=12, notes=None)
+    mock_ollama.return_value = json.dumps(program)
+
+    saved, data = generate_program(_user(1))
+
+    exercise = saved.days.get(day_number=1).exercises.get()
+    assert (exercise.sets, exercise.reps, exercise.notes) == (3, "12", "")
+    assert ProgramTemplate.objects.get().program_json["week_plan"][0]["sessions"][0]["sets"] == 3
+
+
+@pytest.mark.django_db
+@patch("ai_program_generator.services.call_ollama")
+def test_program_that_fails_to_persist_is_not_cached(mock_ollama):
+    mock_ollama.return_value = json.dumps(PROGRAM)
+
+    with patch("ai_program_generator.services.persist_program", side_effect=ValueError("boom")):
+        with pytest.raises(ValueError):
+            generate_program(_user(1))
+    assert not ProgramTemplate.objects.exists()
+
+    generate_program(_user(2))
+    assert mock_ollama.call_count == 2
+
+
+@pytest.mark.django_db
+@patch("ai_program_generator.services.call_ollama")
+def test_cache_can_be_disabled(mock_ollama, settings):
+    settings.PROGRAM_CACHE_ENABLED = False
+    mock_ollama.return_value = json.dumps(PROGRAM)
+
+    generate_program(_user(1))
+    generate_program(_user(2))
+
+    assert mock_ollama.call_count == 2
+    assert not ProgramTemplate.objects.exists()
+
+
+@pytest.mark.django_db
+def test_expired_template_is_a_miss(settings):
+    settings.PROGRAM_CACHE_TTL = 60
+    cache = ProgramTemplateCache("1", "m")
+    profile = _profile()
+    template = cache.put(profile, PROGRAM)
+    ProgramTemplate.objects.filter(pk=template.pk).update(created_at=timezone.now() - timedelta(hours=1))
+
+    assert cache.get(profile) is None
+    assert not ProgramTemplate.objects.exists()
+
+
+@pytest.mark.django_db
+def test_size_bound_evicts_least_recently_used(settings):
+    settings.PROGRAM_CACHE_MAX_ENTRIES = 2
+    cache = ProgramTemplateCache("1", "m")
+    old, mid, new = _profile(age=20), _profile(age=40), _profile(age=60)
+
+    cache.put(old, PROGRAM)
+    cache.put(mid, PROGRAM)
+    ProgramTemplate.objects.update(last_used_at=timezone.now() - timedelta(hours=1))
+    cache.get(old)  # refresh: 'mid' is now least recently used
+    cache.put(new, PROGRAM)
+
+    assert ProgramTemplate.objects.count() == 2
+    assert cache.get(mid) is None
+    assert cache.get(old) is not None
+    assert evict(max_entries=1) == 1
+
+
+@pytest.mark.django_db
+def test_stats_command_reports_hit_rate():
+    cache = ProgramTemplateCache("1", "m")
+    cache.get(_profile())
+    cache.put(_profile(), PROGRAM)
+    cache.get(_profile())
+
+    out = StringIO()
+    call_command("program_cache_stats", stdout=out)
+    assert "1 hits, 1 misses, hit rate 50.0%" in out.getvalue()
@@ -0,0 +1,98 @@
+# users/tests/test_program_document.py
+from types import SimpleNamespace
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ai_program_generator.management.commands.bench_program_persistence import _sample_program
+from ai_program_generator.models import AIProgram, ProgramDay, Exercise
+from ai_program_generator.persistence import persist_program
+from ai_program_generator.read_model import load_program_document, program_document_json
+from users.models import User
+
+
+@pytest.fixture
+def user():
+    return User.objects.create(auth0_id="auth0|doc", email="doc@example.com")
+
+
+def _active(user):
+    client = APIClient()
+    client.force_authenticate(user=SimpleNamespace(
+        is_authenticated=True, payload={"email": user.email, "sub": user.auth0_id}
+    ))
+    return client.get(reverse("get_active_program"))
+
+
+def _rows_view(program):
+    document = load_program_document(AIProgram.objects.filter(id=program.id))
+    return {"program_summary": document["program_summary"], "week_plan": document["week_plan"]}
+
+
+@pytest.mark.django_db
+def test_document_matches_relational_rows(user):
+    data = _sample_program(3)
+    data["program_summary"]["difficulty"] = "Intermediate"
+    data["week_plan"][0]["sessions"][0]["sets"] = "4"
+    program = persist_program(user, data).program
+
+    program.refresh_from_db()
+    assert program.raw_json == _rows_view(program)
+
+
+@pytest.mark.django_db
+def test_active_program_is_a_single_row_read(user):
+    program = persist_program(user, _sample_program(4)).program
+
+    with CaptureQueriesContext(connection) as ctx:
+        body = program_document_json(AIProgram.objects.filter(user=user, is_active=True))
+    assert len(ctx.captured_queries) == 1
+
+    res = _active(user)
+    assert res.status_code == 200
+    payload = res.json()
+    assert payload["program_id"] == program.id
+    assert payload["document_version"] == 1
+    assert {k: payload[k] for k in ("program_summary", "week_plan")} == _rows_view(program)
+    assert body == res.content
+
+
+@pytest.mark.django_db
+def test_editing_rows_refreshes_document_and_version(user):
+    program = persist_program(user, _sample_program(2)).program
+    exercise = Exercise.objects.filter(program_day__program=program).order_by("id").first()
+
+    exercise.reps = "5x5"
+    exercise.save()
+    program.refresh_from_db()
+    assert program.document_version == 2
+    assert program.raw_json["week_plan"][0]["sessions"][0]["reps"] == "5x5"
+
+    ProgramDay.objects.filter(program=program, day_number=7).delete()
+    program.refresh_from_db()
+    assert program.document_version == 3
+    assert len(program.raw_json["week_plan"]) == 6
+    assert program.raw_json == _rows_view(program)
+
+
+@pytest.mark.django_db
+def test_deleting_program_does_not_rebuild_document(user):
+    program = persist_program(user, _sample_program(5)).program
+
+    with CaptureQueriesContext(connection) as ctx:
+        program.delete()
+    assert not any(q["sql"].startswith('UPDATE "ai_program_generator_aiprogram"') for q in ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_unmaterialized_program_is_built_on_first_read(user):
+    program = persist_program(user, _sample_program(2)).program
+    AIProgram.objects.filter(id=program.id).update(raw_json=None)
+
+    payload = _active(user).json()
+    assert len(payload["week_plan"]) == 7
+    program.refresh_from_db()
+    assert program.raw_json == _rows_view(program)
@@ -0,0 +1,58 @@
+# users/tests/test_program_persistence.py
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ai_program_generator.management.commands.bench_program_persistence import _sample_program
+from ai_program_generator.models import AIProgram, ProgramDay, Exercise
+from ai_program_generator.persistence import persist_program
+from users.models import User
+
+
+@pytest.fixture
+def user():
+    return User.objects.create(auth0_id="auth0|persist", email="persist@example.com")
+
+
+@pytest.mark.django_db
+def test_persist_returns_pks_in_plan_order(user):
+    data = _sample_program(exercises_per_day=4)
+    saved = persist_program(user, data)
+
+    assert saved.day_ids == list(ProgramDay.objects.filter(program=saved.program)
+                                 .order_by("day_number").values_list("id", flat=True))
+    assert len(saved.exercise_ids) == 5 * 4  # two rest days
+    first = Exercise.objects.get(pk=saved.exercise_ids[0])
+    assert (first.program_day.day_name, first.order) == ("Monday", 1)
+    assert not Exercise.objects.filter(program_day__is_rest_day=True).exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("exercises_per_day", [1, 5, 12])
+def test_persist_statement_count_is_independent_of_size(user, exercises_per_day):
+    with CaptureQueriesContext(connection) as ctx:
+        persist_program(user, _sample_program(exercises_per_day))
+    writes = [q for q in ctx.captured_queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))]
+    # deactivate previous, insert program, insert days, insert exercises
+    assert len(writes) <= 5
+
+
+@pytest.mark.django_db
+def test_persist_deactivates_previous_program(user):
+    first = persist_program(user, _sample_program(2)).program
+    second = persist_program(user, _sample_program(2)).program
+
+    first.refresh_from_db()
+    assert not first.is_active
+    assert list(AIProgram.objects.filter(user=user, is_active=True)) == [second]
+
+
+@pytest.mark.django_db
+def test_bench_command_reports_both_strategies():
+    out = StringIO()
+    call_command("bench_program_persistence", "--repeat=2", "--exercises=3", stdout=out)
+    assert "loop:" in out.getvalue() and "bulk:" in out.getvalue()
+    assert not User.objects.filter(auth0_id__startswith="bench|").exists()
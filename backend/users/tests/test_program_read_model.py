@@ -0,0 +1,82 @@
+# users/tests/test_program_read_model.py
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ai_program_generator.management.commands.bench_program_persistence import _sample_program
+from ai_program_generator.models import AIProgram
+from ai_program_generator.persistence import persist_program
+from ai_program_generator.read_model import load_program_document
+from users.models import User
+
+
+@pytest.fixture
+def user():
+    return User.objects.create(auth0_id="auth0|reader", email="reader@example.com")
+
+
+def _client(user):
+    client = APIClient()
+    client.force_authenticate(user=SimpleNamespace(
+        is_authenticated=True, payload={"email": user.email, "sub": user.auth0_id}
+    ))
+    return client
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("exercises_per_day", [1, 8])
+def test_document_is_loaded_in_three_queries(user, exercises_per_day):
+    data = _sample_program(exercises_per_day)
+    persist_program(user, data)
+
+    with CaptureQueriesContext(connection) as ctx:
+        document = load_program_document(AIProgram.objects.filter(user=user, is_active=True))
+
+    assert len(ctx.captured_queries) == 3
+    assert document["program_summary"] == data["program_summary"]
+    assert document["week_plan"] == [
+        {k: day[k] for k in ("day_name", "focus", "is_rest_day", "sessions")} for day in data["week_plan"]
+    ]
+
+
+@pytest.mark.django_db
+def test_missing_program_returns_none(user):
+    assert load_program_document(AIProgram.objects.filter(user=user)) is None
+
+
+@pytest.mark.django_db
+def test_active_and_client_endpoints_share_the_document(user):
+    persist_program(user, _sample_program(2))
+    latest = persist_program(user, _sample_program(3)).program
+    client = _client(user)
+
+    active = client.get(reverse("get_active_program"))
+    coach_view = client.get(reverse("coach-client-program", args=[user.id]))
+
+    assert active.status_code == coach_view.status_code == 200
+    assert active.json()["program_id"] == coach_view.data["id"] == latest.id
+    assert active.json()["week_plan"] == coach_view.data["week_plan"]
+    assert len(active.json()["week_plan"][0]["sessions"]) == 3
+
+
+@pytest.mark.django_db
+def test_client_program_not_found_messages(user):
+    client = _client(user)
+    assert client.get(reverse("coach-client-program", args=[user.id])).data["error"] == \
+        "This client has not generated an AI program yet"
+    assert client.get(reverse("coach-client-program", args=[user.id + 999])).data["error"] == "Client not found"
+
+
+@pytest.mark.django_db
+def test_client_program_failure_is_logged_not_leaked(user, caplog):
+    with patch("ai_program_generator.views.load_program_document", side_effect=RuntimeError("db password=hunter2")):
+        res = _client(user).get(reverse("coach-client-program", args=[user.id]))
+
+    assert res.status_code == 500
+    assert res.data == {"error": "Failed to load the client's program"}
+    assert "hunter2" in caplog.text  # the traceback goes to the log
@@ -0,0 +1,189 @@
+# users/tests/test_program_stream.py
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+from asgiref.sync import async_to_sync
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ai_program_generator.models import AIProgram
+from ai_program_generator.services import GenerationError, astream_ollama
+from ai_program_generator.streaming import WeekPlanStreamParser
+from users.models import User, UserProfile
+
+PROGRAM = {
+    "program_summary": {"goal": "Lean {out}", "difficulty": "beginner"},
+    "week_plan": [
+        {
+            "day_name": f"Day {i}",
+            "focus": "Rest" if i % 3 == 0 else "Full \"Body\" }",
+            "is_rest_day": i % 3 == 0,
+            "sessions": [] if i % 3 == 0 else [
+                {"exercise_name": "Row", "sets": 3, "reps": "10", "intensity": "moderate", "notes": "{[x]}"}
+            ],
+        }
+        for i in range(1, 8)
+    ],
+}
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+async def _collect(aiterable):
+    return [item async for item in aiterable]
+
+
+def _events(response):
+    body = b"".join(async_to_sync(_collect)(response.streaming_content)).decode()
+    events = []
+    for frame in body.strip().split("\n\n"):
+        event, data = frame.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def _client_for(bearer, sub, profile=True):
+    user = User.objects.create(auth0_id=sub, email=f"{sub[6:]}@example.com", username=sub[6:], role="user")
+    if profile:
+        UserProfile.objects.create(
+            user=user, age=28, height_cm=175, weight_kg=70, fitness_level="beginner",
+            primary_goal="fat_loss", workout_frequency="3x_week",
+            daily_activity_level="moderate", sleep_hours=7,
+        )
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=bearer({"email": user.email, "sub": sub}))
+    return user, client
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, 10_000])
+def test_parser_emits_each_day_once_complete(size):
+    text = "```json\n" + json.dumps(PROGRAM, indent=2) + "\n```"
+    parser = WeekPlanStreamParser()
+    days = []
+    for chunk in _chunks(text, size):
+        days.extend(parser.feed(chunk))
+    assert days == PROGRAM["week_plan"]
+
+
+def test_parser_emits_day_before_stream_ends():
+    text = json.dumps(PROGRAM)
+    first_day_end = text.index(json.dumps(PROGRAM["week_plan"][0])) + len(json.dumps(PROGRAM["week_plan"][0]))
+    parser = WeekPlanStreamParser()
+    assert parser.feed(text[:first_day_end - 1]) == []
+    assert parser.feed(text[first_day_end - 1:first_day_end]) == [PROGRAM["week_plan"][0]]
+
+
+@pytest.mark.django_db
+@patch("ai_program_generator.views.astream_ollama")
+def test_stream_sends_days_then_saves_program(mock_stream, bearer):
+    mock_stream.return_value = _aiter(_chunks(json.dumps(PROGRAM), 40))
+    user, client = _client_for(bearer, "auth0|stream")
+
+    res = client.post(reverse("stream_training_program"), HTTP_ACCEPT="text/event-stream")
+    assert res.status_code == 200
+    assert res["Content-Type"].startswith("text/event-stream")
+
+    events = _events(res)
+    kinds = [kind for kind, _ in events]
+    assert kinds.count("day") == 7
+    assert kinds[-1] == "done"
+    # days arrive interleaved with tokens, not all at the end
+    assert kinds.index("day") < len(kinds) - 8
+
+    program = AIProgram.objects.get(user=user)
+    assert events[-1][1]["program_id"] == program.id
+    assert program.days.count() == 7
+
+
+@pytest.mark.django_db
+@patch("ai_program_generator.views.astream_ollama")
+def test_stream_invalid_program_is_not_saved(mock_stream, bearer):
+    broken = dict(PROGRAM, week_plan=PROGRAM["week_plan"][:3])
+    mock_stream.return_value = _aiter(_chunks(json.dumps(broken), 50))
+    user, client = _client_for(bearer, "auth0|broken")
+
+    events = _events(client.post(reverse("stream_training_program")))
+    assert [k for k, _ in events].count("day") == 3
+    assert events[-1][0] == "error"
+    assert "invalid structure" in events[-1][1]["error"]
+    assert not AIProgram.objects.filter(user=user).exists()
+
+
+@pytest.mark.django_db
+@patch("ai_program_generator.views.astream_ollama")
+def test_stream_ends_with_error_event_when_saving_fails(mock_stream, bearer):
+    mock_stream.return_value = _aiter(_chunks(json.dumps(PROGRAM), 50))
+    user, client = _client_for(bearer, "auth0|savefail")
+
+    with patch("ai_program_generator.streaming.save_program", side_effect=ValueError("bad row")):
+        events = _events(client.post(reverse("stream_training_program")))
+    assert [k for k, _ in events].count("day") == 7
+    assert events[-1] == ("error", {"status": 500, "error": "Failed to save the generated program"})
+
+
+@pytest.mark.django_db
+def test_stream_without_profile_returns_400(bearer):
+    _, client = _client_for(bearer, "auth0|noprofile", profile=False)
+    res = client.post(reverse("stream_training_program"), HTTP_ACCEPT="text/event-stream")
+    assert res.status_code == 400
+    assert res.content.decode().startswith("event: error")
+
+
+def _ollama(handler):
+    """Patch the shared async client with one answering through `handler`."""
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return patch("ai_program_generator.services.get_async_client", return_value=client)
+
+
+def test_stream_ollama_yields_response_chunks():
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        lines = [
+            json.dumps({"response": "{\"a\"", "done": False}),
+            "",
+            json.dumps({"response": ": 1}", "done": False}),
+            json.dumps({"response": "", "done": True}),
+        ]
+        return httpx.Response(200, text="\n".join(lines))
+
+    with _ollama(handler):
+        assert async_to_sync(_collect)(astream_ollama("prompt")) == ["{\"a\"", ": 1}"]
+    assert requests[0]["stream"] is True
+
+
+def test_stream_ollama_reports_empty_stream():
+    with _ollama(lambda request: httpx.Response(200, text=json.dumps({"response": "", "done": True}))):
+        with pytest.raises(GenerationError, match="Empty content"):
+            async_to_sync(_collect)(astream_ollama("prompt"))
+
+
+@pytest.mark.parametrize("failure, status", [
+    (httpx.ReadTimeout("slow"), 504),
+    (httpx.ConnectError("refused"), 502),
+])
+def test_stream_ollama_maps_transport_errors(failure, status):
+    def handler(request):
+        raise failure
+
+    with _ollama(handler):
+        with pytest.raises(GenerationError) as excinfo:
+            async_to_sync(_collect)(astream_ollama("prompt"))
+    assert excinfo.value.status == status
+
+
+def test_stream_ollama_reports_non_200():
+    with _ollama(lambda request: httpx.Response(500, text="model not loaded")):
+        with pytest.raises(GenerationError) as excinfo:
+            async_to_sync(_collect)(astream_ollama("prompt"))
+    assert excinfo.value.details == {"status_code": 500, "body": "model not loaded"}
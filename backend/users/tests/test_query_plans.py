@@ -0,0 +1,109 @@
+# users/tests/test_query_plans.py
+"""
+EXPLAIN harness for the hot dashboard / coach queries: each must be served
+by an index on seeded data. On PostgreSQL sequential scans and sorts are
+penalised (enable_seqscan/enable_sort off), so a plan that still contains
+one means no index can serve the query; SQLite reports its choice directly.
+"""
+import re
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from users.models import User, Subscription, AddOn, AddOnBalance, CoachTrainingProgress, CoachBooking
+from users.views import _addon_queue
+
+
+def _plan(qs):
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+    return qs.explain()
+
+
+def _full_scans(plan, table):
+    if connection.vendor == "postgresql":
+        return re.findall(rf"Seq Scan on {table}\b", plan)
+    # SQLite: "SCAN t" is a table scan, "SCAN t USING [COVERING] INDEX i" is not
+    return re.findall(rf"\bSCAN {table}\b(?! USING)", plan)
+
+
+def _sorts(plan):
+    if connection.vendor == "postgresql":
+        return re.findall(r"\bSort\b", plan)
+    return re.findall(r"USE TEMP B-TREE FOR ORDER BY", plan)
+
+
+@pytest.fixture
+def seeded():
+    coach = User.objects.create(auth0_id="auth0|plan-coach", email="plan-coach@example.com", role="coach")
+    now = timezone.now()
+    users = User.objects.bulk_create([
+        User(auth0_id=f"auth0|plan{i}", email=f"plan{i}@example.com") for i in range(200)
+    ])
+    users = list(User.objects.filter(email__startswith="plan", role="user"))
+    Subscription.objects.bulk_create([
+        Subscription(user=u, plan="basic", status=status, start_date=now - timedelta(days=d),
+                     end_date=now + timedelta(days=30 - d))
+        # Renewals overlap: the previous period is still "active" until expired
+        for u in users
+        for d, status in ((90, "expired"), (60, "expired"), (31, "active"), (1, "active"))
+    ])
+    AddOn.objects.bulk_create([
+        AddOn(user=u, addon_type=addon_type, status=status, quantity=1)
+        for u in users for addon_type in ("ebook", "zoom", "ai") for status in ("active", "used")
+    ])
+    AddOnBalance.objects.bulk_create([
+        AddOnBalance(user=u, addon_type=addon_type, quantity=1 if u.id % 3 else 0)
+        for u in users for addon_type in ("ebook", "zoom", "ai")
+    ])
+    addons = list(AddOn.objects.filter(addon_type__in=("zoom", "ai")))
+    CoachTrainingProgress.objects.bulk_create([
+        CoachTrainingProgress(user_id=a.user_id, coach=coach, addon=a) for a in addons if a.addon_type == "ai"
+    ])
+    CoachBooking.objects.bulk_create([
+        CoachBooking(user_id=a.user_id, coach=coach, addon=a) for a in addons if a.addon_type == "zoom"
+    ])
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    return users[0]
+
+
+HOT_LOOKUPS = {
+    "addon per user/type/status": (
+        lambda u: AddOn.objects.filter(user=u, addon_type="ai", status="active"), "users_addons"),
+    "addon balance": (
+        lambda u: AddOnBalance.objects.filter(user=u, addon_type="ai"), "users_addon_balance"),
+    "latest active subscription": (
+        lambda u: Subscription.objects.filter(user=u, status="active").order_by("-start_date")[:1],
+        "users_subscription"),
+    "latest booking": (
+        lambda u: CoachBooking.objects.filter(user=u).order_by("-updated_at")[:1], "users_coachbooking"),
+    "latest training progress": (
+        lambda u: CoachTrainingProgress.objects.filter(user=u).order_by("-last_updated")[:1],
+        "coach_training_progress"),
+}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name", HOT_LOOKUPS)
+def test_hot_lookup_uses_an_index(seeded, name):
+    build, table = HOT_LOOKUPS[name]
+    plan = _plan(build(seeded))
+    assert not _full_scans(plan, table), plan
+    if name.startswith("latest"):
+        assert not _sorts(plan), plan  # the index already yields newest first
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("addon_type, latest", [
+    ("ai", CoachTrainingProgress.objects.order_by("-last_updated")),
+    ("zoom", CoachBooking.objects.order_by("-updated_at")),
+])
+def test_coach_queue_uses_indexes(seeded, addon_type, latest):
+    plan = _plan(_addon_queue(addon_type, latest, latest_id="id"))
+    for table in ("users_addon_balance", latest.model._meta.db_table):
+        assert not _full_scans(plan, table), plan
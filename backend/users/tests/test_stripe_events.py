@@ -0,0 +1,126 @@
+# users/tests/test_stripe_events.py
+import hashlib
+import hmac
+import json
+import time
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+import stripe
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import User, AddOn, StripeEvent
+from users.stripe_events import process_pending_events
+
+
+def _checkout(event_id, user, add_ons=None):
+    meta = {"auth0_id": user.auth0_id, "email": user.email, "plan": "none",
+            "add_ons": json.dumps(add_ons or {"zoom": 2})}
+    return {"id": event_id, "type": "checkout.session.completed", "data": {"object": {"metadata": meta}}}
+
+
+WEBHOOK_SECRET = "whsec_test"
+
+
+def _deliver(event):
+    """POST `event` with a real Stripe-Signature header (verified by the SDK)."""
+    payload = json.dumps(event)
+    timestamp = int(time.time())
+    signature = hmac.new(
+        WEBHOOK_SECRET.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256
+    ).hexdigest()
+    with patch("users.views.settings.STRIPE_WEBHOOK_SECRET", WEBHOOK_SECRET):
+        return APIClient().post(
+            reverse("stripe_webhook"), data=payload, content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1={signature}",
+        )
+
+
+@pytest.fixture
+def buyer():
+    return User.objects.create(auth0_id="auth0|ledger", email="ledger@example.com")
+
+
+@pytest.mark.django_db
+def test_duplicate_deliveries_are_fulfilled_once(buyer):
+    event = _checkout("evt_dup", buyer)
+    assert _deliver(event).status_code == 200
+    assert _deliver(event).status_code == 200  # Stripe retry
+    assert StripeEvent.objects.count() == 1
+
+    assert process_pending_events() == {"processed": 1}
+    assert _deliver(event).status_code == 200  # late duplicate after fulfilment
+    assert process_pending_events() == {}
+    assert AddOn.objects.get(user=buyer, addon_type="zoom").quantity == 2
+
+
+@pytest.mark.django_db
+def test_webhook_only_records_the_event(buyer):
+    with CaptureQueriesContext(connection) as ctx:
+        assert _deliver(_checkout("evt_fast", buyer)).status_code == 200
+
+    assert not any("users_addons" in q["sql"] or "users_user" in q["sql"] for q in ctx.captured_queries)
+    assert StripeEvent.objects.get(event_id="evt_fast").status == "pending"
+    assert not AddOn.objects.exists()
+
+
+@pytest.mark.django_db
+def test_unhandled_types_and_missing_ids_or_types(buyer):
+    assert _deliver({"id": "evt_inv", "type": "invoice.paid", "data": {"object": {}}}).status_code == 200
+    assert StripeEvent.objects.get(event_id="evt_inv").status == "ignored"
+    assert process_pending_events() == {}
+
+    assert _deliver({"type": "checkout.session.completed"}).status_code == 400
+    assert _deliver({"id": "evt_untyped", "data": {"object": {}}}).status_code == 400
+    assert not StripeEvent.objects.filter(event_id="evt_untyped").exists()
+
+
+@pytest.mark.django_db
+def test_worker_command_drains_the_ledger(buyer):
+    _deliver(_checkout("evt_a", buyer))
+    _deliver(_checkout("evt_b", buyer, {"ai": 1}))
+
+    out = StringIO()
+    call_command("process_stripe_events", "--once", stdout=out)
+    assert "Events: 2 processed" in out.getvalue()
+    assert StripeEvent.objects.filter(status="processed", attempts=1).count() == 2
+
+
+@pytest.mark.django_db
+def test_replay_requeues_failed_events(buyer):
+    _deliver(_checkout("evt_retry", buyer))
+    with patch("users.stripe_events.AddOn.objects.create", side_effect=Exception("DB fail")):
+        assert process_pending_events() == {"failed": 1}
+
+    out = StringIO()
+    call_command("replay_stripe_events", "--failed", stdout=out)
+    assert "Requeued 1 failed event(s)." in out.getvalue()
+    assert process_pending_events() == {"processed": 1}
+    assert StripeEvent.objects.get(event_id="evt_retry").attempts == 2
+
+
+@pytest.mark.django_db
+def test_replay_backfills_from_stripe(buyer):
+    _deliver(_checkout("evt_seen", buyer))
+    listed = [
+        stripe.Event.construct_from(_checkout(event_id, buyer), "sk_test")
+        for event_id in ("evt_seen", "evt_missed")
+    ]
+
+    out = StringIO()
+    with patch("users.management.commands.replay_stripe_events.stripe.Event.list") as mock_list:
+        mock_list.return_value.auto_paging_iter.return_value = iter(listed)
+        call_command("replay_stripe_events", "--days=3", stdout=out)
+
+    assert mock_list.call_args.kwargs["type"] == "checkout.session.completed"
+    assert "Fetched 2 event(s) from Stripe, 1 new in the ledger." in out.getvalue()
+    assert process_pending_events() == {"processed": 2}
+
+    with pytest.raises(CommandError):
+        call_command("replay_stripe_events")
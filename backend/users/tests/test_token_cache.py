@@ -0,0 +1,68 @@
+# users/tests/test_token_cache.py
+import time
+from unittest.mock import patch
+
+from users.authentication import Auth0JSONWebTokenAuthentication
+from users.token_cache import VerifiedTokenCache
+
+
+def _payload(sub="auth0|u1", ttl=300):
+    return {"sub": sub, "exp": int(time.time()) + ttl}
+
+
+def test_hit_returns_copy_and_counts():
+    cache = VerifiedTokenCache()
+    cache.put("tok", _payload())
+    first = cache.get("tok")
+    first["sub"] = "mutated"
+    assert cache.get("tok")["sub"] == "auth0|u1"
+    assert cache.get("other") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert stats["hit_ratio"] == 2 / 3
+
+
+def test_entries_expire_at_exp_claim():
+    cache = VerifiedTokenCache()
+    cache.put("no-exp", {"sub": "x"})
+    assert cache.get("no-exp") is None
+
+    cache.put("tok", _payload(ttl=300))
+    with patch("users.token_cache.time.time", return_value=time.time() + 301):
+        assert cache.get("tok") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_by_count_and_bytes():
+    cache = VerifiedTokenCache(max_entries=2)
+    cache.put("a", _payload("a"))
+    cache.put("b", _payload("b"))
+    cache.get("a")                 # "b" is now least recently used
+    cache.put("c", _payload("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.stats()["evictions"] == 1
+
+    small = VerifiedTokenCache(max_bytes=400)
+    small.put("a", _payload("a"))
+    small.put("b", _payload("b"))
+    assert small.stats()["bytes"] <= 400
+    assert small.get("a") is None and small.get("b") is not None
+
+
+def test_verify_jwt_cache_hit_skips_signature_and_claims():
+    payload = _payload()
+    auth = Auth0JSONWebTokenAuthentication()
+
+    with patch("users.authentication.get_jwks_store") as mock_store, \
+         patch("users.authentication.jwt.get_unverified_header", return_value={"kid": "abc"}), \
+         patch("users.authentication.jwt.decode", return_value=payload) as mock_decode:
+        mock_store.return_value.get_key.return_value = {"kid": "abc"}
+        assert auth.verify_jwt("h.p.s") == payload
+        assert auth.verify_jwt("h.p.s") == payload
+        assert auth.verify_jwt("h.p.s") == payload
+
+    mock_decode.assert_called_once()
+    mock_store.return_value.get_key.assert_called_once()
@@ -0,0 +1,115 @@
+"""
+Bounded LRU cache of verified Auth0 token payloads.
+
+The SPA sends the same bearer token on every API call, so once a token has
+passed the RS256 signature and claims checks we remember its payload until
+the token's own `exp`. Entries are keyed by a SHA-256 digest of the full
+token (signature included), so only a byte-identical token can hit.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+# Rough per-entry bookkeeping cost (digest, tuple, OrderedDict node).
+_ENTRY_OVERHEAD = 200
+
+
+class VerifiedTokenCache:
+    """Thread-safe LRU keyed by token digest, bounded by entry count and bytes."""
+
+    def __init__(self, max_entries=10000, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # digest -> (payload, exp, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token):
+        """Return the cached payload for `token`, or None on miss/expiry."""
+        if not self.max_entries:
+            return None
+        digest = self._digest(token)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            payload, exp, size = entry
+            if exp <= time.time():
+                del self._entries[digest]
+                self._bytes -= size
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(digest)
+            self._stats["hits"] += 1
+        return dict(payload)
+
+    def put(self, token, payload):
+        """Remember a verified payload. Tokens without a numeric `exp` are not cached."""
+        exp = payload.get("exp")
+        if not self.max_entries or not isinstance(exp, (int, float)) or exp <= time.time():
+            return
+        size = len(token) + len(json.dumps(payload, default=str)) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        digest = self._digest(token)
+        with self._lock:
+            old = self._entries.pop(digest, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[digest] = (dict(payload), exp, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["entries"] = len(self._entries)
+            snapshot["bytes"] = self._bytes
+        lookups = snapshot["hits"] + snapshot["misses"]
+        snapshot["hit_ratio"] = snapshot["hits"] / lookups if lookups else 0.0
+        return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for name in self._stats:
+                self._stats[name] = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """Return the process-wide verified-token cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = VerifiedTokenCache(
+                    max_entries=settings.JWT_CACHE_MAX_ENTRIES,
+                    max_bytes=settings.JWT_CACHE_MAX_BYTES,
+                )
+    return _cache
+
+
+def reset_token_cache():
+    global _cache
+    with _cache_lock:
+        _cache = None
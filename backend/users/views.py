@@ -1,27 +1,36 @@
-from django.db.models import Q, Sum  
+from django.db.models import F, OuterRef, Subquery, Prefetch
+from django.db.models.functions import Coalesce
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.http import JsonResponse
-from .models import User, UserProfile, Subscription, AddOn, CoachTrainingProgress, CoachBooking
+from .models import User, UserProfile, Subscription, AddOn, AddOnBalance, CoachTrainingProgress, CoachBooking
+from .addon_ledger import balances_for, consume_addon, get_balance
+from .current_user import get_current_user
+from .conditional import coach_lists_version, conditional, watermarks
+from .payload_cache import cached_user_payload, invalidate_user_payloads
+from .search import search_clients
+from .stripe_events import record_event
+from .pagination import KEYSET_ORDERINGS, InvalidCursor, keyset_page, count_rows
 from django.utils import timezone
 from datetime import timedelta
 from rest_framework import status
 import json
+import logging
 import stripe
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 import stripe
 from django.http import HttpResponse
-from django.db import transaction
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
 def _require_coach(request):
     """Raise 403 if the authenticated user is not a coach."""
-    auth0_id = request.user.payload.get("sub")
-    me = User.objects.filter(auth0_id=auth0_id).first()
+    me = get_current_user(request)
     if not me:
         return None, JsonResponse({"error": "User not found"}, status=404)
     if me.role != "coach":
@@ -29,6 +38,211 @@ def _require_coach(request):
     return me, None
 
 
+def _subscription_data(sub):
+    if not sub:
+        return None
+    return {
+        "plan": sub.plan,
+        "start_date": sub.start_date,
+        "end_date": sub.end_date,
+        "status": sub.status,
+    }
+
+
+def _profile_data(prof):
+    if not prof:
+        return None
+    return {
+        "age": prof.age,
+        "height_cm": prof.height_cm,
+        "weight_kg": prof.weight_kg,
+        "fitness_level": prof.fitness_level,
+        "primary_goal": prof.primary_goal,
+        "workout_frequency": prof.workout_frequency,
+        "daily_activity_level": prof.daily_activity_level,
+        "sleep_hours": prof.sleep_hours,
+        "body_fat_percentage": prof.body_fat_percentage,
+        "body_type": prof.body_type,
+        "created_at": prof.created_at,
+    }
+
+
+def _addon_balance(addon_type):
+    balance = AddOnBalance.objects.filter(user_id=OuterRef("pk"), addon_type=addon_type)
+    return Coalesce(Subquery(balance.values("quantity")[:1]), 0)
+
+
+def _client_rows(qs):
+    """
+    Decorate a User queryset with everything the coach client list shows,
+    in a fixed number of queries whatever the page size:
+      - profile joined in (select_related)
+      - active add-on units per type (AddOnBalance point lookups)
+      - latest active subscription (one prefetch, filtered by a subquery)
+    """
+    latest_active_sub = (
+        Subscription.objects
+        .filter(user=OuterRef("user"), status="active")
+        .order_by("-start_date")
+        .values("id")[:1]
+    )
+    return (
+        qs.select_related("userprofile")
+        .annotate(
+            active_ebook=_addon_balance("ebook"),
+            active_zoom=_addon_balance("zoom"),
+            active_ai=_addon_balance("ai"),
+        )
+        .prefetch_related(Prefetch(
+            "subscriptions",
+            queryset=Subscription.objects.filter(status="active", id=Subquery(latest_active_sub)),
+            to_attr="latest_active_subscriptions",
+        ))
+    )
+
+
+def _client_row_data(u):
+    """Serialize a User coming from `_client_rows`."""
+    try:
+        prof = u.userprofile
+    except UserProfile.DoesNotExist:
+        prof = None
+    subs = u.latest_active_subscriptions
+    return {
+        "id": u.id,
+        "email": u.email,
+        "username": u.username,
+        "role": u.role,
+        "subscription_plan": u.subscription_plan,
+        "subscription_details": _subscription_data(subs[0] if subs else None),
+        "addons": {"ebook": u.active_ebook, "zoom": u.active_zoom, "ai": u.active_ai},
+        "profile": _profile_data(prof),
+        "created_at": u.created_at,
+    }
+
+
+def _addon_queue(addon_type, latest, **fields):
+    """
+    One row per client holding units of `addon_type`, in a single query:
+    their AddOnBalance, the client's email / created_at (joined) and `fields`
+    ({alias: column}) read from the client's newest row in `latest`
+    (correlated subqueries on user_id).
+    """
+    newest = latest.filter(user_id=OuterRef("user_id"))
+    return (
+        AddOnBalance.objects
+        .filter(addon_type=addon_type, quantity__gt=0)
+        .values("user_id")
+        .annotate(
+            total_qty=F("quantity"),
+            user_email=F("user__email"),
+            user_created_at=F("user__created_at"),
+            **{alias: Subquery(newest.values(column)[:1]) for alias, column in fields.items()},
+        )
+        .order_by("user_id")
+    )
+
+
+def _training_rows():
+    """Rows of the coach AI-training queue (see coach_training_list)."""
+    queue = _addon_queue(
+        "ai",
+        CoachTrainingProgress.objects.order_by("-last_updated"),
+        progress_notes="notes",
+        progress_updated="last_updated",
+    )
+    return [
+        {
+            "id": row["user_id"],             # use user_id as the row id
+            "user_id": row["user_id"],
+            "user_email": row["user_email"],
+            "quantity": row["total_qty"] or 0,
+            "status": "Pending",              # all active = pending
+            "notes": row["progress_notes"] if row["progress_updated"] else "",
+            "last_updated": row["progress_updated"] or row["user_created_at"],
+        }
+        for row in queue
+    ]
+
+
+def _booking_rows():
+    """Rows of the coach Zoom-booking queue (see coach_list_bookings)."""
+    queue = _addon_queue(
+        "zoom",
+        CoachBooking.objects.order_by("-updated_at"),
+        booking_scheduled="scheduled_date",
+        booking_completed="completion_date",
+        booking_status="status",
+        booking_notes="notes",
+        booking_updated="updated_at",
+    )
+    now = timezone.now()
+    rows = []
+    for row in queue:
+        booked = row["booking_updated"] is not None
+        rows.append({
+            "id": row["user_id"],
+            "user_email": row["user_email"],
+            "quantity": row["total_qty"] or 0,
+            "scheduled_date": row["booking_scheduled"],
+            "completion_date": row["booking_completed"],
+            "status": row["booking_status"] if booked else "Pending",
+            "notes": row["booking_notes"] if booked else "",
+            "last_updated": row["booking_updated"] if booked else now,
+        })
+    return rows
+
+
+def _user_subscription_version(request):
+    """Validator: the User row and its add-on balances."""
+    user = get_current_user(request)
+    if not user:
+        return None
+    return (user.id,) + watermarks(user, AddOnBalance.objects.filter(user=user))
+
+
+def _user_detail_version(request):
+    user = get_current_user(request)
+    if not user:
+        return None
+    return (user.id,) + watermarks(
+        user,
+        UserProfile.objects.filter(user=user),
+        Subscription.objects.filter(user=user),
+        AddOn.objects.filter(user=user),
+    )
+
+
+def _user_addons_version(request):
+    user = get_current_user(request)
+    if not user:
+        return None
+    return (user.id,) + watermarks(user, AddOn.objects.filter(user=user))[1:]
+
+
+def _coach_only(validator):
+    """Only coaches get conditional responses; everyone else hits the view's 403."""
+    def wrapped(request, *args, **kwargs):
+        me = get_current_user(request)
+        if not me or me.role != "coach":
+            return None
+        return validator(request, me, *args, **kwargs)
+    return wrapped
+
+
+def _coach_list_version(request, me):
+    """Validator of the coach listings: the query string and the shared list version (no table scans)."""
+    version = coach_lists_version()
+    if version is None:
+        return None
+    return (tuple(sorted(request.GET.lists())), version)
+
+
+_client_list_version = _coach_only(_coach_list_version)
+_training_list_version = _coach_only(_coach_list_version)
+_booking_list_version = _coach_only(_coach_list_version)
+
+
 # --------------------------------------------------------------------
 #  Auth0 Login Endpoint (Create user on first login)
 # --------------------------------------------------------------------
@@ -46,7 +260,6 @@ def auth0_login(request):
         "email": email,
         "role": "user",
         "subscription_plan": "none",
-        "add_ons": {}  # initialize empty dict
     })
 
     return Response({
@@ -61,8 +274,7 @@ def auth0_login(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_info(request):
-    auth0_id = request.user.payload.get("sub")
-    user = User.objects.filter(auth0_id=auth0_id).first()
+    user = get_current_user(request)
     if user:
         return Response({
             "auth0_id": user.auth0_id,
@@ -77,13 +289,13 @@ def get_user_info(request):
 # --------------------------------------------------------------------
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional("user-subscription", _user_subscription_version)
 def get_user_subscription(request):
-    auth0_id = request.user.payload.get("sub")
-    user = User.objects.filter(auth0_id=auth0_id).first()
+    user = get_current_user(request)
     if user:
         return Response({
             "subscription_plan": user.subscription_plan,
-            "add_ons": user.add_ons or {}
+            "add_ons": balances_for(user.id),
         })
     return JsonResponse({"error": "User not found"}, status=404)
 
@@ -98,8 +310,7 @@ def set_username(request):
     if not username:
         return JsonResponse({"error": "Username is required"}, status=400)
 
-    auth0_id = request.user.payload.get("sub")
-    user = User.objects.filter(auth0_id=auth0_id).first()
+    user = get_current_user(request)
     if user:
         user.username = username
         user.save()
@@ -113,8 +324,7 @@ def set_username(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def is_coach(request):
-    auth0_id = request.user.payload.get("sub")
-    user = User.objects.filter(auth0_id=auth0_id).first()
+    user = get_current_user(request)
     if user:
         return Response({"is_coach": user.role == "coach"})
     return JsonResponse({"error": "User not found"}, status=404)
@@ -126,8 +336,7 @@ def is_coach(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def save_user_profile(request):
-    auth0_id = request.user.payload.get("sub")
-    user = User.objects.filter(auth0_id=auth0_id).first()
+    user = get_current_user(request)
     if not user:
         return JsonResponse({"error": "User not found"}, status=404)
 
@@ -155,13 +364,13 @@ def save_user_profile(request):
 # --------------------------------------------------------------------
 @api_view(['GET', 'PUT', 'PATCH'])
 @permission_classes([IsAuthenticated])
+@conditional("user-detail", _user_detail_version)
 def user_detail(request):
     """
     GET  -> Returns the current authenticated user's full database row INCLUDING profile
     PUT/PATCH -> Updates username, role, and allows plan downgrade only.
     """
-    auth0_id = request.user.payload.get("sub")
-    user = User.objects.filter(auth0_id=auth0_id).first()
+    user = get_current_user(request)
     if not user:
         return JsonResponse({"error": "User not found"}, status=404)
 
@@ -183,7 +392,8 @@ def user_detail(request):
         if subscription_plan is not None:
             if subscription_plan in ["none", "basic"]:
                 user.subscription_plan = subscription_plan
-                Subscription.objects.filter(user=user, status="active").update(status="expired")
+                Subscription.objects.filter(user=user, status="active").update(status="expired", updated_at=timezone.now())
+                invalidate_user_payloads(user.id)
 
         for addon_type, qty in (add_ons or {}).items():
             qty = int(qty)
@@ -208,7 +418,10 @@ def user_detail(request):
     # -------------------------------
     # GET -> return complete profile
     # -------------------------------
-    
+    return Response(cached_user_payload("user-detail", user.id, lambda: _user_detail_payload(user)))
+
+
+def _user_detail_payload(user):
     # Latest active subscription
     sub = (
         Subscription.objects
@@ -216,41 +429,26 @@ def user_detail(request):
         .order_by("-start_date")
         .first()
     )
-    sub_data = None
-    if sub:
-        sub_data = {
-            "plan": sub.plan,
-            "start_date": sub.start_date,
-            "end_date": sub.end_date,
-            "status": sub.status,
-        }
 
     # Profile
     prof = UserProfile.objects.filter(user=user).first()
-    prof_data = None
-    if prof:
-        prof_data = {
-            "age": prof.age,
-            "height_cm": prof.height_cm,
-            "weight_kg": prof.weight_kg,
-            "fitness_level": prof.fitness_level,
-            "primary_goal": prof.primary_goal,
-            "workout_frequency": prof.workout_frequency,
-            "daily_activity_level": prof.daily_activity_level,
-            "sleep_hours": prof.sleep_hours,
-            "body_fat_percentage": prof.body_fat_percentage,
-            "body_type": prof.body_type,
-            "created_at": prof.created_at,
-        }
-    
-    # Debug logging
-    print(f"🔍 DEBUG - User ID: {user.id}")
-    print(f"🔍 DEBUG - Profile found: {prof}")
-    print(f"🔍 DEBUG - Profile data: {prof_data}")
-
-    # Add-ons (active only)
-    addons_list = AddOn.objects.filter(user=user)
-    addons_data = [
+
+    return {
+        "id": user.id,
+        "auth0_id": user.auth0_id,
+        "email": user.email,
+        "username": user.username,
+        "role": user.role,
+        "subscription_plan": user.subscription_plan,
+        "subscription_details": _subscription_data(sub),
+        "addons": _addon_list(user),
+        "profile": _profile_data(prof),
+        "created_at": user.created_at,
+    }
+
+
+def _addon_list(user):
+    return [
         {
             "addon_type": a.addon_type,
             "quantity": a.quantity,
@@ -258,21 +456,10 @@ def user_detail(request):
             "start_date": a.start_date,
             "end_date": a.end_date,
         }
-        for a in addons_list
+        for a in AddOn.objects.filter(user=user)
     ]
 
-    return Response({
-        "id": user.id,
-        "auth0_id": user.auth0_id,
-        "email": user.email,
-        "username": user.username,
-        "role": user.role,
-        "subscription_plan": user.subscription_plan,
-        "subscription_details": sub_data,
-        "addons": addons_data,
-        "profile": prof_data,
-        "created_at": user.created_at,
-    })
+
 # --------------------------------------------------------------------
 #  Downgrade Plan (Dashboard-only action)
 # --------------------------------------------------------------------
@@ -284,8 +471,7 @@ def downgrade_plan(request):
     Example payload: { "target_plan": "none" } or { "target_plan": "basic" }
     """
 
-    auth0_id = request.user.payload.get("sub")
-    user = User.objects.filter(auth0_id=auth0_id).first()
+    user = get_current_user(request)
     if not user:
         return JsonResponse({"error": "User not found"}, status=404)
 
@@ -303,34 +489,30 @@ def downgrade_plan(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional("user-addons", _user_addons_version)
 def get_user_addons(request):
-    auth0_id = request.user.payload.get("sub")
-    user = User.objects.filter(auth0_id=auth0_id).first()
+    user = get_current_user(request)
     if not user:
         return JsonResponse({"error": "User not found"}, status=404)
 
-    addons = AddOn.objects.filter(user=user)
-    response_data = [
-        {
-            "addon_type": a.addon_type,
-            "quantity": a.quantity,
-            "status": a.status,
-            "start_date": a.start_date,
-            "end_date": a.end_date,
-        }
-        for a in addons
-    ]
-    return Response({"addons": response_data})
+    addons = cached_user_payload("user-addons", user.id, lambda: _addon_list(user))
+    return Response({"addons": addons})
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional("coach-clients", _client_list_version)
 def coach_list_clients(request):
     """
     GET /coach/clients/?q=<search>&limit=20&offset=0
+    GET /coach/clients/?q=<search>&limit=20&after=<cursor>&order=id|created_at&count=exact|approx|none
     Returns users with role='user' plus:
       - subscription_plan + latest active subscription details
       - condensed add_ons { ebook, zoom, ai }
       - profile snapshot (UserProfile) if present
+
+    Passing `after` (empty for the first page) switches to keyset pagination:
+    the response carries a `next` cursor instead of `offset`, and the total
+    count is only computed when asked for (capped when count=approx).
     """
     me, err = _require_coach(request)
     if err:
@@ -347,70 +529,33 @@ def coach_list_clients(request):
         offset = 0
 
     qs = User.objects.filter(role="user")
+    ranked = False
     if q:
-        qs = qs.filter(Q(email__icontains=q) | Q(username__icontains=q))
+        qs, ranked = search_clients(qs, q)
 
-    total = qs.count()
-    users = list(qs.order_by("id")[offset:offset + limit])
-
-    out = []
-    for u in users:
-        # latest active subscription
-        sub = (
-            Subscription.objects
-            .filter(user=u, status="active")
-            .order_by("-start_date")
-            .first()
-        )
-        sub_data = None
-        if sub:
-            sub_data = {
-                "plan": sub.plan,
-                "start_date": sub.start_date,
-                "end_date": sub.end_date,
-                "status": sub.status,
-            }
-
-        # profile 
-        prof = UserProfile.objects.filter(user=u).first()
-        prof_data = None
-        if prof:
-            prof_data = {
-                "age": prof.age,
-                "height_cm": prof.height_cm,
-                "weight_kg": prof.weight_kg,
-                "fitness_level": prof.fitness_level,
-                "primary_goal": prof.primary_goal,
-                "workout_frequency": prof.workout_frequency,
-                "daily_activity_level": prof.daily_activity_level,
-                "sleep_hours": prof.sleep_hours,
-                "body_fat_percentage": prof.body_fat_percentage,
-                "body_type": prof.body_type,
-                "created_at": prof.created_at,
-            }
-
-        # add-ons summary (active only)
-        addons = AddOn.objects.filter(user=u, status="active")
-        addons_summary = {"ebook": 0, "zoom": 0, "ai": 0}
-        for a in addons:
-            key = a.addon_type  # expected: "ebook" | "zoom" | "ai"
-            if key in addons_summary:
-                addons_summary[key] += (a.quantity or 0)
-
-        out.append({
-            "id": u.id,
-            "email": u.email,
-            "username": u.username,
-            "role": u.role,
-            "subscription_plan": u.subscription_plan,
-            "subscription_details": sub_data,
-            "addons": addons_summary,
-            "profile": prof_data,
-            "created_at": u.created_at,
+    if "after" in request.GET:
+        ordering = request.GET.get("order", "id")
+        if ordering not in KEYSET_ORDERINGS:
+            return JsonResponse({"error": f"Invalid order '{ordering}'"}, status=400)
+        try:
+            users, next_cursor = keyset_page(_client_rows(qs), ordering, request.GET["after"], limit)
+        except InvalidCursor as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        total, approximate = count_rows(qs, request.GET.get("count", "none"))
+        return Response({
+            "results": [_client_row_data(u) for u in users],
+            "next": next_cursor,
+            "count": total,
+            "count_is_approximate": approximate,
+            "limit": limit,
         })
 
+    total = qs.count()
+    ordering = ("-search_rank", "id") if ranked else ("id",)
+    users = list(_client_rows(qs).order_by(*ordering)[offset:offset + limit])
+
     return Response({
-        "results": out,
+        "results": [_client_row_data(u) for u in users],
         "count": total,
         "limit": limit,
         "offset": offset,
@@ -437,7 +582,7 @@ def coach_update_client_profile(request, user_id: int):
     new_plan = data.get("subscription_plan", None)
     if new_plan is not None and new_plan != client.subscription_plan:
         client.subscription_plan = new_plan
-        client.save(update_fields=["subscription_plan"])
+        client.save(update_fields=["subscription_plan", "updated_at"])
         Subscription.objects.create(
             user=client,
             plan=new_plan,
@@ -508,48 +653,18 @@ def coach_delete_client(request, user_id: int):
 # --------------------------------------------------------------------
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional("coach-training", _training_list_version)
 def coach_training_list(request):
     """
     Returns one row per client who has active AI add-ons.
-    Quantity = SUM(quantity) of active AI add-ons.
+    Quantity = active AI units (AddOnBalance).
     Notes/last_updated come from CoachTrainingProgress (if any).
     """
     me, err = _require_coach(request)
     if err:
         return err
 
-    # Group active AI add-ons by user
-    grouped = (AddOn.objects
-               .filter(addon_type='ai', status='active')
-               .values('user_id')
-               .annotate(total_qty=Sum('quantity'))
-               .order_by('user_id'))
-
-    rows = []
-    for row in grouped:
-        user_id = row['user_id']
-        qty = row['total_qty'] or 0
-        u = User.objects.filter(id=user_id).first()
-        if not u:
-            continue
-
-        # Notes are stored per user in CoachTrainingProgress (last one)
-        prog = (CoachTrainingProgress.objects
-                .filter(user_id=user_id)
-                .order_by('-last_updated')
-                .first())
-
-        rows.append({
-            "id": user_id,                 # use user_id as the row id
-            "user_id": user_id,
-            "user_email": u.email,
-            "quantity": qty,
-            "status": "Pending",           # all active = pending
-            "notes": (prog.notes if prog else ""),
-            "last_updated": (prog.last_updated if prog else u.created_at),
-        })
-
-    return Response(rows)
+    return Response(_training_rows())
 
 # --------------------------------------------------------------------
 #  PATCH /coach/training/<int:user_id>/
@@ -591,44 +706,25 @@ def coach_training_update(request, user_id: int):
 
     # ---- Completion logic ----
     if data.get("status") == "Done":
-        addon = (
-            AddOn.objects.filter(user=user, addon_type="ai", status="active", quantity__gt=0)
-            .order_by("-quantity")
-            .first()
-        )
-        if not addon:
+        used = consume_addon(user.id, "ai")
+        if used is None:
             return Response({"error": "No active AI Add-On found for this user."}, status=400)
 
-        # Decrement quantity
-        addon.quantity -= 1
-        if addon.quantity <= 0:
-            addon.status = "used"
-        addon.save(update_fields=["quantity", "status"])
-
-        # Recalculate remaining
-        remaining = (
-            AddOn.objects.filter(user=user, addon_type="ai", status="active")
-            .aggregate(total=Sum("quantity"))
-            .get("total") or 0
-        )
-
         progress, _ = CoachTrainingProgress.objects.update_or_create(
-            user=user,
-            coach=me,
-            addon=addon,
+            addon_id=used.addon_id,
             defaults={
-                "status": "Done" if remaining <= 0 else "Pending",
+                "user": user,
+                "coach": me,
+                "status": "Done" if used.remaining <= 0 else "Pending",
                 "notes": data.get("notes", ""),
             },
         )
 
-        progress.save(update_fields=["status", "notes", "last_updated"])
-
         return Response(
             {
                 "message": "Training progress updated successfully.",
                 "status": progress.status,
-                "remaining_quantity": remaining,
+                "remaining_quantity": used.remaining,
             },
             status=200,
         )
@@ -640,6 +736,7 @@ def coach_training_update(request, user_id: int):
 # --------------------------------------------------------------------
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@conditional("coach-bookings", _booking_list_version)
 def coach_list_bookings(request):
     """
     Returns one row per client with total Zoom quantity and their latest booking details.
@@ -648,39 +745,7 @@ def coach_list_bookings(request):
     if err:
         return err
 
-    zoom_addons = (
-        AddOn.objects.filter(addon_type="zoom", status="active")
-        .values("user_id")
-        .annotate(total_qty=Sum("quantity"))
-        .order_by("user_id")
-    )
-
-    data = []
-    for entry in zoom_addons:
-        user_id = entry["user_id"]
-        total_qty = entry["total_qty"] or 0
-        user = User.objects.filter(id=user_id).first()
-        if not user:
-            continue
-
-        booking = (
-            CoachBooking.objects.filter(user=user)
-            .order_by("-updated_at")
-            .first()
-        )
-
-        data.append({
-            "id": user.id,
-            "user_email": user.email,
-            "quantity": total_qty,
-            "scheduled_date": booking.scheduled_date if booking else None,
-            "completion_date": booking.completion_date if booking else None,
-            "status": booking.status if booking else "Pending",
-            "notes": booking.notes if booking else "",
-            "last_updated": booking.updated_at if booking else timezone.now(),
-        })
-
-    return Response(data)
+    return Response(_booking_rows())
 
 # --------------------------------------------------------------------
 #  PATCH /coach/bookings/<int:user_id>/
@@ -714,12 +779,13 @@ def coach_update_booking(request, user_id: int):
     if not addon:
         return Response({"error": "No Zoom Add-On found for this client."}, status=400)
 
-    # Create or update the booking linked to this addon
+    # Create or update the add-on's pending booking (at most one per add-on);
+    # the coach handling it takes it over
     booking, _ = CoachBooking.objects.update_or_create(
         user=user,
-        coach=me,
         addon=addon,
-        defaults={"status": "Pending"},
+        status="Pending",
+        defaults={"coach": me},
     )
 
     # --- Update fields if provided ---
@@ -732,19 +798,9 @@ def coach_update_booking(request, user_id: int):
     if data.get("status") == "Completed":
         booking.completion_date = timezone.now()
 
-        # Decrement quantity
-        if addon.status == "active" and addon.quantity > 0:
-            addon.quantity -= 1
-            if addon.quantity <= 0:
-                addon.status = "used"
-            addon.save(update_fields=["quantity", "status"])
-
-        # Check remaining active quantity
-        remaining = (
-            AddOn.objects.filter(user=user, addon_type="zoom", status="active")
-            .aggregate(total=Sum("quantity"))
-            .get("total") or 0
-        )
+        # Take one session from this add-on (no-op once it is used up)
+        used = consume_addon(user.id, "zoom", addon_id=addon.id)
+        remaining = used.remaining if used else get_balance(user.id, "zoom")
 
         # Update status based on remaining sessions
         if remaining <= 0:
@@ -826,94 +882,21 @@ def stripe_webhook(request):
     sig_header = request.META.get("HTTP_STRIPE_SIGNATURE")
 
     try:
-        event = stripe.Webhook.construct_event(
+        stripe.Webhook.construct_event(
             payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
         )
+        # The ledger stores plain JSON: the verified body, not the stripe.Event
+        event = json.loads(payload)
     except Exception as e:
-        print("[STRIPE WEBHOOK ERROR]", e)
+        logger.warning("Rejected Stripe webhook: %s", e)
         return HttpResponse(status=400)
 
-    if event["type"] == "checkout.session.completed":
-        session = event["data"]["object"]
-        print("[WEBHOOK] Received checkout.session.completed")
-
-        metadata = session.get("metadata", {}) or {}
-        plan = metadata.get("plan", "none")
-        add_ons_raw = metadata.get("add_ons", "{}")
-        billing_period = metadata.get("billing_period", "monthly")
-
-        try:
-            addons = json.loads(add_ons_raw)
-        except json.JSONDecodeError:
-            addons = {}
-
-        email = metadata.get("email") or session.get("customer_email")
-        auth0_id = metadata.get("auth0_id")
-
-        user = None
-        if auth0_id:
-            user = User.objects.filter(auth0_id=auth0_id).first()
-        if not user and email:
-            user = User.objects.filter(email=email).first()
-
-        if not user:
-            print("[WEBHOOK] No user found for:", email)
-            return HttpResponse(status=200)
+    if not isinstance(event, dict) or not event.get("id") or not event.get("type"):
+        logger.warning("Rejected Stripe webhook without an event id or type")
+        return HttpResponse(status=400)
 
-        try:
-            with transaction.atomic():
-                # --- Update subscription ---
-                if plan in ["basic", "advanced"]:
-                    Subscription.objects.filter(user=user, status="active").update(status="expired")
-                    start_date = timezone.now()
-                    end_date = start_date + timedelta(days=30)
-                    Subscription.objects.create(
-                        user=user,
-                        plan=plan,
-                        start_date=start_date,
-                        end_date=end_date,
-                        status="active",
-                    )
-                    user.subscription_plan = plan
-
-                # --- Update add-ons ---
-                user_addons_dict = user.add_ons or {}
-                for key, qty in addons.items():
-                    qty = int(qty)
-                    if qty <= 0:
-                        continue
-                    if key == "ebook":
-                        exists = AddOn.objects.filter(
-                            user=user, addon_type="ebook", status__in=["active", "used"]
-                        ).exists()
-                        if not exists:
-                            AddOn.objects.create(
-                                user=user,
-                                addon_type="ebook",
-                                quantity=1,
-                                start_date=timezone.now(),
-                                end_date=None,
-                                status="active",
-                            )
-                            user_addons_dict["ebook"] = 1
-                        continue
-                    end_date = timezone.now() + timedelta(days=30)
-                    AddOn.objects.create(
-                        user=user,
-                        addon_type=key,
-                        quantity=qty,
-                        start_date=timezone.now(),
-                        end_date=end_date,
-                        status="active",
-                    )
-                    user_addons_dict[key] = user_addons_dict.get(key, 0) + qty
-
-                user.add_ons = user_addons_dict
-                user.save(update_fields=["subscription_plan", "add_ons"])
-
-                print(f"[WEBHOOK] Updated user {user.email}: plan={plan}, addons={user_addons_dict}")
-        except Exception as e:
-            print("[WEBHOOK ERROR during DB update]", e)
-            return HttpResponse(status=500)
+    # Fulfilment happens in process_stripe_events (users/stripe_events.py)
+    if not record_event(event):
+        logger.info("Duplicate Stripe event ignored: %s", event["id"])
 
     return HttpResponse(status=200)
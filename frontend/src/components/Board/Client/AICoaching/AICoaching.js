@@ -5,6 +5,7 @@ import { FaDumbbell, FaFire, FaBed, FaCheckCircle, FaTrophy, FaRedo, FaInfoCircl
 import "./AICoaching.css";
 
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
+const JOB_POLL_INTERVAL_MS = 3000;
 const AICoaching = () => {
   const { fetchWithAuth } = useAuth();
   const [activeProgram, setActiveProgram] = useState(null);
@@ -38,14 +39,22 @@ const AICoaching = () => {
     setGenerating(true);
     setError("");
     try {
-      const data = await fetchWithAuth(`${API_URL}/api/program/generate`, {
+      let job = await fetchWithAuth(`${API_URL}/api/program/generate`, {
         method: "POST",
       });
 
-      if (data.success) {
-        await loadActiveProgram();
-        setShowRegenerateModal(false);
+      // Generation runs in a background worker; poll the job until it finishes
+      while (job.status === "queued" || job.status === "running") {
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        job = await fetchWithAuth(`${API_URL}${job.status_url}`);
       }
+
+      if (job.status === "failed") {
+        throw new Error(job.error || "Program generation failed");
+      }
+
+      await loadActiveProgram();
+      setShowRegenerateModal(false);
     } catch (err) {
       setError(err.message || "Failed to generate program. Please try again.");
     } finally {